@@ -0,0 +1,54 @@
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from starlette.responses import JSONResponse
+import os
+
+load_dotenv()
+
+# Larger request bodies are refused with a 413. Uploads are spooled to disk
+# and extracted whole, so the cap bounds the disk and extraction work a
+# single request can cause.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(15 * 1024 * 1024)))
+
+TOO_LARGE_DETAIL = f"Request body exceeds {MAX_UPLOAD_BYTES} bytes"
+
+
+class BodySizeLimitMiddleware:
+    """Rejects request bodies over ``max_bytes`` before they are buffered.
+
+    A declared Content-Length over the limit is refused without reading the
+    body. Bodies without one are counted as they arrive, and the read that
+    crosses the limit raises a 413 from inside the route's body parsing.
+    """
+
+    def __init__(self, app, max_bytes: int = MAX_UPLOAD_BYTES):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.max_bytes <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        try:
+            declared = int(headers.get(b"content-length", b""))
+        except ValueError:
+            declared = None
+        if declared is not None and declared > self.max_bytes:
+            response = JSONResponse({"detail": TOO_LARGE_DETAIL}, status_code=413)
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise HTTPException(status_code=413, detail=TOO_LARGE_DETAIL)
+            return message
+
+        await self.app(scope, limited_receive, send)
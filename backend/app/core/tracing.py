@@ -0,0 +1,271 @@
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dotenv import load_dotenv
+from fastapi import HTTPException
+from typing import Dict, List, Optional
+import json
+import logging
+import os
+import queue
+import re
+import secrets
+import threading
+import time
+
+load_dotenv()
+
+SERVICE_NAME = "backend"
+# Finished spans are appended to this file as JSON lines; empty keeps them in
+# memory only.
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+TRACE_MAX_TRACES = int(os.getenv("TRACE_MAX_TRACES", "200"))
+# Requests slower than this are kept for the debug waterfall.
+TRACE_SLOW_MS = float(os.getenv("TRACE_SLOW_MS", "1000"))
+# The /debug/traces endpoints show request paths and attributes of every
+# user's requests, so they are off unless turned on.
+TRACE_DEBUG_ENDPOINTS = os.getenv("TRACE_DEBUG_ENDPOINTS", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """One timed operation. Field names follow the OpenTelemetry JSON export."""
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str] = None,
+        attributes: Optional[dict] = None,
+    ):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = attributes or {}
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.error: Optional[str] = None
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.time()) - self.start) * 1000
+
+    def to_dict(self) -> dict:
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id,
+            "name": self.name,
+            "service": SERVICE_NAME,
+            "startTimeUnixNano": int(self.start * 1e9),
+            "endTimeUnixNano": int((self.end or self.start) * 1e9),
+            "attributes": self.attributes,
+            "status": (
+                {"code": "ERROR", "message": self.error}
+                if self.error
+                else {"code": "OK"}
+            ),
+        }
+
+
+class Tracer:
+    """Keeps the spans of recent traces and appends finished ones to a file.
+
+    The file is written by a background thread, so recording a span never
+    blocks the event loop on disk.
+    """
+
+    def __init__(self, max_traces: int, slow_ms: float, export_path: str = ""):
+        self.max_traces = max_traces
+        self.slow_ms = slow_ms
+        self.export_path = export_path
+        self._lock = threading.Lock()
+        self._traces: "OrderedDict[str, List[dict]]" = OrderedDict()
+        self._slow: deque = deque(maxlen=max_traces)
+        self._exports: queue.Queue = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+
+    def record(self, span: Span):
+        data = span.to_dict()
+        with self._lock:
+            self._traces.setdefault(span.trace_id, []).append(data)
+            self._traces.move_to_end(span.trace_id)
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+            if self.export_path:
+                if self._writer is None:
+                    self._writer = threading.Thread(
+                        target=self._write_exports, name="trace-export", daemon=True
+                    )
+                    self._writer.start()
+                self._exports.put(data)
+
+    def _write_exports(self):
+        while True:
+            batch = [self._exports.get()]
+            while not self._exports.empty():
+                batch.append(self._exports.get_nowait())
+            try:
+                with open(self.export_path, "a") as f:
+                    f.writelines(json.dumps(data) + "\n" for data in batch)
+            except Exception:
+                # The thread must outlive any bad batch, or flush() would hang.
+                logger.exception("Could not export spans")
+            finally:
+                for _ in batch:
+                    self._exports.task_done()
+
+    def flush(self):
+        """Wait until every recorded span has been written to the file."""
+        self._exports.join()
+
+    def mark_slow(self, span: Span):
+        with self._lock:
+            self._slow.appendleft(
+                {
+                    "traceId": span.trace_id,
+                    "name": span.name,
+                    "durationMs": round(span.duration_ms, 1),
+                }
+            )
+
+    def trace(self, trace_id: str) -> List[dict]:
+        with self._lock:
+            return list(self._traces.get(trace_id, []))
+
+    def slow(self, limit: int) -> List[dict]:
+        with self._lock:
+            return list(self._slow)[:limit]
+
+
+tracer = Tracer(TRACE_MAX_TRACES, TRACE_SLOW_MS, TRACE_EXPORT_PATH)
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def require_trace_debug():
+    """Dependency of the /debug/traces endpoints; hides them unless enabled."""
+    if not TRACE_DEBUG_ENDPOINTS:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+def parse_traceparent(header: Optional[str]):
+    """``(trace_id, parent_span_id)`` from a W3C traceparent, or ``None``."""
+    match = TRACEPARENT.match(header or "")
+    return match.groups() if match else None
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, traceparent: Optional[str] = None, **attributes):
+    """Time the block as a child of the current span.
+
+    Outside any span a new trace starts, continuing ``traceparent`` if given.
+    """
+    parent = _current.get()
+    if parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    else:
+        trace_id, parent_id = parse_traceparent(traceparent) or (
+            secrets.token_hex(16),
+            None,
+        )
+    current = Span(name, trace_id, parent_id, attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = type(e).__name__
+        raise
+    finally:
+        current.end = time.time()
+        _current.reset(token)
+        tracer.record(current)
+
+
+def trace_headers() -> dict:
+    """Headers that carry the current trace to another service."""
+    current = _current.get()
+    if current is None:
+        return {}
+    return {"traceparent": current.traceparent, "X-Request-ID": current.trace_id}
+
+
+def waterfall(spans: List[dict]) -> List[dict]:
+    """Spans in start order with their offset, duration and nesting depth."""
+    if not spans:
+        return []
+    ordered = sorted(spans, key=lambda s: s["startTimeUnixNano"])
+    origin = ordered[0]["startTimeUnixNano"]
+    depths: Dict[str, int] = {}
+    rows = []
+    for s in ordered:
+        depth = depths.get(s["parentSpanId"], -1) + 1
+        depths[s["spanId"]] = depth
+        rows.append(
+            {
+                "name": s["name"],
+                "service": s["service"],
+                "depth": depth,
+                "offsetMs": round((s["startTimeUnixNano"] - origin) / 1e6, 1),
+                "durationMs": round(
+                    (s["endTimeUnixNano"] - s["startTimeUnixNano"]) / 1e6, 1
+                ),
+                "status": s["status"]["code"],
+                "attributes": s["attributes"],
+            }
+        )
+    return rows
+
+
+class TracingMiddleware:
+    """Opens a server span per request, continuing an incoming traceparent.
+
+    The trace id is returned as X-Request-ID. Requests slower than
+    TRACE_SLOW_MS are listed by the debug traces endpoint.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        traceparent = headers.get(b"traceparent", b"").decode("latin-1")
+        with span(
+            f"{scope['method']} {scope['path']}", traceparent=traceparent
+        ) as server:
+
+            async def send_with_trace(message):
+                if message["type"] == "http.response.start":
+                    server.attributes["http.status_code"] = message["status"]
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-request-id", server.trace_id.encode())
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace)
+            finally:
+                route = scope.get("route")
+                if route is not None:
+                    server.name = f"{scope['method']} {route.path}"
+        if server.duration_ms >= tracer.slow_ms:
+            tracer.mark_slow(server)
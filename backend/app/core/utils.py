@@ -1,13 +1,43 @@
 from passlib.context import CryptContext
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+import asyncio
 import logging
+import os
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+load_dotenv()
+
+# Raising the cost factor rehashes each user's password on their next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# bcrypt releases the GIL, so these threads hash in parallel; anything beyond
+# them waits in the executor queue instead of blocking the event loop.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+
+pwd_context = CryptContext(
+    schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS
+)
 logger = logging.getLogger(__name__)
 
+_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+)
+
+
+async def _run_hashing(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+
+
+async def verify_password(plain_password, hashed_password):
+    return await _run_hashing(pwd_context.verify, plain_password, hashed_password)
+
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def get_password_hash(password):
+    return await _run_hashing(pwd_context.hash, password)
 
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+def password_needs_rehash(hashed_password) -> bool:
+    """Whether a stored hash was made with other settings than the current ones."""
+    try:
+        return pwd_context.needs_update(hashed_password)
+    except ValueError:
+        return False
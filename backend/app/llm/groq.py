@@ -1,28 +1,205 @@
 import httpx
+import json
 import os
+from typing import AsyncIterator, List, Optional
 from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from app.core.tracing import span, trace_headers
 
 load_dotenv()
 
 GROQ_SERVICE_URL = os.getenv("GROQ_SERVICE_URL")
-GROQ_MODEL = "llama3-70b-8192"
+# Unset lets the groq service pick a model per task; set, it pins every call.
+GROQ_MODEL = os.getenv("GROQ_MODEL") or None
+
+GROQ_SERVICE_MAX_CONNECTIONS = int(os.getenv("GROQ_SERVICE_MAX_CONNECTIONS", "50"))
+GROQ_SERVICE_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.getenv("GROQ_SERVICE_MAX_KEEPALIVE_CONNECTIONS", "20")
+)
+GROQ_SERVICE_KEEPALIVE_EXPIRY = float(os.getenv("GROQ_SERVICE_KEEPALIVE_EXPIRY", "30"))
+GROQ_SERVICE_CONNECT_TIMEOUT = float(os.getenv("GROQ_SERVICE_CONNECT_TIMEOUT", "5"))
+# Read timeouts per operation: cleanup covers every chunk of a long document,
+# and upload calls may queue behind queries in the groq service scheduler.
+GROQ_QUERY_TIMEOUT = float(os.getenv("GROQ_QUERY_TIMEOUT", "60"))
+GROQ_METADATA_TIMEOUT = float(os.getenv("GROQ_METADATA_TIMEOUT", "300"))
+GROQ_CLEANUP_TIMEOUT = float(os.getenv("GROQ_CLEANUP_TIMEOUT", "300"))
+# Upload jobs nobody waits on ask the groq service for this long to clean a
+# document, so texts too long for a synchronous upload still get processed.
+GROQ_JOB_CLEANUP_DEADLINE = float(os.getenv("GROQ_JOB_CLEANUP_DEADLINE", "3600"))
+# Slack on top of a requested deadline for the groq service to answer.
+GROQ_DEADLINE_MARGIN_SECONDS = 30
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_groq_client() -> httpx.AsyncClient:
+    """Long-lived client for the groq service, reusing keep-alive connections."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=GROQ_SERVICE_URL or "",
+            limits=httpx.Limits(
+                max_connections=GROQ_SERVICE_MAX_CONNECTIONS,
+                max_keepalive_connections=GROQ_SERVICE_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=GROQ_SERVICE_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                GROQ_QUERY_TIMEOUT, connect=GROQ_SERVICE_CONNECT_TIMEOUT
+            ),
+        )
+    return _client
+
+
+async def close_groq_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def _timeout(read_timeout: float) -> httpx.Timeout:
+    return httpx.Timeout(read_timeout, connect=GROQ_SERVICE_CONNECT_TIMEOUT)
+
+
+def _body(prompt: str, task: str, model: Optional[str], **fields) -> dict:
+    body = {"prompt": prompt, "task": task, **fields}
+    if model:
+        body["model"] = model
+    return body
 
 
-async def call_groq(prompt: str, model: str = GROQ_MODEL) -> dict:
-    async with httpx.AsyncClient(timeout=60) as client:
-        response = await client.post(
-            f"{GROQ_SERVICE_URL}/call-groq",
-            json={"prompt": prompt, "model": model},
+async def call_groq(
+    prompt: str,
+    task: str = "query",
+    model: Optional[str] = GROQ_MODEL,
+    timeout: float = GROQ_QUERY_TIMEOUT,
+    cache: bool = True,
+    priority: str = "interactive",
+) -> dict:
+    """Run one prompt. ``priority="bulk"`` lets user-facing queries go first."""
+    with span("groq_service /call-groq", task=task):
+        response = await get_groq_client().post(
+            "/call-groq",
+            json=_body(prompt, task, model, cache=cache, priority=priority),
+            headers=trace_headers(),
+            timeout=_timeout(timeout),
         )
         response.raise_for_status()
         return response.json()
 
 
-async def clean_text_with_groq(raw_text: str, model: str = GROQ_MODEL) -> str:
-    async with httpx.AsyncClient(timeout=60) as client:
-        response = await client.post(
-            f"{GROQ_SERVICE_URL}/clean-text",
-            json={"prompt": raw_text, "model": model},
+async def call_groq_batch(
+    prompts: List[str],
+    task: str = "query",
+    model: Optional[str] = GROQ_MODEL,
+    timeout: float = GROQ_CLEANUP_TIMEOUT,
+    cache: bool = True,
+    priority: str = "bulk",
+) -> List[dict]:
+    """Run several prompts in one round trip to the groq service.
+
+    Results keep the order of ``prompts``; each holds a ``response`` or an
+    ``error`` for that prompt alone.
+    """
+    items = [
+        _body(prompt, task, model, cache=cache, priority=priority) for prompt in prompts
+    ]
+    with span("groq_service /call-groq/batch", task=task, items=len(items)):
+        response = await get_groq_client().post(
+            "/call-groq/batch",
+            json={"items": items},
+            headers=trace_headers(),
+            timeout=_timeout(timeout),
         )
         response.raise_for_status()
+        return response.json()["results"]
+
+
+async def stream_groq(
+    prompt: str,
+    task: str = "query",
+    model: Optional[str] = GROQ_MODEL,
+    timeout: float = GROQ_QUERY_TIMEOUT,
+    cache: bool = True,
+) -> AsyncIterator[str]:
+    """Yield the answer's text as the groq service streams it.
+
+    The timeout applies between chunks, not to the whole answer. The stream
+    is consumed across tasks, so it carries the caller's trace without a span
+    of its own.
+    """
+    async with get_groq_client().stream(
+        "POST",
+        "/call-groq/stream",
+        json=_body(prompt, task, model, cache=cache),
+        headers=trace_headers(),
+        timeout=_timeout(timeout),
+    ) as response:
+        response.raise_for_status()
+        event = None
+        async for line in response.aiter_lines():
+            if line.startswith("event:"):
+                event = line[len("event:") :].strip()
+            elif line.startswith("data:"):
+                data = line[len("data:") :].strip()
+                if data == "[DONE]":
+                    return
+                payload = json.loads(data)
+                if event == "error":
+                    raise RuntimeError(payload["detail"])
+                yield payload["delta"]
+            elif not line:
+                event = None
+
+
+async def clean_text_with_groq(
+    raw_text: str,
+    model: Optional[str] = GROQ_MODEL,
+    cache: bool = True,
+    deadline: Optional[float] = None,
+) -> str:
+    """Clean the text in the groq service.
+
+    ``deadline`` replaces the groq service's own cleanup deadline. Timeouts
+    become a 504 and other failures a 502; text the groq service cannot
+    clean before its deadline keeps its 413.
+    """
+    params, read_timeout = {}, GROQ_CLEANUP_TIMEOUT
+    if deadline is not None:
+        params["deadline"] = deadline
+        read_timeout = deadline + GROQ_DEADLINE_MARGIN_SECONDS
+    with span("groq_service /clean-text", task="cleanup"):
+        try:
+            response = await get_groq_client().post(
+                "/clean-text",
+                params=params,
+                json=_body(raw_text, "cleanup", model, cache=cache),
+                headers=trace_headers(),
+                timeout=_timeout(read_timeout),
+            )
+            response.raise_for_status()
+        except httpx.TimeoutException:
+            raise HTTPException(status_code=504, detail="Text cleanup timed out")
+        except httpx.HTTPStatusError as e:
+            status = e.response.status_code
+            if status == 413:
+                raise HTTPException(
+                    status_code=413, detail="Document too long to clean in time"
+                )
+            if status == 504:
+                raise HTTPException(status_code=504, detail="Text cleanup timed out")
+            raise HTTPException(status_code=502, detail="Text cleanup failed")
+        except httpx.HTTPError:
+            raise HTTPException(status_code=502, detail="Text cleanup failed")
         return response.json()["content"]
+
+
+async def get_groq_trace(trace_id: str) -> List[dict]:
+    """The groq service's spans of a trace; empty if it cannot be reached."""
+    try:
+        response = await get_groq_client().get(f"/debug/traces/{trace_id}")
+        response.raise_for_status()
+        return response.json()["spans"]
+    except (httpx.HTTPError, KeyError, ValueError):
+        return []
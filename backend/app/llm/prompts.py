@@ -1,7 +1,7 @@
 QUERY_PROMPT = """
 You must answer the user's question **exclusively** using the content below.
 
-Document Content:
+Document Content (the excerpts of the document most relevant to the question):
 {content}
 
 User Question:
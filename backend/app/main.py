@@ -1,9 +1,54 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import logging
+from fastapi import Depends, FastAPI
+from fastapi.responses import Response
 from fastapi.middleware.cors import CORSMiddleware
+from app.core.limits import BodySizeLimitMiddleware
+from app.core.metrics import CONTENT_TYPE, MetricsMiddleware, registry
+from app.core.tracing import (
+    TracingMiddleware,
+    require_trace_debug,
+    tracer,
+    waterfall,
+)
 from app.routers.documents import router as documents_router
 from app.routers.users import router as users_router
+from app.routers.jobs import router as jobs_router
+from app.services.extraction.engine import (
+    start_extraction_pool,
+    shutdown_extraction_pool,
+)
+from app.services.jobs import start_job_workers, stop_job_workers
+from app.services.database.core import close_client, get_client, get_pool_stats
+from app.services.database.indexes import ensure_indexes
+from app.llm.groq import close_groq_client, get_groq_client, get_groq_trace
+
+logger = logging.getLogger(__name__)
+
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_client()
+    try:
+        await ensure_indexes()
+    except Exception:
+        logger.exception("Could not create database indexes")
+    get_groq_client()
+    start_extraction_pool()
+    start_job_workers()
+    yield
+    await stop_job_workers()
+    shutdown_extraction_pool()
+    await close_groq_client()
+    close_client()
+    tracer.flush()
+
+
+app = FastAPI(lifespan=lifespan)
+
+app.add_middleware(BodySizeLimitMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -11,12 +56,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*", "Authorization"],
-    expose_headers=["Authorization", "*"],
+    expose_headers=["Authorization", "X-Next-Cursor", "*"],
     max_age=600,  # Cache preflight requests for 10 minutes
 )
 
 app.include_router(documents_router)
 app.include_router(users_router)
+app.include_router(jobs_router)
 
 
 @app.get("/")
@@ -34,6 +80,29 @@ async def health_check():
     return {"status": "healthy", "service": "backend"}
 
 
+@app.get("/health/db")
+async def database_pool_stats():
+    return get_pool_stats()
+
+
+@app.get("/metrics")
+async def metrics():
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/debug/traces", dependencies=[Depends(require_trace_debug)])
+async def slow_traces(limit: int = 10):
+    """Recent requests slower than TRACE_SLOW_MS, newest first."""
+    return tracer.slow(limit)
+
+
+@app.get("/debug/traces/{trace_id}", dependencies=[Depends(require_trace_debug)])
+async def trace_waterfall(trace_id: str):
+    """Spans of one trace from both services, with their waterfall."""
+    spans = tracer.trace(trace_id) + await get_groq_trace(trace_id)
+    return {"traceId": trace_id, "spans": spans, "waterfall": waterfall(spans)}
+
+
 @app.get("/features")
 async def get_features():
     return [
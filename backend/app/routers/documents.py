@@ -1,40 +1,93 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List, Literal, Optional, Tuple
 from datetime import datetime
 from zoneinfo import ZoneInfo
+import asyncio
 import json
-import pdfplumber
-from io import BytesIO
 import logging
 
-logging.getLogger("pdfplumber").setLevel(logging.ERROR)
-logging.getLogger("pdfminer").setLevel(logging.ERROR)
-
+from app.core.tracing import span
 from app.schemas.query_schemas import QueryRequest
-from app.schemas.document_schemas import DocumentWithDetails
+from app.schemas.document_schemas import DocumentSummary
 from app.schemas.user_schemas import User
+from app.services.answer_cache import cache_key, find_cached_answer
 from app.services.auth import get_current_user
+from app.services.extraction.backends import EXTRACTORS
+from app.services.jobs import submit_upload_job
+from app.services.uploads import spool_upload
+from app.services.retrieval import build_index, query_terms, select_context
+from app.services.pipeline import (
+    clean_stage,
+    extract_stage,
+    reuse_artifact,
+    store_stage,
+    summarize_stage,
+)
+from app.services.database.artifacts import get_artifacts
 from app.services.database.documents import *
+from app.services.database.queries import (
+    add_query_to_document,
+    delete_document_queries,
+    list_document_queries,
+)
 from app.services.database.user import *
-from app.llm.prompts import QUERY_PROMPT, UPLOAD_PROMPT
-from app.llm.groq import call_groq, clean_text_with_groq
+from app.llm.prompts import QUERY_PROMPT
+from app.llm.groq import call_groq, stream_groq
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
-@router.get("/documents", response_model=List[DocumentWithDetails])
-async def get_documents(current_user: User = Depends(get_current_user)):
-    documents = await get_user_documents(current_user.id)
+MAX_PAGE_SIZE = 100
+
+
+async def list_documents_page(
+    response: Response,
+    user_id: str,
+    subject: Optional[str],
+    sort: str,
+    limit: Optional[int],
+    cursor: Optional[str],
+):
+    try:
+        documents, next_cursor = await list_user_documents(
+            user_id, subject, sort, limit, cursor
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return documents
 
 
-@router.get("/dashboard")
+@router.get("/documents", response_model=List[DocumentSummary])
+async def get_documents(
+    response: Response,
+    subject: Optional[str] = None,
+    sort: Literal["recent", "viewed"] = "recent",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+):
+    return await list_documents_page(
+        response, current_user.id, subject, sort, limit, cursor
+    )
+
+
+@router.get("/dashboard", response_model=List[DocumentSummary])
 async def get_documents_dashboard(
-    subject: str = "All Subjects", current_user: User = Depends(get_current_user)
+    response: Response,
+    subject: str = "All Subjects",
+    sort: Literal["recent", "viewed"] = "recent",
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
 ):
-    documents = await get_user_documents(current_user.id, subject)
-    return documents
+    return await list_documents_page(
+        response, current_user.id, subject, sort, limit, cursor
+    )
 
 
 @router.get("/documents/{document_id}")
@@ -54,79 +107,293 @@ async def delete_a_document(
     document_id: int, current_user: User = Depends(get_current_user)
 ):
     result = await delete_document(current_user.id, document_id)
-    if result.modified_count == 0:
+    if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Document not found")
+    await delete_document_queries(current_user.id, document_id)
     return {"message": "Document deleted successfully"}
 
 
+@router.get("/documents/{document_id}/queries")
+async def get_document_queries(
+    document_id: int,
+    response: Response,
+    limit: int = Query(20, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+):
+    """A page of the document's queries, newest first.
+
+    The cursor for the next, older page is returned in ``X-Next-Cursor``.
+    """
+    if not await document_exists(current_user.id, document_id):
+        raise HTTPException(status_code=404, detail="Document not found")
+    try:
+        queries, next_cursor = await list_document_queries(
+            current_user.id, document_id, limit, cursor
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return queries
+
+
+async def get_query_content(user_id: str, document_id: int) -> str:
+    content = await get_stored_content(user_id, document_id)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return await asyncio.to_thread(decode_content, content)
+
+
+async def build_query_prompt(
+    user_id: str, document_id: int, text: str, question: str
+) -> Tuple[str, List[int]]:
+    """The LLM prompt for a question and the ids of the chunks it quotes."""
+    with span("query.retrieve"):
+        index = await get_document_index(user_id, document_id, query_terms(question))
+        if index is None:
+            # Documents uploaded before the current index format get indexed on
+            # first query.
+            index = await asyncio.to_thread(build_index, text)
+            await set_document_index(user_id, document_id, index)
+
+        context, chunk_ids = await asyncio.to_thread(
+            select_context, index, text, question
+        )
+    return QUERY_PROMPT.format(content=context, question=question), chunk_ids
+
+
+def cached_query_data(question: str, match: dict) -> dict:
+    return {
+        "question": question,
+        "answer": match["answer"],
+        "chunks": match.get("chunks", []),
+        "cached": True,
+        "timestamp": datetime.now(ZoneInfo("Asia/Jerusalem")),
+    }
+
+
 @router.post("/documents/{document_id}/query")
 async def query_document(
     document_id: int,
     query: QueryRequest,
     current_user: User = Depends(get_current_user),
 ):
-    doc = await get_document(current_user.id, document_id)
-    if not doc:
-        raise HTTPException(status_code=404, detail="Document not found")
+    content = await get_query_content(current_user.id, document_id)
+    cache = cache_key(content, query.question)
+    match = await find_cached_answer(current_user.id, document_id, cache)
+    if match is not None:
+        # Saved for the history only; the original answer stays the cache entry.
+        query_data, cache = cached_query_data(query.question, match), None
+    else:
+        prompt, chunk_ids = await build_query_prompt(
+            current_user.id, document_id, content, query.question
+        )
+
+        try:
+            llm_response = await call_groq(prompt)
+        except HTTPException as e:
+            logger.error(f"LLM Response error: {e.detail}")
+            raise
 
-    prompt = QUERY_PROMPT.format(content=doc["content"], question=query.question)
+        raw_answer = llm_response["choices"][0]["message"]["content"]
+
+        query_data = {
+            "question": query.question,
+            "answer": raw_answer,
+            "chunks": chunk_ids,
+            "cached": False,
+            "timestamp": datetime.now(ZoneInfo("Asia/Jerusalem")),
+        }
 
     try:
-        llm_response = await call_groq(prompt)
-    except HTTPException as e:
-        logger.error(f"LLM Response error: {e.detail}")
-        raise
+        await add_query_to_document(current_user.id, document_id, query_data, cache)
+    except Exception as e:
+        logger.error(f"Saving query failed: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to save query to database")
+
+    return query_data
+
+
+def _sse(data, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(jsonable_encoder(data))}\n\n"
 
-    raw_answer = llm_response["choices"][0]["message"]["content"]
+
+async def _save_events(
+    user_id: str, document_id: int, query_data: dict, cache: Optional[dict]
+):
+    try:
+        await add_query_to_document(user_id, document_id, query_data, cache)
+    except Exception as e:
+        logger.error(f"Saving query failed: {str(e)}")
+        yield _sse({"detail": "Failed to save query to database"}, event="error")
+        return
+    yield _sse(query_data, event="done")
+
+
+async def _cached_events(user_id: str, document_id: int, query_data: dict):
+    yield _sse({"delta": query_data["answer"]})
+    async for event in _save_events(user_id, document_id, query_data, None):
+        yield event
+
+
+async def _answer_events(
+    user_id: str,
+    document_id: int,
+    question: str,
+    chunk_ids: List[int],
+    first: str,
+    tokens,
+    cache: dict,
+):
+    parts = [first]
+    try:
+        if first:
+            yield _sse({"delta": first})
+        async for token in tokens:
+            parts.append(token)
+            yield _sse({"delta": token})
+    except Exception as e:
+        logger.error(f"LLM stream error: {str(e)}")
+        yield _sse({"detail": "LLM stream failed"}, event="error")
+        return
 
     query_data = {
-        "question": query.question,
-        "answer": raw_answer,
+        "question": question,
+        "answer": "".join(parts),
+        "chunks": chunk_ids,
+        "cached": False,
         "timestamp": datetime.now(ZoneInfo("Asia/Jerusalem")),
     }
+    async for event in _save_events(user_id, document_id, query_data, cache):
+        yield event
 
-    result = await add_query_to_document(current_user.id, document_id, query_data)
-    if not result.modified_count:
-        raise HTTPException(status_code=500, detail="Failed to save query to database")
 
-    return query_data
+@router.post("/documents/{document_id}/query/stream")
+async def query_document_stream(
+    document_id: int,
+    query: QueryRequest,
+    current_user: User = Depends(get_current_user),
+):
+    """Stream the answer as server-sent events.
+
+    Each ``data`` event carries a ``delta`` of the answer. The saved query is
+    sent last as a ``done`` event; failures end the stream with an ``error``
+    event. An answer reused from the cache arrives as a single delta.
+    """
+    content = await get_query_content(current_user.id, document_id)
+    cache = cache_key(content, query.question)
+    match = await find_cached_answer(current_user.id, document_id, cache)
+    if match is not None:
+        return StreamingResponse(
+            _cached_events(
+                current_user.id,
+                document_id,
+                cached_query_data(query.question, match),
+            ),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    prompt, chunk_ids = await build_query_prompt(
+        current_user.id, document_id, content, query.question
+    )
+
+    tokens = stream_groq(prompt)
+    # Errors before the first token still get a proper status code.
+    try:
+        first = await anext(tokens)
+    except StopAsyncIteration:
+        first = ""
+    except Exception as e:
+        logger.error(f"LLM Response error: {str(e)}")
+        await tokens.aclose()
+        raise HTTPException(status_code=502, detail="LLM request failed")
+
+    return StreamingResponse(
+        _answer_events(
+            current_user.id,
+            document_id,
+            query.question,
+            chunk_ids,
+            first,
+            tokens,
+            cache,
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("/documents/upload")
 async def upload_document(
     file: UploadFile = File(...),
+    extractor: Optional[str] = Query(None),
+    mode: Literal["sync", "job"] = Query("sync"),
     current_user: User = Depends(get_current_user),
 ):
     if not file.content_type == "application/pdf" or not file.filename.endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Invalid file type. PDF only.")
+    if extractor is not None and extractor not in EXTRACTORS:
+        raise HTTPException(status_code=400, detail="Unknown PDF extractor")
 
-    contents = await file.read()
-    text = ""
-    with pdfplumber.open(BytesIO(contents)) as pdf:
-        for page in pdf.pages:
-            text += page.extract_text()
+    # The body goes to disk in chunks; extraction reads it from there.
+    spooled = await spool_upload(file)
+    if mode == "job":
+        # The job owns the spooled file from here and removes it once extracted.
+        try:
+            job = await submit_upload_job(
+                current_user.id, file.filename, spooled, extractor
+            )
+        except BaseException:
+            spooled.unlink()
+            raise
+        return JSONResponse(
+            status_code=202,
+            content={
+                "job_id": job["id"],
+                "status": job["status"],
+                "status_url": f"/jobs/{job['id']}",
+            },
+        )
 
-    cleaned_text = await clean_text_with_groq(text)
-    prompt = UPLOAD_PROMPT.format(text=cleaned_text)
+    try:
+        # Files seen before reuse their extracted text and LLM output. A specific
+        # extractor asks for a fresh run, whose output is not shared either.
+        digest = spooled.sha256 if extractor is None else None
+        shared = await get_artifacts(digest) if digest else {}
+
+        try:
+            text = await reuse_artifact(
+                digest,
+                shared,
+                "extract",
+                lambda: extract_stage(spooled.path, extractor),
+            )
+        except Exception as e:
+            logger.error(f"PDF extraction failed: {str(e)}")
+            raise HTTPException(status_code=400, detail="Could not read PDF file")
+    finally:
+        spooled.unlink()
+
+    try:
+        cleaned_text = await reuse_artifact(
+            digest, shared, "clean", lambda: clean_stage(text)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Text cleanup failed: {str(e)}")
+        raise HTTPException(status_code=502, detail="Text cleanup failed")
 
     try:
-        llm_response = await call_groq(prompt)
-        ai_json = llm_response["choices"][0]["message"]["content"]
-        ai_data = json.loads(ai_json)
+        metadata = await reuse_artifact(
+            digest, shared, "summarize", lambda: summarize_stage(cleaned_text)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500, detail=f"Document processing failed: {str(e)}"
         )
 
-    document = DocumentWithDetails(
-        id=await get_next_document_id(),
-        title=ai_data["title"],
-        subject=ai_data.get("subject", "General"),
-        content=cleaned_text,
-        summary=ai_data["summary"],
-        uploadedDate=datetime.now(ZoneInfo("Asia/Jerusalem")),
-        lastViewed=None,
-    )
-
-    await add_document_to_user(current_user.id, document.model_dump())
-    return document
+    return await store_stage(current_user.id, cleaned_text, metadata)
@@ -0,0 +1,15 @@
+from fastapi import APIRouter, Depends, HTTPException
+
+from app.schemas.user_schemas import User
+from app.services.auth import get_current_user
+from app.services.database.jobs import get_user_job
+
+router = APIRouter()
+
+
+@router.get("/jobs/{job_id}")
+async def get_upload_job(job_id: str, current_user: User = Depends(get_current_user)):
+    job = await get_user_job(current_user.id, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
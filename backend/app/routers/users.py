@@ -13,9 +13,13 @@ from app.services.auth import (
     get_current_user,
     authenticate_user,
     create_access_token,
+    principal_cache,
+    token_claims,
 )
 from app.services.database.core import get_database
 from app.services.database.user import *
+from app.services.database.documents import delete_user_documents
+from app.services.database.queries import delete_user_queries
 
 load_dotenv()
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
@@ -35,7 +39,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
         )
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data=token_claims(user), expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -64,19 +68,25 @@ async def update_user_me(
         raise HTTPException(status_code=400, detail="No valid fields to update")
 
     update_result = await update_user(current_user.id, update_data)
+    principal_cache.forget(current_user.id)
     if not update_result.modified_count:
         raise HTTPException(status_code=500, detail="Failed to update user")
 
     users_collection = await get_users_collection()
-    updated_document = await users_collection.find_one({"id": current_user.id})
+    updated_document = await users_collection.find_one(
+        {"id": current_user.id}, {"documents": 0}
+    )
     return User(**updated_document)
 
 
 @router.delete("/users/me")
 async def delete_user_me(current_user: User = Depends(get_current_user)):
     result = await delete_user(current_user.id)
+    principal_cache.forget(current_user.id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+    await delete_user_documents(current_user.id)
+    await delete_user_queries(current_user.id)
     return {"message": "User deleted successfully"}
 
 
@@ -93,14 +103,13 @@ async def register_user(user_data: dict = Body(...)):
         )
 
     user_id = str(uuid.uuid4())
-    hashed_password = get_password_hash(password)
+    hashed_password = await get_password_hash(password)
 
     user_data = {
         "id": user_id,
         "name": name,
         "email": email,
         "hashed_password": hashed_password,
-        "documents": [],
         "createdAt": datetime.now(ZoneInfo("Asia/Jerusalem")),
     }
 
@@ -22,3 +22,18 @@ class DocumentWithDetails(BaseModel):
         if value is None:
             return None
         return value.isoformat()
+
+
+class DocumentSummary(BaseModel):
+    id: int
+    title: str
+    subject: str
+    summary: str = ""
+    uploadedDate: datetime
+    lastViewed: Optional[datetime] = None
+
+    @field_serializer("uploadedDate", "lastViewed")
+    def serialize_dt(self, value):
+        if value is None:
+            return None
+        return value.isoformat()
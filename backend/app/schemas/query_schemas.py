@@ -1,11 +1,14 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
 from zoneinfo import ZoneInfo
+from typing import List
 
 
 class Query(BaseModel):
     question: str
     answer: str
+    chunks: List[int] = []
+    cached: bool = False
     timestamp: datetime = Field(
         default_factory=lambda: datetime.now(ZoneInfo("Asia/Jerusalem"))
     )
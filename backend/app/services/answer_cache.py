@@ -0,0 +1,127 @@
+import hashlib
+import os
+import re
+import struct
+import unicodedata
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
+from app.core.metrics import registry
+from app.core.tracing import span
+from app.services.database.queries import find_cached_query, list_cache_candidates
+
+load_dotenv()
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# Estimated Jaccard similarity of two questions' word shingles above which the
+# earlier answer is reused. 1 matches normalized questions only.
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.8"))
+# How many of a document's latest answers are compared for near duplicates.
+ANSWER_CACHE_CANDIDATES = int(os.getenv("ANSWER_CACHE_CANDIDATES", "50"))
+# Share of questions expected to be served from the cache; exported so alerts
+# can compare it with the lookup counters.
+ANSWER_CACHE_HIT_RATIO_TARGET = float(os.getenv("ANSWER_CACHE_HIT_RATIO_TARGET", "0.2"))
+
+# Each salted 64-byte BLAKE2b digest gives 16 of the 64 32-bit hash functions.
+# Fixed salts keep stored signatures comparable across restarts.
+MINHASH_SALTS = [bytes([number]) * 16 for number in range(4)]
+_HASHES = struct.Struct("<64I")
+
+WORD = re.compile(r"\w+")
+NUMBER = re.compile(r"^\d+$")
+
+ANSWER_CACHE_LOOKUPS = registry.counter(
+    "answer_cache_lookups_total",
+    "Questions looked up in the answer cache, by result (exact, similar, miss).",
+    ("result",),
+)
+registry.gauge(
+    "answer_cache_hit_ratio_target",
+    "Configured share of questions that should be answered from the cache.",
+).inc(ANSWER_CACHE_HIT_RATIO_TARGET)
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase words only, so case, punctuation and spacing do not matter."""
+    text = unicodedata.normalize("NFKC", question).lower()
+    return " ".join(token for token in WORD.findall(text) if token != "_")
+
+
+def minhash(normalized: str) -> List[int]:
+    """MinHash signature of the question's words and word pairs."""
+    words = normalized.split()
+    shingles = set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+    if not shingles:
+        return []
+    rows = [
+        _HASHES.unpack(
+            b"".join(
+                hashlib.blake2b(shingle.encode(), salt=salt).digest()
+                for salt in MINHASH_SALTS
+            )
+        )
+        for shingle in shingles
+    ]
+    return list(map(min, zip(*rows)))
+
+
+def similarity(first: List[int], second: List[int]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    if not first or len(first) != len(second):
+        return 0.0
+    return sum(a == b for a, b in zip(first, second)) / len(first)
+
+
+def cache_key(content: str, question: str) -> dict:
+    """What a stored answer is matched on.
+
+    The content hash ties the answer to the text it was given, so changing a
+    document's content invalidates its cached answers. The decoded text is
+    hashed, so recompressing a document keeps them.
+    """
+    normalized = normalize_question(question)
+    return {
+        "content": hashlib.sha256(content.encode()).hexdigest(),
+        "key": normalized,
+        # "chapter 2" and "chapter 3" are near duplicates with different answers.
+        "numbers": [word for word in normalized.split() if NUMBER.match(word)],
+        "minhash": minhash(normalized),
+    }
+
+
+def best_match(key: dict, candidates: List[dict]) -> Optional[dict]:
+    """The most similar candidate at or above the threshold, newest on ties."""
+    best, best_score = None, ANSWER_CACHE_SIMILARITY
+    for candidate in candidates:
+        cached = candidate.get("cache", {})
+        if cached.get("numbers") != key["numbers"]:
+            continue
+        score = similarity(key["minhash"], cached.get("minhash", []))
+        if score >= best_score and (best is None or score > best_score):
+            best, best_score = candidate, score
+    return best
+
+
+async def find_cached_answer(
+    user_id: str, document_id: int, key: dict
+) -> Optional[dict]:
+    """A stored answer to the same or a near-duplicate question, if any."""
+    if not ANSWER_CACHE_ENABLED:
+        return None
+
+    with span("query.cache"):
+        match = await find_cached_query(user_id, document_id, key)
+        result = "exact"
+        if match is None and ANSWER_CACHE_SIMILARITY < 1:
+            candidates = await list_cache_candidates(
+                user_id, document_id, key, ANSWER_CACHE_CANDIDATES
+            )
+            match = best_match(key, candidates)
+            result = "similar"
+    ANSWER_CACHE_LOOKUPS.inc(result=result if match is not None else "miss")
+    return match
@@ -1,17 +1,20 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 from typing import Optional
+import logging
 import os
+import time
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from dotenv import load_dotenv
-from app.services.database.user import get_user_by_email
+from app.services.database.user import get_user_by_email, update_user
 from app.schemas.user_schemas import *
 from app.schemas.document_schemas import *
 from app.schemas.token_schema import *
 from app.schemas.query_schemas import *
-from app.core.utils import verify_password
+from app.core.utils import get_password_hash, password_needs_rehash, verify_password
 
 
 load_dotenv()
@@ -19,7 +22,58 @@ load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+# How long another worker may keep serving a user changed or deleted elsewhere.
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+# Trust the identity claims of a verified token instead of looking the user up.
+# Changes to the user only show up in tokens issued after them.
+AUTH_STATELESS = os.getenv("AUTH_STATELESS", "false").lower() in ("1", "true", "yes")
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+logger = logging.getLogger(__name__)
+
+
+class PrincipalCache:
+    """Bounded LRU of authenticated users by token subject, with a TTL."""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, subject: str) -> Optional[User]:
+        entry = self._entries.get(subject)
+        if entry is None:
+            return None
+        expires_at, user = entry
+        if expires_at < time.monotonic():
+            del self._entries[subject]
+            return None
+        self._entries.move_to_end(subject)
+        return user
+
+    def set(self, subject: str, user: User):
+        if self.max_size <= 0:
+            return
+        self._entries[subject] = (time.monotonic() + self.ttl_seconds, user)
+        self._entries.move_to_end(subject)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def forget(self, user_id: str):
+        """Drop every cached entry of a user, whatever email it was cached under."""
+        for subject, (_, user) in list(self._entries.items()):
+            if user.id == user_id:
+                del self._entries[subject]
+
+    def clear(self):
+        self._entries.clear()
+
+
+principal_cache = PrincipalCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL_SECONDS)
 
 
 # User operations
@@ -34,8 +88,14 @@ async def authenticate_user(db, email: str, password: str):
     user = await get_user(db, email)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password(password, user.hashed_password):
         return False
+    if password_needs_rehash(user.hashed_password):
+        try:
+            user.hashed_password = await get_password_hash(password)
+            await update_user(user.id, {"hashed_password": user.hashed_password})
+        except Exception:
+            logger.exception("Failed to rehash password on login")
     return user
 
 
@@ -50,6 +110,25 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 
+def token_claims(user: User) -> dict:
+    """Claims that let a stateless deployment rebuild the user from the token."""
+    return {
+        "sub": user.email,
+        "uid": user.id,
+        "name": user.name,
+        "created": user.createdAt.isoformat(),
+    }
+
+
+def user_from_claims(payload: dict) -> User:
+    return User(
+        id=payload["uid"],
+        name=payload["name"],
+        email=payload["sub"],
+        createdAt=datetime.fromisoformat(payload["created"]),
+    )
+
+
 async def get_current_user(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -64,7 +143,14 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         token_data = TokenData(email=email)
     except JWTError:
         raise credentials_exception
-    user = await get_user(None, email=token_data.email)
+    if AUTH_STATELESS and "uid" in payload:
+        return user_from_claims(payload)
+
+    user = principal_cache.get(token_data.email)
     if user is None:
-        raise credentials_exception
+        user_in_db = await get_user(None, email=token_data.email)
+        if user_in_db is None:
+            raise credentials_exception
+        user = User(**user_in_db.model_dump(include=set(User.model_fields)))
+        principal_cache.set(token_data.email, user)
     return user
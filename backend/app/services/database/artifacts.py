@@ -0,0 +1,26 @@
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from .core import get_database
+
+
+async def get_artifacts_collection():
+    db = await get_database()
+    return db["artifacts"]
+
+
+async def get_artifacts(content_hash: str) -> dict:
+    """Derived artifacts stored for a file hash, or an empty dict."""
+    artifacts = await get_artifacts_collection()
+    return await artifacts.find_one({"hash": content_hash}, {"_id": 0}) or {}
+
+
+async def save_artifact(content_hash: str, name: str, value):
+    artifacts = await get_artifacts_collection()
+    return await artifacts.update_one(
+        {"hash": content_hash},
+        {
+            "$set": {name: value},
+            "$setOnInsert": {"createdAt": datetime.now(ZoneInfo("Asia/Jerusalem"))},
+        },
+        upsert=True,
+    )
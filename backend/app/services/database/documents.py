@@ -1,59 +1,184 @@
-import os
-from motor.motor_asyncio import AsyncIOMotorClient
 from zoneinfo import ZoneInfo
 from bson.errors import InvalidId
+from dotenv import load_dotenv
 from fastapi import HTTPException
 from datetime import datetime
-from dotenv import load_dotenv
-from .user import get_users_collection
+from typing import List, Optional, Tuple, Union
+from pymongo import ASCENDING, DESCENDING
+import asyncio
+import base64
+import json
+import os
+import zlib
+from app.services.retrieval import INDEX_VERSION
+from .core import get_database
+from .postings import (
+    delete_document_postings,
+    delete_user_postings,
+    get_document_postings,
+    save_document_postings,
+)
+from .queries import DOCUMENT_RECENT_QUERIES, get_recent_queries
 
 load_dotenv()
 
-DB_URL = os.getenv("DB_URL")
-DB_NAME = os.getenv("DB_NAME")
+# Content shorter than this is stored as a plain string; zlib saves little on it.
+DOCUMENT_COMPRESS_MIN_BYTES = int(os.getenv("DOCUMENT_COMPRESS_MIN_BYTES", "1024"))
+DOCUMENT_COMPRESS_LEVEL = int(os.getenv("DOCUMENT_COMPRESS_LEVEL", "6"))
+# First byte of compressed content. Records written before compression hold a
+# plain string, so they need no marker.
+CONTENT_ZLIB = b"\x01"
 
-client = AsyncIOMotorClient(DB_URL)
-db = client[DB_NAME]
+StoredContent = Union[str, bytes]
 
+# Fields that are never sent back to clients.
+INTERNAL_FIELDS = {"_id": 0, "user_id": 0, "chunk_index": 0}
+# What document listings return: no content, queries or index.
+SUMMARY_FIELDS = {
+    "_id": 0,
+    "id": 1,
+    "title": 1,
+    "subject": 1,
+    "summary": 1,
+    "uploadedDate": 1,
+    "lastViewed": 1,
+}
+# Listing sort orders and the date field each one pages on.
+SORT_FIELDS = {"recent": "uploadedDate", "viewed": "lastViewed"}
+ALL_SUBJECTS = "All Subjects"
 
-async def add_document_to_user(user_id: str, document_data: dict):
-    users = await get_users_collection()
-    return await users.update_one(
-        {"id": user_id}, {"$push": {"documents": document_data}}
-    )
 
+def encode_content(content: str) -> StoredContent:
+    """The form ``content`` is stored in: zlib-compressed bytes, or as is."""
+    raw = content.encode()
+    if len(raw) < DOCUMENT_COMPRESS_MIN_BYTES:
+        return content
+    return CONTENT_ZLIB + zlib.compress(raw, DOCUMENT_COMPRESS_LEVEL)
 
-async def get_user_documents(user_id: str, subject: str):
-    users = await get_users_collection()
-    user = await users.find_one({"id": user_id})
-    return user.get("documents", []) if user else []
 
+def decode_content(stored: StoredContent) -> str:
+    if isinstance(stored, str):
+        return stored
+    stored = bytes(stored)
+    if stored[:1] != CONTENT_ZLIB:
+        raise ValueError("Unknown document content format")
+    return zlib.decompress(stored[1:]).decode()
 
-async def update_document(user_id: str, document_id: int, update_data: dict):
-    users = await get_users_collection()
-    return await users.update_one(
-        {"id": user_id, "documents.id": document_id},
-        {"$set": {"documents.$": update_data}},
+
+async def get_documents_collection():
+    db = await get_database()
+    return db["documents"]
+
+
+async def ensure_document_indexes():
+    documents = await get_documents_collection()
+    await documents.create_index(
+        [("user_id", ASCENDING), ("id", ASCENDING)], unique=True
+    )
+    # Listing sorts by (field, id) for its keyset cursor, so id ends each key.
+    await documents.create_index(
+        [
+            ("user_id", ASCENDING),
+            ("subject", ASCENDING),
+            ("uploadedDate", DESCENDING),
+            ("id", DESCENDING),
+        ]
+    )
+    await documents.create_index(
+        [("user_id", ASCENDING), ("uploadedDate", DESCENDING), ("id", DESCENDING)]
+    )
+    await documents.create_index(
+        [("user_id", ASCENDING), ("lastViewed", DESCENDING), ("id", DESCENDING)]
     )
 
 
-async def update_document_last_viewed(user_id: str, document_id: int):
-    users = await get_users_collection()
-    return await users.update_one(
-        {"id": user_id, "documents.id": document_id},
-        {"$set": {"documents.$.lastViewed": datetime.now(ZoneInfo("Asia/Jerusalem"))}},
+async def add_document_to_user(user_id: str, document_data: dict):
+    documents = await get_documents_collection()
+    document_data = {**document_data, "user_id": user_id}
+    if "content" in document_data:
+        # Compressing megabytes of notes would stall the event loop.
+        document_data["content"] = await asyncio.to_thread(
+            encode_content, document_data["content"]
+        )
+    return await documents.insert_one(document_data)
+
+
+def encode_cursor(sort: str, doc: dict) -> str:
+    value = doc.get(SORT_FIELDS[sort])
+    if isinstance(value, str):
+        # Written as a string by older versions; see scripts/normalize_dates.py.
+        value = datetime.fromisoformat(value)
+    position = {"v": value.isoformat() if value else None, "id": doc["id"]}
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        value = datetime.fromisoformat(position["v"]) if position["v"] else None
+        return value, int(position["id"])
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def _after_cursor(field: str, value: Optional[datetime], document_id: int) -> dict:
+    """Match documents after ``(value, id)`` in ``(field, id)`` descending order.
+
+    Documents without a value for ``field`` sort last.
+    """
+    if value is None:
+        return {field: None, "id": {"$lt": document_id}}
+    return {
+        "$or": [
+            {field: {"$lt": value}},
+            {field: value, "id": {"$lt": document_id}},
+            {field: None},
+        ]
+    }
+
+
+async def list_user_documents(
+    user_id: str,
+    subject: Optional[str] = None,
+    sort: str = "recent",
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """List document metadata, newest first by ``sort``.
+
+    Returns the page and the cursor for the next one (``None`` on the last page).
+    """
+    field = SORT_FIELDS[sort]
+    query = {"user_id": user_id}
+    if subject and subject != ALL_SUBJECTS:
+        query["subject"] = subject
+    if cursor:
+        query.update(_after_cursor(field, *decode_cursor(cursor)))
+
+    documents = await get_documents_collection()
+    results = documents.find(query, SUMMARY_FIELDS).sort(
+        [(field, DESCENDING), ("id", DESCENDING)]
     )
+    if limit is None:
+        return await results.to_list(length=None), None
+
+    page = await results.limit(limit + 1).to_list(length=limit + 1)
+    if len(page) <= limit:
+        return page, None
+    page = page[:limit]
+    return page, encode_cursor(sort, page[-1])
 
 
-async def add_query_to_document(user_id: str, document_id: int, query_data: dict):
-    users = await get_users_collection()
-    return await users.update_one(
-        {"id": user_id, "documents.id": document_id},
-        {"$push": {"documents.$.queries": query_data}},
+async def update_document_last_viewed(user_id: str, document_id: int):
+    documents = await get_documents_collection()
+    return await documents.update_one(
+        {"user_id": user_id, "id": document_id},
+        {"$set": {"lastViewed": datetime.now(ZoneInfo("Asia/Jerusalem"))}},
     )
 
 
 async def get_next_document_id():
+    db = await get_database()
     counter_collection = db["counters"]
     counter = await counter_collection.find_one_and_update(
         {"_id": "document_id"}, {"$inc": {"seq": 1}}, upsert=True, return_document=True
@@ -61,23 +186,36 @@ async def get_next_document_id():
     return counter["seq"]
 
 
+async def document_exists(user_id: str, document_id: int) -> bool:
+    documents = await get_documents_collection()
+    doc = await documents.find_one({"user_id": user_id, "id": document_id}, {"_id": 1})
+    return doc is not None
+
+
 async def get_document(user_id: str, document_id: int):
+    """The document with its most recent queries, oldest first."""
     try:
-        users = await get_users_collection()
-        user = await users.find_one(
-            {"id": user_id, "documents.id": document_id}, {"documents.$": 1}
+        documents = await get_documents_collection()
+        # Queries embedded by older versions are capped the same way as the
+        # ones in the queries collection, which all came after them.
+        doc = await documents.find_one(
+            {"user_id": user_id, "id": document_id},
+            {**INTERNAL_FIELDS, "queries": {"$slice": -DOCUMENT_RECENT_QUERIES}},
         )
-        if not bool(user) or not user.get("documents"):
+        if not doc:
             return None
 
-        doc = user["documents"][0]
+        recent = await get_recent_queries(user_id, document_id)
+        content = await asyncio.to_thread(decode_content, doc["content"])
+        queries = (doc.get("queries", []) + recent)[-DOCUMENT_RECENT_QUERIES:]
+
         return {
             "id": doc["id"],
             "title": doc["title"],
-            "content": doc["content"],
+            "content": content,
             "subject": doc["subject"],
             "summary": doc.get("summary", ""),
-            "queries": doc.get("queries", []),
+            "queries": queries,
             "uploadedDate": doc["uploadedDate"],
             "lastViewed": datetime.now(ZoneInfo("Asia/Jerusalem")),
         }
@@ -85,11 +223,52 @@ async def get_document(user_id: str, document_id: int):
         raise HTTPException(status_code=400, detail="Invalid document ID")
 
 
-async def delete_document(user_id: str, document_id: int):
-    users = await get_users_collection()
-    result = await users.update_one(
-        {"id": user_id}, {"$pull": {"documents": {"id": document_id}}}
+async def get_stored_content(user_id: str, document_id: int) -> Optional[StoredContent]:
+    """The document's content as stored, still compressed, or ``None``."""
+    documents = await get_documents_collection()
+    doc = await documents.find_one(
+        {"user_id": user_id, "id": document_id}, {"_id": 0, "content": 1}
     )
-    if result.modified_count == 0:
+    return doc["content"] if doc else None
+
+
+async def get_document_index(user_id: str, document_id: int, terms: List[str]):
+    """The document's chunk index with the postings of ``terms`` only."""
+    documents = await get_documents_collection()
+    doc = await documents.find_one(
+        {"user_id": user_id, "id": document_id}, {"_id": 0, "chunk_index": 1}
+    )
+    index = doc.get("chunk_index") if doc else None
+    if index is None or index.get("version") != INDEX_VERSION:
+        return None
+    postings = await get_document_postings(
+        user_id, document_id, terms, index["buckets"]
+    )
+    return {**index, "postings": postings}
+
+
+async def set_document_index(user_id: str, document_id: int, index: dict):
+    """Store the chunk offsets on the document and the postings beside it."""
+    buckets = await save_document_postings(user_id, document_id, index["postings"])
+    documents = await get_documents_collection()
+    chunk_index = {key: value for key, value in index.items() if key != "postings"}
+    chunk_index["buckets"] = buckets
+    return await documents.update_one(
+        {"user_id": user_id, "id": document_id}, {"$set": {"chunk_index": chunk_index}}
+    )
+
+
+async def delete_document(user_id: str, document_id: int):
+    documents = await get_documents_collection()
+    result = await documents.delete_one({"user_id": user_id, "id": document_id})
+    if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Document not found")
+    await delete_document_postings(user_id, document_id)
+    return result
+
+
+async def delete_user_documents(user_id: str):
+    documents = await get_documents_collection()
+    result = await documents.delete_many({"user_id": user_id})
+    await delete_user_postings(user_id)
     return result
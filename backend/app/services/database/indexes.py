@@ -0,0 +1,29 @@
+import logging
+from pymongo import ASCENDING
+from .artifacts import get_artifacts_collection
+from .documents import ensure_document_indexes
+from .jobs import get_jobs_collection
+from .postings import ensure_postings_indexes
+from .queries import ensure_query_indexes
+from .user import get_users_collection
+
+logger = logging.getLogger(__name__)
+
+
+async def ensure_indexes():
+    """Create every index the backend relies on. Existing indexes are left as is."""
+    users = await get_users_collection()
+    await users.create_index([("email", ASCENDING)], unique=True)
+    await users.create_index([("id", ASCENDING)], unique=True)
+
+    await ensure_document_indexes()
+    await ensure_query_indexes()
+    await ensure_postings_indexes()
+
+    jobs = await get_jobs_collection()
+    await jobs.create_index([("id", ASCENDING)], unique=True)
+    await jobs.create_index([("status", ASCENDING), ("lease_until", ASCENDING)])
+
+    artifacts = await get_artifacts_collection()
+    await artifacts.create_index([("hash", ASCENDING)], unique=True)
+    logger.info("Database indexes are in place")
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+from typing import List, Optional
+from .core import get_database
+
+ACTIVE_STATUSES = ["queued", "running"]
+
+
+async def get_jobs_collection():
+    db = await get_database()
+    return db["jobs"]
+
+
+async def create_job(job_data: dict):
+    jobs = await get_jobs_collection()
+    return await jobs.insert_one(job_data)
+
+
+async def get_user_job(user_id: str, job_id: str):
+    jobs = await get_jobs_collection()
+    return await jobs.find_one(
+        {"id": job_id, "user_id": user_id},
+        {"_id": 0, "file": 0, "file_path": 0, "artifacts": 0, "lease_until": 0},
+    )
+
+
+async def update_job(job_id: str, update_data: dict, unset: Optional[List[str]] = None):
+    jobs = await get_jobs_collection()
+    update = {
+        "$set": {**update_data, "updatedAt": datetime.now(ZoneInfo("Asia/Jerusalem"))}
+    }
+    if unset:
+        update["$unset"] = {field: "" for field in unset}
+    return await jobs.update_one({"id": job_id}, update)
+
+
+async def claim_job(job_id: str, lease_seconds: int):
+    """Take the lease on an active job, unless another worker holds it."""
+    jobs = await get_jobs_collection()
+    now = datetime.now(ZoneInfo("Asia/Jerusalem"))
+    return await jobs.find_one_and_update(
+        {
+            "id": job_id,
+            "status": {"$in": ACTIVE_STATUSES},
+            "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}],
+        },
+        {
+            "$set": {
+                "status": "running",
+                "lease_until": now + timedelta(seconds=lease_seconds),
+                "updatedAt": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        return_document=True,
+    )
+
+
+async def renew_job_lease(job_id: str, lease_seconds: int):
+    """Extend the lease of a running job; finished or requeued jobs keep theirs."""
+    jobs = await get_jobs_collection()
+    now = datetime.now(ZoneInfo("Asia/Jerusalem"))
+    return await jobs.update_one(
+        {"id": job_id, "status": "running"},
+        {"$set": {"lease_until": now + timedelta(seconds=lease_seconds)}},
+    )
+
+
+async def get_resumable_job_ids() -> List[str]:
+    """Ids of unfinished jobs that no live worker holds a lease on."""
+    jobs = await get_jobs_collection()
+    now = datetime.now(ZoneInfo("Asia/Jerusalem"))
+    cursor = jobs.find(
+        {
+            "status": {"$in": ACTIVE_STATUSES},
+            "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}],
+        },
+        {"id": 1},
+    ).sort("createdAt", 1)
+    return [job["id"] async for job in cursor]
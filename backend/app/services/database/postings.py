@@ -0,0 +1,128 @@
+from typing import Dict, List, Tuple
+from pymongo import ASCENDING
+from pymongo.errors import BulkWriteError
+import struct
+import zlib
+from .core import get_database
+
+DUPLICATE_KEY = 11000
+# Terms are grouped into records of about this many, so a query reads a few
+# small records instead of the whole index, without paying Mongo's per-record
+# overhead for every term.
+TERMS_PER_BUCKET = 64
+# Chunk ids and counts are stored as little-endian uint16 pairs.
+MAX_POSTING_VALUE = 0xFFFF
+
+Postings = Dict[str, Tuple[List[int], List[int]]]
+
+
+async def get_postings_collection():
+    db = await get_database()
+    return db["postings"]
+
+
+async def ensure_postings_indexes():
+    postings = await get_postings_collection()
+    await postings.create_index(
+        [("user_id", ASCENDING), ("document_id", ASCENDING), ("bucket", ASCENDING)],
+        unique=True,
+    )
+
+
+def bucket_count(term_count: int) -> int:
+    return max(1, term_count // TERMS_PER_BUCKET)
+
+
+def term_bucket(term: str, buckets: int) -> int:
+    return zlib.crc32(term.encode()) % buckets
+
+
+def pack_postings(chunk_ids: List[int], counts: List[int]) -> bytes:
+    values = []
+    for chunk_id, count in zip(chunk_ids, counts):
+        if chunk_id > MAX_POSTING_VALUE:
+            raise ValueError("Too many chunks to index")
+        # BM25 saturates long before this, so clamping changes no ranking.
+        values += [chunk_id, min(count, MAX_POSTING_VALUE)]
+    return struct.pack(f"<{len(values)}H", *values)
+
+
+def unpack_postings(data: bytes) -> Tuple[List[int], List[int]]:
+    values = struct.unpack(f"<{len(data) // 2}H", data)
+    return list(values[0::2]), list(values[1::2])
+
+
+def postings_records(
+    user_id: str, document_id: int, postings: Postings
+) -> Tuple[int, List[dict]]:
+    """The bucket count and the records that store ``postings``."""
+    buckets = bucket_count(len(postings))
+    grouped: Dict[int, dict] = {}
+    for term, (chunk_ids, counts) in postings.items():
+        terms = grouped.setdefault(term_bucket(term, buckets), {})
+        terms[term] = pack_postings(chunk_ids, counts)
+    records = [
+        {
+            "user_id": user_id,
+            "document_id": document_id,
+            "bucket": bucket,
+            "terms": terms,
+        }
+        for bucket, terms in grouped.items()
+    ]
+    return buckets, records
+
+
+async def save_document_postings(
+    user_id: str, document_id: int, postings: Postings
+) -> int:
+    """Store the postings, replacing any earlier index of the document.
+
+    Returns the number of buckets, which readers need to find a term.
+    """
+    buckets, records = postings_records(user_id, document_id, postings)
+    collection = await get_postings_collection()
+    await collection.delete_many({"user_id": user_id, "document_id": document_id})
+    if not records:
+        return buckets
+    try:
+        await collection.insert_many(records, ordered=False)
+    except BulkWriteError as e:
+        # A concurrent rebuild from the same content wrote the same records.
+        if any(error["code"] != DUPLICATE_KEY for error in e.details["writeErrors"]):
+            raise
+    return buckets
+
+
+async def get_document_postings(
+    user_id: str, document_id: int, terms: List[str], buckets: int
+) -> Postings:
+    """The postings of ``terms`` only; terms not in the document are left out."""
+    if not terms:
+        return {}
+    collection = await get_postings_collection()
+    cursor = collection.find(
+        {
+            "user_id": user_id,
+            "document_id": document_id,
+            "bucket": {"$in": sorted({term_bucket(term, buckets) for term in terms})},
+        },
+        {"_id": 0, **{f"terms.{term}": 1 for term in terms}},
+    )
+    postings = {}
+    async for record in cursor:
+        for term, data in record.get("terms", {}).items():
+            postings[term] = unpack_postings(bytes(data))
+    return postings
+
+
+async def delete_document_postings(user_id: str, document_id: int):
+    collection = await get_postings_collection()
+    return await collection.delete_many(
+        {"user_id": user_id, "document_id": document_id}
+    )
+
+
+async def delete_user_postings(user_id: str):
+    collection = await get_postings_collection()
+    return await collection.delete_many({"user_id": user_id})
@@ -0,0 +1,132 @@
+from bson import ObjectId
+from bson.errors import InvalidId
+from dotenv import load_dotenv
+from typing import List, Optional, Tuple
+from pymongo import ASCENDING, DESCENDING
+import os
+from .core import get_database
+
+load_dotenv()
+
+# Queries shown with a document; older ones are paged from its queries route.
+DOCUMENT_RECENT_QUERIES = int(os.getenv("DOCUMENT_RECENT_QUERIES", "20"))
+
+# Fields that are never sent back to clients.
+QUERY_INTERNAL_FIELDS = {"user_id": 0, "document_id": 0, "cache": 0}
+# What a cache hit needs from the stored query.
+CACHED_ANSWER_FIELDS = {"answer": 1, "chunks": 1, "cache": 1}
+
+
+async def get_queries_collection():
+    db = await get_database()
+    return db["queries"]
+
+
+async def ensure_query_indexes():
+    queries = await get_queries_collection()
+    # _id grows with insertion time, so it orders a document's history.
+    await queries.create_index(
+        [("user_id", ASCENDING), ("document_id", ASCENDING), ("_id", DESCENDING)]
+    )
+    await queries.create_index(
+        [("user_id", ASCENDING), ("document_id", ASCENDING), ("cache.key", ASCENDING)]
+    )
+
+
+async def add_query_to_document(
+    user_id: str, document_id: int, query_data: dict, cache: Optional[dict] = None
+):
+    """Save a query. ``cache`` makes its answer reusable for similar questions."""
+    queries = await get_queries_collection()
+    # A copy, so the caller's dict does not gain an ObjectId.
+    query = {**query_data, "user_id": user_id, "document_id": document_id}
+    if cache is not None:
+        query["cache"] = cache
+    return await queries.insert_one(query)
+
+
+async def find_cached_query(user_id: str, document_id: int, cache: dict):
+    """The latest answer to the same normalized question about the same content."""
+    queries = await get_queries_collection()
+    return await queries.find_one(
+        {
+            "user_id": user_id,
+            "document_id": document_id,
+            "cache.key": cache["key"],
+            "cache.content": cache["content"],
+        },
+        CACHED_ANSWER_FIELDS,
+        sort=[("_id", DESCENDING)],
+    )
+
+
+async def list_cache_candidates(
+    user_id: str, document_id: int, cache: dict, limit: int
+) -> List[dict]:
+    """The latest cacheable answers about the same content, newest first."""
+    queries = await get_queries_collection()
+    cursor = (
+        queries.find(
+            {
+                "user_id": user_id,
+                "document_id": document_id,
+                "cache.content": cache["content"],
+            },
+            CACHED_ANSWER_FIELDS,
+        )
+        .sort("_id", DESCENDING)
+        .limit(limit)
+    )
+    return await cursor.to_list(length=limit)
+
+
+def _public(query: dict) -> dict:
+    return {key: value for key, value in query.items() if key != "_id"}
+
+
+async def get_recent_queries(
+    user_id: str, document_id: int, limit: int = DOCUMENT_RECENT_QUERIES
+) -> List[dict]:
+    """The latest ``limit`` queries of a document, oldest first."""
+    queries = await get_queries_collection()
+    cursor = (
+        queries.find(
+            {"user_id": user_id, "document_id": document_id}, QUERY_INTERNAL_FIELDS
+        )
+        .sort("_id", DESCENDING)
+        .limit(limit)
+    )
+    recent = await cursor.to_list(length=limit)
+    return [_public(query) for query in reversed(recent)]
+
+
+async def list_document_queries(
+    user_id: str, document_id: int, limit: int, cursor: Optional[str] = None
+) -> Tuple[List[dict], Optional[str]]:
+    """A page of a document's queries, newest first.
+
+    Returns the page and the cursor for the next, older one (``None`` on the
+    last page).
+    """
+    query = {"user_id": user_id, "document_id": document_id}
+    if cursor:
+        try:
+            query["_id"] = {"$lt": ObjectId(cursor)}
+        except (InvalidId, TypeError):
+            raise ValueError("Invalid cursor")
+
+    queries = await get_queries_collection()
+    results = queries.find(query, QUERY_INTERNAL_FIELDS).sort("_id", DESCENDING)
+    page = await results.limit(limit + 1).to_list(length=limit + 1)
+    next_cursor = str(page[limit - 1]["_id"]) if len(page) > limit else None
+    return [_public(query) for query in page[:limit]], next_cursor
+
+
+async def delete_document_queries(user_id: str, document_id: int):
+    queries = await get_queries_collection()
+    return await queries.delete_many({"user_id": user_id, "document_id": document_id})
+
+
+async def delete_user_queries(user_id: str):
+    queries = await get_queries_collection()
+    return await queries.delete_many({"user_id": user_id})
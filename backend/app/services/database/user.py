@@ -1,23 +1,15 @@
-import os
-from motor.motor_asyncio import AsyncIOMotorClient
-from dotenv import load_dotenv
-
-load_dotenv()
-
-DB_URL = os.getenv("DB_URL")
-DB_NAME = os.getenv("DB_NAME")
-
-client = AsyncIOMotorClient(DB_URL)
-db = client[DB_NAME]
+from .core import get_database
 
 
 async def get_users_collection():
+    db = await get_database()
     return db["users"]
 
 
 async def get_user_by_email(email: str):
     users = await get_users_collection()
-    return await users.find_one({"email": email})
+    # Documents live in their own collection; skip any not yet migrated.
+    return await users.find_one({"email": email}, {"documents": 0})
 
 
 async def create_user(user_data):
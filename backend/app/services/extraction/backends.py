@@ -0,0 +1,101 @@
+import logging
+import os
+from io import BytesIO
+from typing import Dict, List, Sequence, Union
+
+import pdfplumber
+import pymupdf
+from PyPDF2 import PdfReader
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logging.getLogger("pdfplumber").setLevel(logging.ERROR)
+logging.getLogger("pdfminer").setLevel(logging.ERROR)
+logging.getLogger("PyPDF2").setLevel(logging.ERROR)
+
+PDF_EXTRACTOR = os.getenv("PDF_EXTRACTOR", "pymupdf")
+# Re-extracts pages the primary backend returned empty; set to "" to disable.
+PDF_FALLBACK_EXTRACTOR = os.getenv("PDF_FALLBACK_EXTRACTOR", "pdfplumber")
+
+# The PDF itself, or the path of a file holding it. A path lets each backend
+# read the file directly instead of holding (and pickling) a bytes copy.
+PdfSource = Union[bytes, str]
+
+
+def _as_file(source: PdfSource):
+    return BytesIO(source) if isinstance(source, bytes) else source
+
+
+class PdfExtractor:
+    """Extracts plain text from a PDF, one string per requested page."""
+
+    name: str = ""
+
+    def count_pages(self, source: PdfSource) -> int:
+        raise NotImplementedError
+
+    def extract_pages(self, source: PdfSource, pages: Sequence[int]) -> List[str]:
+        raise NotImplementedError
+
+
+class PyMuPdfExtractor(PdfExtractor):
+    name = "pymupdf"
+
+    @staticmethod
+    def _open(source: PdfSource):
+        if isinstance(source, bytes):
+            return pymupdf.open(stream=source, filetype="pdf")
+        return pymupdf.open(source, filetype="pdf")
+
+    def count_pages(self, source: PdfSource) -> int:
+        with self._open(source) as pdf:
+            return pdf.page_count
+
+    def extract_pages(self, source: PdfSource, pages: Sequence[int]) -> List[str]:
+        with self._open(source) as pdf:
+            return [pdf[number].get_text().strip() for number in pages]
+
+
+class PdfPlumberExtractor(PdfExtractor):
+    name = "pdfplumber"
+
+    def count_pages(self, source: PdfSource) -> int:
+        with pdfplumber.open(_as_file(source)) as pdf:
+            return len(pdf.pages)
+
+    def extract_pages(self, source: PdfSource, pages: Sequence[int]) -> List[str]:
+        # pdfplumber yields the selected pages in document order.
+        page_numbers = sorted({number + 1 for number in pages})
+        with pdfplumber.open(_as_file(source), pages=page_numbers) as pdf:
+            texts = {
+                page.page_number - 1: (page.extract_text() or "").strip()
+                for page in pdf.pages
+            }
+        return [texts[number] for number in pages]
+
+
+class PyPdfExtractor(PdfExtractor):
+    name = "pypdf"
+
+    def count_pages(self, source: PdfSource) -> int:
+        return len(PdfReader(_as_file(source)).pages)
+
+    def extract_pages(self, source: PdfSource, pages: Sequence[int]) -> List[str]:
+        reader = PdfReader(_as_file(source))
+        return [(reader.pages[number].extract_text() or "").strip() for number in pages]
+
+
+EXTRACTORS: Dict[str, PdfExtractor] = {
+    extractor.name: extractor
+    for extractor in (PyMuPdfExtractor(), PdfPlumberExtractor(), PyPdfExtractor())
+}
+
+
+def get_extractor(name: str) -> PdfExtractor:
+    try:
+        return EXTRACTORS[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown PDF extractor '{name}'. Available: {', '.join(EXTRACTORS)}"
+        )
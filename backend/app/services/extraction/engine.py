@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import math
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+from app.services.extraction.backends import (
+    PDF_EXTRACTOR,
+    PDF_FALLBACK_EXTRACTOR,
+    PdfSource,
+    get_extractor,
+)
+
+load_dotenv()
+
+# 0 disables the process pool and runs extraction on a worker thread instead.
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", os.cpu_count() or 1))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+PDF_EXTRACT_START_METHOD = os.getenv("PDF_EXTRACT_START_METHOD", "spawn")
+
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def count_pages(source: PdfSource, extractor: str = PDF_EXTRACTOR) -> int:
+    return get_extractor(extractor).count_pages(source)
+
+
+def extract_page_range(
+    source: PdfSource,
+    start: int,
+    end: int,
+    extractor: str = PDF_EXTRACTOR,
+    fallback: Optional[str] = PDF_FALLBACK_EXTRACTOR,
+) -> List[str]:
+    """Extract the text of pages ``[start, end)`` (0-based), one entry per page.
+
+    Pages the primary extractor returns empty are retried with ``fallback``.
+    """
+    pages = get_extractor(extractor).extract_pages(source, range(start, end))
+    empty = [index for index, text in enumerate(pages) if not text.strip()]
+    if empty and fallback and fallback != extractor:
+        retried = get_extractor(fallback).extract_pages(
+            source, [start + index for index in empty]
+        )
+        for index, text in zip(empty, retried):
+            pages[index] = text
+    return pages
+
+
+def split_page_ranges(
+    page_count: int, workers: int, pages_per_task: int = PDF_PAGES_PER_TASK
+) -> List[Tuple[int, int]]:
+    if page_count <= 0:
+        return []
+    size = math.ceil(page_count / max(workers, 1))
+    size = max(1, min(size, pages_per_task))
+    return [
+        (start, min(start + size, page_count)) for start in range(0, page_count, size)
+    ]
+
+
+def start_extraction_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+    if _pool is None and PDF_EXTRACT_WORKERS > 0:
+        context = multiprocessing.get_context(PDF_EXTRACT_START_METHOD)
+        _pool = ProcessPoolExecutor(max_workers=PDF_EXTRACT_WORKERS, mp_context=context)
+        logger.info(f"Started PDF extraction pool with {PDF_EXTRACT_WORKERS} workers")
+    return _pool
+
+
+def shutdown_extraction_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+
+
+async def extract_pdf_pages(
+    source: PdfSource, extractor: Optional[str] = None
+) -> List[str]:
+    """Extract every page of a PDF off the event loop, returned in page order.
+
+    Pass a file path for large uploads: workers then open the file themselves
+    rather than each receiving a copy of the bytes.
+    """
+    extractor = extractor or PDF_EXTRACTOR
+    loop = asyncio.get_running_loop()
+    pool: Optional[Executor] = start_extraction_pool()
+
+    page_count = await loop.run_in_executor(pool, count_pages, source, extractor)
+    ranges = split_page_ranges(page_count, PDF_EXTRACT_WORKERS)
+    results = await asyncio.gather(
+        *(
+            loop.run_in_executor(
+                pool,
+                extract_page_range,
+                source,
+                start,
+                end,
+                extractor,
+                PDF_FALLBACK_EXTRACTOR,
+            )
+            for start, end in ranges
+        )
+    )
+    return [page for pages in results for page in pages]
+
+
+async def extract_pdf_text(source: PdfSource, extractor: Optional[str] = None) -> str:
+    # Pages are separated by a form feed, the same page break pdfminer emits.
+    return "\f".join(await extract_pdf_pages(source, extractor))
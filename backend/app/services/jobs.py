@@ -0,0 +1,312 @@
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional, Set
+from zoneinfo import ZoneInfo
+
+import httpx
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from app.core.tracing import span, trace_headers
+from app.llm.groq import GROQ_JOB_CLEANUP_DEADLINE
+from app.services.database.artifacts import get_artifacts
+from app.services.database.documents import get_next_document_id
+from app.services.database.jobs import (
+    claim_job,
+    create_job,
+    get_resumable_job_ids,
+    renew_job_lease,
+    update_job,
+)
+from app.services.extraction.backends import PdfSource
+from app.services.pipeline import (
+    STAGES,
+    clean_stage,
+    extract_stage,
+    reuse_artifact,
+    store_stage,
+    summarize_stage,
+)
+from app.services.uploads import SpooledUpload, remove_spooled_file
+
+load_dotenv()
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# A worker renews its lease every JOB_HEARTBEAT_SECONDS while it runs a job; a
+# lease left to expire means the worker died and the job may be resumed by
+# anyone, so a job interrupted by a restart is picked up within about
+# JOB_LEASE_SECONDS + JOB_SWEEP_SECONDS.
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "60"))
+JOB_HEARTBEAT_SECONDS = int(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+JOB_SWEEP_SECONDS = int(os.getenv("JOB_SWEEP_SECONDS", "30"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_SECONDS = int(os.getenv("JOB_RETRY_SECONDS", "30"))
+# Client errors worth another attempt: timeouts and rate limits.
+TRANSIENT_CLIENT_STATUSES = {408, 429}
+
+logger = logging.getLogger(__name__)
+
+_queue: Optional[asyncio.Queue] = None
+_queued: Set[str] = set()
+_tasks: List[asyncio.Task] = []
+
+
+def _now():
+    return datetime.now(ZoneInfo("Asia/Jerusalem"))
+
+
+async def submit_upload_job(
+    user_id: str,
+    filename: str,
+    upload: SpooledUpload,
+    extractor: Optional[str] = None,
+) -> dict:
+    """Queue the spooled upload for processing.
+
+    The job keeps the spooled file's path, not its contents; the file is
+    removed once its text has been extracted or the job has failed.
+    """
+    job = {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "filename": filename,
+        "extractor": extractor,
+        "status": "queued",
+        "stages": {stage: {"status": "pending"} for stage in STAGES},
+        "file_path": upload.path,
+        "content_hash": upload.sha256,
+        # Job stages join the trace of the upload request that created them.
+        "traceparent": trace_headers().get("traceparent"),
+        "artifacts": {},
+        "document_id": None,
+        "error": None,
+        "attempts": 0,
+        "lease_until": None,
+        "createdAt": _now(),
+        "updatedAt": _now(),
+    }
+    await create_job(job)
+    enqueue_job(job["id"])
+    return job
+
+
+def enqueue_job(job_id: str):
+    if _queue is None or job_id in _queued:
+        return
+    _queued.add(job_id)
+    _queue.put_nowait(job_id)
+
+
+def _job_file(job: dict) -> PdfSource:
+    # Jobs queued before uploads were kept on disk carry the PDF itself.
+    if job.get("file_path") is None and job.get("file") is not None:
+        return bytes(job["file"])
+    if not os.path.exists(job["file_path"]):
+        # Not retried: the file will not come back.
+        raise FileNotFoundError(
+            "The uploaded file is gone, probably lost in a restart; is "
+            "UPLOAD_SPOOL_DIR on persistent storage? Please upload it again."
+        )
+    return job["file_path"]
+
+
+def _remove_job_file(job: dict):
+    if job.get("file_path"):
+        remove_spooled_file(job["file_path"])
+
+
+async def _run_stage(job: dict, stage: str, shared: dict):
+    artifacts = job["artifacts"]
+    # A specific extractor's output is neither reused nor shared.
+    digest = None if job["extractor"] else job.get("content_hash")
+    if stage == "extract":
+        artifacts["text"] = await reuse_artifact(
+            digest,
+            shared,
+            stage,
+            lambda: extract_stage(_job_file(job), job["extractor"]),
+        )
+        return {"artifacts.text": artifacts["text"]}, ["file_path", "file"]
+    if stage == "clean":
+        artifacts["cleaned"] = await reuse_artifact(
+            digest,
+            shared,
+            stage,
+            # Nobody waits on a job, so it may take longer than an upload request.
+            lambda: clean_stage(artifacts["text"], deadline=GROQ_JOB_CLEANUP_DEADLINE),
+        )
+        return {"artifacts.cleaned": artifacts["cleaned"]}, ["artifacts.text"]
+    if stage == "summarize":
+        artifacts["metadata"] = await reuse_artifact(
+            digest, shared, stage, lambda: summarize_stage(artifacts["cleaned"])
+        )
+        return {"artifacts.metadata": artifacts["metadata"]}, []
+    if stage == "store":
+        document = await store_stage(
+            job["user_id"],
+            artifacts["cleaned"],
+            artifacts["metadata"],
+            job["document_id"],
+        )
+        return {"document_id": document.id}, ["artifacts.cleaned"]
+    raise ValueError(f"Unknown stage {stage}")
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Whether another attempt could succeed; client errors and lost uploads recur."""
+    if isinstance(error, FileNotFoundError):
+        return False
+    if isinstance(error, HTTPException):
+        status = error.status_code
+    elif isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+    else:
+        return True
+    return status >= 500 or status in TRANSIENT_CLIENT_STATUSES
+
+
+async def _heartbeat(job_id: str):
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+        try:
+            await renew_job_lease(job_id, JOB_LEASE_SECONDS)
+        except Exception:
+            logger.exception(f"Failed to renew the lease of upload job {job_id}")
+
+
+async def run_job(job_id: str):
+    """Run the remaining stages of a job, checkpointing after each one.
+
+    The lease is renewed in the background for as long as the job runs.
+    """
+    job = await claim_job(job_id, JOB_LEASE_SECONDS)
+    if not job:
+        return
+    heartbeat = asyncio.create_task(_heartbeat(job_id))
+    try:
+        await _run_claimed_job(job_id, job)
+    finally:
+        heartbeat.cancel()
+
+
+async def _run_claimed_job(job_id: str, job: dict):
+    if job["attempts"] > JOB_MAX_ATTEMPTS:
+        await update_job(
+            job_id,
+            {"status": "failed", "error": "Too many attempts", "lease_until": None},
+        )
+        _remove_job_file(job)
+        return
+
+    # A specific extractor asks for a fresh extraction, so nothing is reused.
+    shared = {}
+    if job.get("content_hash") and not job["extractor"]:
+        shared = await get_artifacts(job["content_hash"])
+
+    for stage in STAGES:
+        if job["stages"][stage]["status"] == "completed":
+            continue
+        if stage == "store" and job["document_id"] is None:
+            # Reserve the id first so a restart during the write cannot
+            # store the document twice.
+            job["document_id"] = await get_next_document_id()
+            await update_job(job_id, {"document_id": job["document_id"]})
+
+        await update_job(
+            job_id,
+            {
+                f"stages.{stage}.status": "running",
+                f"stages.{stage}.startedAt": _now(),
+            },
+        )
+        try:
+            with span(
+                f"job.{stage}", traceparent=job.get("traceparent"), job_id=job_id
+            ):
+                checkpoint, unset = await _run_stage(job, stage, shared)
+        except Exception as e:
+            logger.exception(f"Upload job {job_id} failed in stage {stage}")
+            retry = job["attempts"] < JOB_MAX_ATTEMPTS and _is_retryable(e)
+            # A retried job keeps a lease for the backoff period, after which the
+            # sweeper picks it up again.
+            await update_job(
+                job_id,
+                {
+                    "status": "queued" if retry else "failed",
+                    "error": f"{stage} failed: {str(e)}",
+                    f"stages.{stage}.status": "pending" if retry else "failed",
+                    f"stages.{stage}.finishedAt": _now(),
+                    "lease_until": (
+                        _now() + timedelta(seconds=JOB_RETRY_SECONDS * job["attempts"])
+                        if retry
+                        else None
+                    ),
+                },
+            )
+            if not retry:
+                _remove_job_file(job)
+            return
+
+        job["stages"][stage]["status"] = "completed"
+        await update_job(
+            job_id,
+            {
+                **checkpoint,
+                f"stages.{stage}.status": "completed",
+                f"stages.{stage}.finishedAt": _now(),
+            },
+            unset=unset,
+        )
+        if stage == "extract":
+            # The text is checkpointed, so the upload is no longer needed.
+            _remove_job_file(job)
+
+    await update_job(
+        job_id, {"status": "completed", "error": None, "lease_until": None}
+    )
+
+
+async def _worker():
+    while True:
+        job_id = await _queue.get()
+        try:
+            await run_job(job_id)
+        except Exception:
+            logger.exception(f"Upload job {job_id} crashed")
+        finally:
+            _queued.discard(job_id)
+            _queue.task_done()
+
+
+async def _sweeper():
+    # Picks up jobs left behind by a restart or by a worker that died.
+    while True:
+        try:
+            for job_id in await get_resumable_job_ids():
+                enqueue_job(job_id)
+        except Exception:
+            logger.exception("Failed to scan for resumable upload jobs")
+        await asyncio.sleep(JOB_SWEEP_SECONDS)
+
+
+def start_job_workers():
+    global _queue
+    if _queue is not None or JOB_WORKERS <= 0:
+        return
+    _queue = asyncio.Queue()
+    _tasks.extend(asyncio.create_task(_worker()) for _ in range(JOB_WORKERS))
+    _tasks.append(asyncio.create_task(_sweeper()))
+    logger.info(f"Started {JOB_WORKERS} upload job workers")
+
+
+async def stop_job_workers():
+    global _queue
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+    _queued.clear()
+    _queue = None
@@ -0,0 +1,122 @@
+import asyncio
+import json
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+from zoneinfo import ZoneInfo
+
+from app.core.metrics import registry
+from app.core.tracing import span
+from app.llm.groq import GROQ_METADATA_TIMEOUT, call_groq, clean_text_with_groq
+from app.llm.prompts import UPLOAD_PROMPT
+from app.schemas.document_schemas import DocumentWithDetails
+from app.services.database.artifacts import save_artifact
+from app.services.database.documents import (
+    add_document_to_user,
+    document_exists,
+    get_next_document_id,
+    set_document_index,
+)
+from app.services.extraction.backends import PdfSource
+from app.services.extraction.engine import extract_pdf_text
+from app.services.retrieval import build_index
+
+# Upload processing, in order. Each stage's output feeds the next one.
+STAGES = ["extract", "clean", "summarize", "store"]
+# Stage outputs that depend only on the file, shared by every upload of it.
+ARTIFACTS = {"extract": "text", "clean": "cleaned", "summarize": "metadata"}
+
+UPLOAD_STAGE_SECONDS = registry.histogram(
+    "upload_stage_duration_seconds",
+    "Time spent in each upload stage that actually ran.",
+    ("stage",),
+)
+UPLOAD_STAGE_REUSED = registry.counter(
+    "upload_stage_reused_total",
+    "Upload stages skipped because the file's artifact was already stored.",
+    ("stage",),
+)
+
+
+@contextmanager
+def _timed_stage(stage: str):
+    with span(f"upload.{stage}"), UPLOAD_STAGE_SECONDS.time(stage=stage):
+        yield
+
+
+async def reuse_artifact(
+    digest: Optional[str],
+    shared: dict,
+    stage: str,
+    run: Callable[[], Awaitable],
+):
+    """Return the stored output of ``stage`` for this file, running it if missing.
+
+    Artifacts hold no user data, so one user's upload can serve another's.
+    Without a ``digest`` the stage just runs and nothing is saved.
+    """
+    name = ARTIFACTS[stage]
+    if shared.get(name) is not None:
+        UPLOAD_STAGE_REUSED.inc(stage=stage)
+        return shared[name]
+    value = await run()
+    if digest:
+        await save_artifact(digest, name, value)
+    return value
+
+
+async def extract_stage(source: PdfSource, extractor: Optional[str] = None) -> str:
+    with _timed_stage("extract"):
+        return await extract_pdf_text(source, extractor)
+
+
+async def clean_stage(text: str, deadline: Optional[float] = None) -> str:
+    with _timed_stage("clean"):
+        return await clean_text_with_groq(text, deadline=deadline)
+
+
+async def summarize_stage(cleaned_text: str) -> dict:
+    with _timed_stage("summarize"):
+        llm_response = await call_groq(
+            UPLOAD_PROMPT.format(text=cleaned_text),
+            task="metadata",
+            timeout=GROQ_METADATA_TIMEOUT,
+            priority="bulk",
+        )
+    ai_json = llm_response["choices"][0]["message"]["content"]
+    ai_data = json.loads(ai_json)
+    return {
+        "title": ai_data["title"],
+        "subject": ai_data.get("subject", "General"),
+        "summary": ai_data["summary"],
+    }
+
+
+async def store_stage(
+    user_id: str,
+    cleaned_text: str,
+    metadata: dict,
+    document_id: Optional[int] = None,
+) -> DocumentWithDetails:
+    """Save the document for the user.
+
+    Passing a previously allocated ``document_id`` makes the stage safe to
+    repeat: an already stored document is not pushed a second time.
+    """
+    with _timed_stage("store"):
+        document = DocumentWithDetails(
+            id=document_id or await get_next_document_id(),
+            title=metadata["title"],
+            subject=metadata["subject"],
+            content=cleaned_text,
+            summary=metadata["summary"],
+            uploadedDate=datetime.now(ZoneInfo("Asia/Jerusalem")),
+            lastViewed=None,
+        )
+        if document_id is None or not await document_exists(user_id, document_id):
+            # dict() keeps the datetimes; model_dump() would store ISO strings,
+            # which neither sort nor page like dates in Mongo.
+            await add_document_to_user(user_id, dict(document))
+            index = await asyncio.to_thread(build_index, cleaned_text)
+            await set_document_index(user_id, document.id, index)
+        return document
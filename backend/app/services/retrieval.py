@@ -0,0 +1,145 @@
+import math
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+RETRIEVAL_CHUNK_WORDS = int(os.getenv("RETRIEVAL_CHUNK_WORDS", "200"))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "4"))
+BM25_K1 = 1.5
+BM25_B = 0.75
+INDEX_VERSION = 2
+
+TOKEN = re.compile(r"\w+")
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+# fmt: off
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "do", "does", "for", "from",
+    "how", "in", "is", "it", "of", "on", "or", "that", "the", "this", "to", "was",
+    "what", "when", "where", "which", "who", "why", "with",
+}
+# fmt: on
+
+
+def tokenize(text: str) -> List[str]:
+    return [
+        token
+        for token in TOKEN.findall(text.lower())
+        if token not in STOPWORDS and token != "_"
+    ]
+
+
+def chunk_spans(
+    content: str, chunk_words: int = RETRIEVAL_CHUNK_WORDS
+) -> List[Tuple[int, int]]:
+    """Group paragraphs into chunks of roughly ``chunk_words`` words.
+
+    Chunks are ``(start, end)`` offsets into ``content``. A Markdown heading
+    starts a new chunk once the current one is half full, so sections tend to
+    stay together with their title.
+    """
+    spans: List[Tuple[int, int]] = []
+    start = end = None
+    words = 0
+    position = 0
+    for separator in [*PARAGRAPH_BREAK.finditer(content), None]:
+        stop = separator.start() if separator else len(content)
+        paragraph = content[position:stop]
+        stripped = paragraph.strip()
+        if stripped:
+            first = position + paragraph.index(stripped[0])
+            length = len(stripped.split())
+            heading = stripped.startswith("#")
+            if start is not None and (
+                words + length > chunk_words or (heading and words >= chunk_words // 2)
+            ):
+                spans.append((start, end))
+                start, words = None, 0
+            if start is None:
+                start = first
+            end = first + len(stripped)
+            words += length
+        if separator:
+            position = separator.end()
+    if start is not None:
+        spans.append((start, end))
+    return spans
+
+
+def chunk_document(content: str, chunk_words: int = RETRIEVAL_CHUNK_WORDS) -> List[str]:
+    return [content[start:end] for start, end in chunk_spans(content, chunk_words)]
+
+
+def query_terms(question: str) -> List[str]:
+    return sorted(set(tokenize(question)))
+
+
+def build_index(content: str, chunk_words: int = RETRIEVAL_CHUNK_WORDS) -> dict:
+    """Build the BM25 index of a document.
+
+    Chunks are kept as offsets into the content, and term statistics as
+    postings: for each term, the chunks it occurs in and how often. Postings
+    are stored one term per record, so a query reads only its own terms.
+    """
+    spans = chunk_spans(content, chunk_words)
+    postings: Dict[str, Tuple[List[int], List[int]]] = {}
+    lengths = []
+    for chunk_id, (start, end) in enumerate(spans):
+        frequencies = Counter(tokenize(content[start:end]))
+        lengths.append(sum(frequencies.values()))
+        for term, frequency in frequencies.items():
+            chunk_ids, counts = postings.setdefault(term, ([], []))
+            chunk_ids.append(chunk_id)
+            counts.append(frequency)
+    return {
+        "version": INDEX_VERSION,
+        "spans": [list(span) for span in spans],
+        "lengths": lengths,
+        "avgdl": (sum(lengths) / len(lengths)) if lengths else 0.0,
+        "postings": postings,
+    }
+
+
+def search(index: dict, question: str, top_k: int = RETRIEVAL_TOP_K) -> List[int]:
+    """Return the ids of the best-matching chunks, best first.
+
+    ``index["postings"]`` needs only the question's terms.
+    """
+    chunk_count = len(index["spans"])
+    scores: Dict[int, float] = {}
+    for term in query_terms(question):
+        if term not in index["postings"]:
+            continue
+        chunk_ids, counts = index["postings"][term]
+        df = len(chunk_ids)
+        idf = math.log(1 + (chunk_count - df + 0.5) / (df + 0.5))
+        for chunk_id, frequency in zip(chunk_ids, counts):
+            length_norm = (
+                1 - BM25_B + BM25_B * index["lengths"][chunk_id] / (index["avgdl"] or 1)
+            )
+            scores[chunk_id] = scores.get(chunk_id, 0.0) + (
+                idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * length_norm)
+            )
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    return [chunk_id for chunk_id, score in ranked[:top_k] if score > 0]
+
+
+def select_context(
+    index: dict, content: str, question: str, top_k: int = RETRIEVAL_TOP_K
+) -> Tuple[str, List[int]]:
+    """Pick the chunks to send with a question, joined in document order.
+
+    Falls back to the opening chunks when nothing in the question matches.
+    """
+    chunk_ids = search(index, question, top_k)
+    if not chunk_ids:
+        chunk_ids = list(range(min(top_k, len(index["spans"]))))
+    chunk_ids.sort()
+    context = "\n\n---\n\n".join(
+        content[slice(*index["spans"][chunk_id])] for chunk_id in chunk_ids
+    )
+    return context, chunk_ids
@@ -0,0 +1,76 @@
+from dataclasses import dataclass
+from dotenv import load_dotenv
+from fastapi import HTTPException, UploadFile
+import asyncio
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from app.core.limits import MAX_UPLOAD_BYTES
+
+load_dotenv()
+
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+# Uploads queued as jobs wait here until extracted, so the directory must
+# survive restarts and redeploys; docker-compose mounts a volume on the default.
+UPLOAD_SPOOL_DIR = os.getenv("UPLOAD_SPOOL_DIR") or str(
+    Path(__file__).resolve().parents[2] / "data" / "uploads"
+)
+
+
+@dataclass
+class SpooledUpload:
+    """An uploaded file copied to disk, with its size and SHA-256 digest."""
+
+    path: str
+    size: int
+    sha256: str
+
+    def unlink(self):
+        remove_spooled_file(self.path)
+
+
+def remove_spooled_file(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _copy_to_disk(source, max_bytes: int, chunk_bytes: int) -> SpooledUpload:
+    digest = hashlib.sha256()
+    size = 0
+    os.makedirs(UPLOAD_SPOOL_DIR, exist_ok=True)
+    target = tempfile.NamedTemporaryFile(
+        prefix="upload-", suffix=".pdf", dir=UPLOAD_SPOOL_DIR, delete=False
+    )
+    try:
+        with target:
+            source.seek(0)
+            while chunk := source.read(chunk_bytes):
+                size += len(chunk)
+                if max_bytes > 0 and size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File exceeds {max_bytes} bytes",
+                    )
+                digest.update(chunk)
+                target.write(chunk)
+    except BaseException:
+        os.unlink(target.name)
+        raise
+    return SpooledUpload(target.name, size, digest.hexdigest())
+
+
+async def spool_upload(
+    file: UploadFile,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    chunk_bytes: int = UPLOAD_CHUNK_BYTES,
+) -> SpooledUpload:
+    """Copy an upload to a named temp file in fixed-size chunks, off the loop.
+
+    The file is hashed on the way, so the whole PDF is never held in memory.
+    The caller owns the temp file and must ``unlink`` it.
+    """
+    return await asyncio.to_thread(_copy_to_disk, file.file, max_bytes, chunk_bytes)
@@ -0,0 +1,137 @@
+"""Hit ratio and lookup cost of the answer cache on a replayed question log.
+
+Questions about one document are replayed in order against an in-memory copy
+of the queries collection. Some are re-asked as typed differently, some with a
+word or two changed, and some change only a number, which must not hit.
+
+    cd backend
+    python -m benchmarks.answer_cache --questions 2000 --similarity 0.8
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.services import answer_cache
+from app.services.answer_cache import cache_key, find_cached_answer
+
+TOPICS = [
+    "the proof of theorem {n}",
+    "the main idea of chapter {n}",
+    "exercise {n} on integration by parts",
+    "the difference between groups and rings in lecture {n}",
+    "the example of a limit that does not exist in section {n}",
+    "why the algorithm in section {n} runs in linear time",
+]
+OPENINGS = ["summarize", "explain", "can you explain", "give an overview of"]
+FILLERS = ["please", "briefly", "in detail", "for the exam"]
+CONTENT = "Lecture notes. " * 1000
+
+
+class MemoryQueries:
+    """Just enough of the queries collection for the cache lookups."""
+
+    def __init__(self):
+        self.queries = []
+        self.by_key = {}
+
+    def add(self, query: dict):
+        self.queries.append(query)
+        self.by_key[query["cache"]["content"], query["cache"]["key"]] = query
+
+    async def find_cached_query(self, user_id, document_id, cache):
+        return self.by_key.get((cache["content"], cache["key"]))
+
+    async def list_cache_candidates(self, user_id, document_id, cache, limit):
+        return self.queries[: -limit - 1 : -1]
+
+
+def question_log(count: int, rng: random.Random):
+    """``(question, kind)`` pairs; kind says what the cache should do with it."""
+    asked = []
+    for number in range(count):
+        roll = rng.random()
+        if not asked or roll < 0.5:
+            question = (
+                f"{rng.choice(OPENINGS)} {rng.choice(TOPICS)}".format(
+                    n=rng.randint(1, 40)
+                )
+                + f" {rng.choice(FILLERS)}"
+            )
+            asked.append(question)
+            yield question, "new"
+        elif roll < 0.7:
+            question = rng.choice(asked)
+            yield question.upper().replace(" ", "  ") + "?", "retyped"
+        elif roll < 0.85:
+            words = rng.choice(asked).split()
+            words[-1] = rng.choice(FILLERS).split()[-1]
+            yield " ".join(words), "reworded"
+        else:
+            words = rng.choice(asked).split()
+            numbers = [i for i, word in enumerate(words) if word.isdigit()]
+            # Never asked before, so any hit is a wrong answer.
+            words[numbers[0]] = str(1000 + number)
+            yield " ".join(words), "renumbered"
+
+
+async def main(args):
+    answer_cache.ANSWER_CACHE_SIMILARITY = args.similarity
+    answer_cache.ANSWER_CACHE_CANDIDATES = args.candidates
+    store = MemoryQueries()
+    answer_cache.find_cached_query = store.find_cached_query
+    answer_cache.list_cache_candidates = store.list_cache_candidates
+
+    rng = random.Random(args.seed)
+    outcomes = {}
+    lookup_seconds = 0.0
+    for question, kind in question_log(args.questions, rng):
+        started = time.perf_counter()
+        key = cache_key(CONTENT, question)
+        match = await find_cached_answer("bench-user", 1, key)
+        lookup_seconds += time.perf_counter() - started
+        if match is None:
+            store.add({"answer": question, "cache": key})
+        counts = outcomes.setdefault(kind, {"asked": 0, "hits": 0})
+        counts["asked"] += 1
+        counts["hits"] += match is not None
+
+    hits = sum(counts["hits"] for counts in outcomes.values())
+    results = {
+        "questions": args.questions,
+        "hit_ratio": round(hits / args.questions, 3),
+        "hit_ratio_target": answer_cache.ANSWER_CACHE_HIT_RATIO_TARGET,
+        "wrong_hits": outcomes.get("renumbered", {}).get("hits", 0),
+        "lookup_us": round(lookup_seconds / args.questions * 1e6, 1),
+        **{
+            f"{kind}_hit_ratio": round(counts["hits"] / counts["asked"], 3)
+            for kind, counts in sorted(outcomes.items())
+        },
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, value in results.items():
+        print(f"{name:<24}{value:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--questions", type=int, default=2000)
+    parser.add_argument(
+        "--similarity",
+        type=float,
+        default=answer_cache.ANSWER_CACHE_SIMILARITY,
+        help="1 matches normalized questions only",
+    )
+    parser.add_argument(
+        "--candidates", type=int, default=answer_cache.ANSWER_CACHE_CANDIDATES
+    )
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,92 @@
+"""Measure the cost of authenticating a request in each principal lookup mode.
+
+The user lookup is simulated with a fixed latency standing in for a Mongo
+round trip, so the numbers show what the cache saves per request.
+
+    cd backend
+    python -m benchmarks.auth --requests 2000 --db-latency-ms 1.5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+
+from app.services import auth
+from app.services.auth import (
+    PrincipalCache,
+    create_access_token,
+    get_current_user,
+    token_claims,
+)
+
+USER = {
+    "id": "benchmark-user",
+    "name": "Benchmark User",
+    "email": "bench@example.com",
+    "hashed_password": "x",
+    "createdAt": datetime(2025, 1, 1, tzinfo=ZoneInfo("Asia/Jerusalem")),
+}
+
+
+async def run_mode(mode: str, requests: int, db_latency: float) -> dict:
+    lookups = 0
+
+    async def get_user_by_email(email):
+        nonlocal lookups
+        lookups += 1
+        await asyncio.sleep(db_latency)
+        return dict(USER)
+
+    user = auth.User(**USER)
+    token = create_access_token(token_claims(user))
+    cache = PrincipalCache(0 if mode == "uncached" else 10000, 60)
+
+    with patch.object(auth, "get_user_by_email", get_user_by_email), patch.object(
+        auth, "principal_cache", cache
+    ), patch.object(auth, "AUTH_STATELESS", mode == "stateless"):
+        start = time.perf_counter()
+        for _ in range(requests):
+            await get_current_user(token)
+        elapsed = time.perf_counter() - start
+
+    return {
+        "mode": mode,
+        "requests": requests,
+        "db_lookups": lookups,
+        "us_per_request": round(elapsed / requests * 1e6, 1),
+    }
+
+
+async def main(args):
+    results = [
+        await run_mode(mode, args.requests, args.db_latency_ms / 1000)
+        for mode in ("uncached", "cached", "stateless")
+    ]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'mode':<10} {'requests':>9} {'db lookups':>11} {'us/request':>11}")
+    for row in results:
+        print(
+            f"{row['mode']:<10} {row['requests']:>9} {row['db_lookups']:>11} "
+            f"{row['us_per_request']:>11}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--db-latency-ms", type=float, default=1.5)
+    parser.add_argument("--json", action="store_true")
+    asyncio.run(main(parser.parse_args()))
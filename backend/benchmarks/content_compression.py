@@ -0,0 +1,158 @@
+"""Encode/decode cost of compressed document content versus bytes saved.
+
+Sizes are BSON bytes of everything stored for a document: its content plus
+its retrieval index (chunk offsets on the document, postings beside it).
+"before" is the layout up to index format 1: plain content and an embedded
+index holding each chunk's text and term counts.
+
+Content is either synthetic lecture notes (Markdown headings, paragraphs,
+bullet lists and formulas drawn from a Zipf-distributed vocabulary, like the
+cleaned text of an uploaded PDF) or the text files given with --file.
+
+    cd backend
+    python -m benchmarks.content_compression --sizes 4096 32768 262144
+    python -m benchmarks.content_compression --file notes1.md notes2.md
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import bson
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.services.database import documents
+from app.services.database.documents import decode_content, encode_content
+from app.services.database.postings import postings_records
+from app.services.retrieval import build_index, chunk_document, tokenize
+
+SYLLABLES = ["al", "ge", "bra", "the", "or", "em", "li", "mit", "de", "ri", "va"]
+
+
+def vocabulary(rng: random.Random, size: int = 3000):
+    words = {
+        "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4)))
+        for _ in range(size * 2)
+    }
+    return sorted(words)[:size]
+
+
+def synthetic_notes(size: int, rng: random.Random) -> str:
+    words = vocabulary(rng)
+    weights = [1 / rank for rank in range(1, len(words) + 1)]
+
+    def sentence():
+        picked = rng.choices(words, weights, k=rng.randint(6, 18))
+        return " ".join(picked).capitalize() + "."
+
+    parts = []
+    length = section = 0
+    while length < size:
+        roll = rng.random()
+        if roll < 0.08:
+            section += 1
+            part = f"## {section}. {sentence()[:-1]}"
+        elif roll < 0.25:
+            part = "\n".join(f"- {sentence()}" for _ in range(rng.randint(2, 5)))
+        elif roll < 0.32:
+            a, b = rng.sample(words, 2)
+            part = f"$$ {a}(x) = \\sum_{{i=1}}^{{n}} {b}_i x^{rng.randint(2, 9)} $$"
+        else:
+            part = " ".join(sentence() for _ in range(rng.randint(2, 6)))
+        parts.append(part)
+        length += len(part) + 2
+    return "\n\n".join(parts)[:size]
+
+
+def time_call(func, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat
+
+
+def bson_bytes(value) -> int:
+    return len(bson.encode({"value": value}))
+
+
+def legacy_index_bytes(text: str) -> int:
+    chunks = chunk_document(text)
+    tf = [dict(Counter(tokenize(chunk))) for chunk in chunks]
+    df = Counter(term for frequencies in tf for term in frequencies)
+    lengths = [sum(frequencies.values()) for frequencies in tf]
+    return bson_bytes(
+        {"version": 1, "chunks": chunks, "tf": tf, "df": dict(df), "lengths": lengths}
+    )
+
+
+def index_bytes(text: str) -> int:
+    index = build_index(text)
+    buckets, records = postings_records("0" * 24, 1, index.pop("postings"))
+    return bson_bytes({**index, "buckets": buckets}) + sum(
+        len(bson.encode({"_id": bson.ObjectId(), **record})) for record in records
+    )
+
+
+def measure(name: str, text: str, level: int, repeat: int) -> dict:
+    documents.DOCUMENT_COMPRESS_LEVEL = level
+    raw = bson_bytes(text)
+    stored = encode_content(text)
+    content_bytes = bson_bytes(stored)
+    before = raw + legacy_index_bytes(text)
+    after = content_bytes + index_bytes(text)
+    encode_s = time_call(lambda: encode_content(text), repeat)
+    decode_s = time_call(lambda: decode_content(stored), repeat)
+    return {
+        "content": name,
+        "level": level,
+        "raw_bytes": raw,
+        "content_bytes": content_bytes,
+        "content_ratio": round(raw / content_bytes, 2),
+        "before_bytes": before,
+        "stored_bytes": after,
+        "stored_ratio": round(before / after, 2),
+        "encode_us": round(encode_s * 1e6, 1),
+        "decode_us": round(decode_s * 1e6, 1),
+        "encode_mb_s": round(raw / encode_s / 1e6, 1),
+        "decode_mb_s": round(raw / decode_s / 1e6, 1),
+    }
+
+
+def main(args):
+    rng = random.Random(args.seed)
+    if args.file:
+        contents = [(Path(path).name, Path(path).read_text()) for path in args.file]
+    else:
+        contents = [
+            (f"notes_{size}", synthetic_notes(size, rng)) for size in args.sizes
+        ]
+
+    rows = [
+        measure(name, text, level, args.repeat)
+        for name, text in contents
+        for level in args.levels
+    ]
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+    columns = list(rows[0])
+    print("".join(f"{column:>15}" for column in columns))
+    for row in rows:
+        print("".join(f"{row[column]:>15}" for column in columns))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[4096, 32768, 262144, 2097152]
+    )
+    parser.add_argument("--file", nargs="+", help="text files to use instead")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 6, 9])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", action="store_true")
+    main(parser.parse_args())
@@ -0,0 +1,562 @@
+"""End-to-end load test of the backend and groq service against a stub Groq API.
+
+Starts three uvicorn processes: a stub of the Groq chat API with a configurable
+latency distribution, the real groq service in front of it, and the real
+backend. MongoDB is a local mongod (--mongo URL) or, with --mongo memory, an
+in-process mongomock-motor stand-in (pip install mongomock-motor). Users and
+documents are seeded, then each endpoint is driven alone and in a weighted
+mix. Latency percentiles, throughput and peak RSS of both services are
+reported per phase and written as JSON so runs on two commits can be diffed.
+
+    cd backend
+    python -m benchmarks.e2e --mongo memory --requests 200 --concurrency 16
+    python -m benchmarks.e2e --compare results/e2e-old.json results/e2e-new.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+GROQ_SERVICE_DIR = BACKEND_DIR.parent / "groq_service"
+RESULTS_DIR = BACKEND_DIR / "benchmarks" / "results"
+
+OPERATIONS = ["login", "list", "view", "upload", "query"]
+DEFAULT_MIX = "login=1,list=4,view=4,upload=1,query=2"
+PASSWORD = "benchmark password"
+WORDS = (
+    "lecture note theorem proof matrix vector integral derivative algorithm "
+    "graph network protocol memory process thread kernel compiler parser "
+    "entropy probability variance regression gradient tensor"
+).split()
+
+
+def latency_sampler(spec: str):
+    """Parse fixed:MS, uniform:LOW:HIGH or lognormal:MEDIAN:SIGMA into seconds."""
+    kind, *values = spec.split(":")
+    values = [float(value) for value in values]
+    if kind == "fixed" and len(values) == 1:
+        return lambda: values[0] / 1000
+    if kind == "uniform" and len(values) == 2:
+        return lambda: random.uniform(*values) / 1000
+    if kind == "lognormal" and len(values) == 2:
+        median, sigma = values
+        return lambda: random.lognormvariate(0, sigma) * median / 1000
+    raise ValueError(f"Unknown latency distribution {spec}")
+
+
+def stub_answer(prompt: str) -> str:
+    if "Return a concise JSON object" in prompt:
+        words = random.sample(WORDS, 5)
+        return json.dumps(
+            {
+                "title": " ".join(words[:3]).title(),
+                "subject": words[3],
+                "summary": " ".join(random.choices(WORDS, k=30)),
+            }
+        )
+    if "-- START OF TEXT --" in prompt:
+        # Cleanup prompts get their text back, so documents keep their content.
+        text = prompt.split("-- START OF TEXT --", 1)[1]
+        return text.split("-- END OF TEXT --", 1)[0].strip()
+    return " ".join(random.choices(WORDS, k=60))
+
+
+def make_stub(latency):
+    async def stub_app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        request = json.loads(body or b"{}")
+        prompt = request.get("messages", [{}])[0].get("content", "")
+        await asyncio.sleep(latency())
+        answer = stub_answer(prompt)
+        usage = {"total_tokens": (len(prompt) + len(answer)) // 4}
+        if request.get("stream"):
+            content_type = b"text/event-stream"
+            chunks = [
+                {"choices": [{"delta": {"content": word + " "}}]}
+                for word in answer.split(" ")
+            ]
+            payload = "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks)
+            payload = (payload + "data: [DONE]\n\n").encode()
+        else:
+            content_type = b"application/json"
+            message = {"role": "assistant", "content": answer}
+            payload = json.dumps(
+                {"choices": [{"message": message}], "usage": usage}
+            ).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", content_type)],
+            }
+        )
+        await send({"type": "http.response.body", "body": payload})
+
+    return stub_app
+
+
+def serve_stub(port: int, latency: str):
+    import uvicorn
+
+    uvicorn.run(
+        make_stub(latency_sampler(latency)),
+        host="127.0.0.1",
+        port=port,
+        log_level="warning",
+    )
+
+
+def serve_backend(port: int, mongo: str):
+    import uvicorn
+
+    sys.path.insert(0, str(BACKEND_DIR))
+    if mongo == "memory":
+        from mongomock_motor import AsyncMongoMockClient
+
+        from app.services.database import core
+
+        # Pool options and listeners only apply to a real server.
+        core.AsyncIOMotorClient = lambda *args, **kwargs: AsyncMongoMockClient()
+    from app.main import app
+
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb(pid: int):
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        return None
+    return None
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BACKEND_DIR,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def make_pdf(rng: random.Random, pages: int) -> bytes:
+    import pymupdf
+
+    pdf = pymupdf.open()
+    for _ in range(pages):
+        page = pdf.new_page()
+        paragraphs = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 90)))
+            for _ in range(4)
+        ]
+        page.insert_textbox(
+            pymupdf.Rect(50, 50, 545, 790), "\n\n".join(paragraphs), fontsize=9
+        )
+    contents = pdf.tobytes()
+    pdf.close()
+    return contents
+
+
+class Services:
+    """The stub, groq service and backend processes of one run."""
+
+    def __init__(self, args):
+        self.args = args
+        self.processes = {}
+        self.urls = {}
+
+    def _start(self, name: str, command, cwd: Path, env: dict, port: int):
+        self.processes[name] = subprocess.Popen(
+            command, cwd=cwd, env={**os.environ, **env}
+        )
+        self.urls[name] = f"http://127.0.0.1:{port}"
+
+    async def _wait_healthy(self, name: str, path: str):
+        deadline = time.monotonic() + 60
+        async with httpx.AsyncClient() as client:
+            while time.monotonic() < deadline:
+                if self.processes[name].poll() is not None:
+                    raise RuntimeError(f"{name} exited during startup")
+                try:
+                    response = await client.get(self.urls[name] + path)
+                    if response.status_code < 500:
+                        return
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.2)
+        raise RuntimeError(f"{name} did not start")
+
+    async def start(self):
+        args = self.args
+        stub_port, groq_port, backend_port = free_port(), free_port(), free_port()
+        script = [sys.executable, "-m", "benchmarks.e2e"]
+        self._start(
+            "stub",
+            script
+            + ["--serve", "stub", "--port", str(stub_port)]
+            + ["--llm-latency", args.llm_latency],
+            BACKEND_DIR,
+            {},
+            stub_port,
+        )
+        self._start(
+            "groq",
+            [sys.executable, "-m", "uvicorn", "app.main:app"]
+            + ["--host", "127.0.0.1", "--port", str(groq_port)]
+            + ["--log-level", "warning"],
+            GROQ_SERVICE_DIR,
+            {
+                "GROQ_API_KEY": "benchmark",
+                "GROQ_API_URL": f"http://127.0.0.1:{stub_port}/v1/chat/completions",
+                # Groq's own limits are not part of what is measured.
+                "GROQ_REQUESTS_PER_MINUTE": os.getenv("GROQ_REQUESTS_PER_MINUTE", "0"),
+                "GROQ_TOKENS_PER_MINUTE": os.getenv("GROQ_TOKENS_PER_MINUTE", "0"),
+                "LLM_CACHE_SQLITE_PATH": "",
+            },
+            groq_port,
+        )
+        self.database = f"benchmark_{uuid.uuid4().hex[:8]}"
+        self._start(
+            "backend",
+            script
+            + ["--serve", "backend", "--port", str(backend_port)]
+            + ["--mongo", args.mongo],
+            BACKEND_DIR,
+            {
+                "DB_URL": args.mongo if args.mongo != "memory" else "",
+                "DB_NAME": self.database,
+                "SECRET_KEY": os.getenv("SECRET_KEY", "benchmark-secret"),
+                "ALGORITHM": os.getenv("ALGORITHM", "HS256"),
+                "ACCESS_TOKEN_EXPIRE_MINUTES": "60",
+                "GROQ_SERVICE_URL": f"http://127.0.0.1:{groq_port}",
+            },
+            backend_port,
+        )
+        await self._wait_healthy("stub", "/")
+        await self._wait_healthy("groq", "/health")
+        await self._wait_healthy("backend", "/health")
+
+    def rss(self) -> dict:
+        return {name: rss_mb(self.processes[name].pid) for name in ("backend", "groq")}
+
+    def stop(self):
+        for process in self.processes.values():
+            process.terminate()
+        for process in self.processes.values():
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if self.args.mongo != "memory":
+            from pymongo import MongoClient
+
+            with MongoClient(self.args.mongo) as client:
+                client.drop_database(self.database)
+
+
+class Workload:
+    """Seeded users and documents, and one coroutine per operation."""
+
+    def __init__(self, client: httpx.AsyncClient, args):
+        self.client = client
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.users = []
+
+    def _user(self) -> dict:
+        return self.rng.choice(self.users)
+
+    def _headers(self, user: dict) -> dict:
+        return {"Authorization": f"Bearer {user['token']}"}
+
+    async def seed(self):
+        for number in range(self.args.users):
+            user = {
+                "email": f"user{number}-{uuid.uuid4().hex[:6]}@benchmark.test",
+                "documents": [],
+            }
+            response = await self.client.post(
+                "/register",
+                json={"email": user["email"], "password": PASSWORD, "name": "Bench"},
+            )
+            response.raise_for_status()
+            await self.login(user)
+            self.users.append(user)
+            for _ in range(self.args.documents):
+                await self.upload(user)
+
+    async def login(self, user: dict = None):
+        user = user or self._user()
+        response = await self.client.post(
+            "/token", data={"username": user["email"], "password": PASSWORD}
+        )
+        response.raise_for_status()
+        user["token"] = response.json()["access_token"]
+
+    async def list(self):
+        user = self._user()
+        response = await self.client.get("/documents", headers=self._headers(user))
+        response.raise_for_status()
+
+    async def view(self):
+        user = self._user()
+        document_id = self.rng.choice(user["documents"])
+        response = await self.client.get(
+            f"/documents/{document_id}", headers=self._headers(user)
+        )
+        response.raise_for_status()
+
+    async def upload(self, user: dict = None):
+        user = user or self._user()
+        contents = make_pdf(self.rng, self.args.pages)
+        response = await self.client.post(
+            "/documents/upload",
+            files={"file": ("notes.pdf", contents, "application/pdf")},
+            headers=self._headers(user),
+        )
+        response.raise_for_status()
+        user["documents"].append(response.json()["id"])
+
+    async def query(self):
+        user = self._user()
+        document_id = self.rng.choice(user["documents"])
+        question = " ".join(self.rng.choices(WORDS, k=6)) + "?"
+        response = await self.client.post(
+            f"/documents/{document_id}/query",
+            json={"question": question},
+            headers=self._headers(user),
+        )
+        response.raise_for_status()
+
+
+def summarize(latencies: list, errors: int, elapsed: float) -> dict:
+    summary = {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+    }
+    if latencies:
+        for name, fraction in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+            summary[f"{name}_ms"] = round(percentile(latencies, fraction) * 1000, 1)
+        summary["max_ms"] = round(max(latencies) * 1000, 1)
+    return summary
+
+
+async def run_phase(workload, services, name: str, mix: dict, args) -> dict:
+    rng = random.Random(f"{args.seed}-{name}")
+    operations = rng.choices(list(mix), weights=list(mix.values()), k=args.requests)
+    queue = asyncio.Queue()
+    for operation in operations:
+        queue.put_nowait(operation)
+    latencies = {operation: [] for operation in mix}
+    errors = {operation: 0 for operation in mix}
+    peak_rss = {}
+    done = asyncio.Event()
+
+    async def sample_rss():
+        while not done.is_set():
+            for service, value in services.rss().items():
+                if value is not None:
+                    peak_rss[service] = max(peak_rss.get(service, 0), value)
+            await asyncio.sleep(0.05)
+
+    async def worker():
+        while not queue.empty():
+            operation = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                await getattr(workload, operation)()
+            except httpx.HTTPError:
+                errors[operation] += 1
+                continue
+            latencies[operation].append(time.perf_counter() - started)
+
+    sampler = asyncio.create_task(sample_rss())
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await sampler
+
+    every = [latency for values in latencies.values() for latency in values]
+    return {
+        "phase": name,
+        "seconds": round(elapsed, 3),
+        **summarize(every, sum(errors.values()), elapsed),
+        "peak_rss_mb": {service: round(mb, 1) for service, mb in peak_rss.items()},
+        "operations": {
+            operation: summarize(latencies[operation], errors[operation], elapsed)
+            for operation in mix
+        },
+    }
+
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        operation, weight = part.split("=")
+        if operation not in OPERATIONS:
+            raise ValueError(f"Unknown operation {operation}")
+        mix[operation] = float(weight)
+    return mix
+
+
+async def benchmark(args) -> dict:
+    services = Services(args)
+    try:
+        await services.start()
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(
+            base_url=services.urls["backend"], limits=limits, timeout=300
+        ) as client:
+            workload = Workload(client, args)
+            await workload.seed()
+            idle_rss = services.rss()
+            phases = []
+            for phase in args.phases:
+                mix = parse_mix(args.mix) if phase == "mix" else {phase: 1}
+                phases.append(await run_phase(workload, services, phase, mix, args))
+    finally:
+        services.stop()
+    return {
+        "benchmark": "e2e",
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("serve", "port", "json", "compare")
+        },
+        "idle_rss_mb": {
+            service: round(mb, 1) for service, mb in idle_rss.items() if mb
+        },
+        "phases": phases,
+    }
+
+
+def print_results(results: dict):
+    print(f"commit {results['commit']}, idle RSS MB {results['idle_rss_mb']}")
+    print(
+        f"{'phase':<8}{'op':<8}{'reqs':>6}{'errs':>6}{'rps':>8}"
+        f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'backend MB':>12}{'groq MB':>9}"
+    )
+    for phase in results["phases"]:
+        rss = phase["peak_rss_mb"]
+        for operation, row in phase["operations"].items():
+            print(
+                f"{phase['phase']:<8}{operation:<8}{row['requests']:>6}"
+                f"{row['errors']:>6}{row['rps'] or 0:>8}{row.get('p50_ms', '-'):>9}"
+                f"{row.get('p95_ms', '-'):>9}{row.get('p99_ms', '-'):>9}"
+                f"{rss.get('backend', '-'):>12}{rss.get('groq', '-'):>9}"
+            )
+
+
+def compare(baseline_path: Path, current_path: Path):
+    """Print the change of rps and p95 per phase and operation between two runs."""
+    baseline = json.loads(baseline_path.read_text())
+    current = json.loads(current_path.read_text())
+    print(f"{baseline['commit']} -> {current['commit']}")
+    print(f"{'phase':<8}{'op':<8}{'rps':>18}{'p95 ms':>20}")
+    before = {phase["phase"]: phase for phase in baseline["phases"]}
+    for phase in current["phases"]:
+        if phase["phase"] not in before:
+            continue
+        for operation, row in phase["operations"].items():
+            old = before[phase["phase"]]["operations"].get(operation)
+            if not old or "p95_ms" not in old or "p95_ms" not in row:
+                continue
+            rps_change = (row["rps"] - old["rps"]) / old["rps"] * 100
+            p95_change = (row["p95_ms"] - old["p95_ms"]) / old["p95_ms"] * 100
+            print(
+                f"{phase['phase']:<8}{operation:<8}"
+                f"{old['rps']:>7} -> {row['rps']:<7}{rps_change:>+4.0f}%"
+                f"{old['p95_ms']:>8} -> {row['p95_ms']:<7}{p95_change:>+4.0f}%"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--mongo",
+        default=os.getenv("DB_URL") or "mongodb://localhost:27017",
+        help='MongoDB URL, or "memory" for mongomock-motor in the backend process',
+    )
+    parser.add_argument("--llm-latency", default="lognormal:400:0.5")
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--documents", type=int, default=2, help="seeded per user")
+    parser.add_argument("--pages", type=int, default=3, help="per uploaded PDF")
+    parser.add_argument("--requests", type=int, default=100, help="per phase")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--phases", nargs="+", default=OPERATIONS + ["mix"])
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", type=Path, help="results file; default results/")
+    parser.add_argument("--compare", nargs=2, type=Path, metavar=("BASE", "NEW"))
+    parser.add_argument("--serve", choices=["stub", "backend"], help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve == "stub":
+        serve_stub(args.port, args.llm_latency)
+        return
+    if args.serve == "backend":
+        serve_backend(args.port, args.mongo)
+        return
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    for phase in args.phases:
+        if phase != "mix" and phase not in OPERATIONS:
+            parser.error(f"unknown phase {phase}")
+    latency_sampler(args.llm_latency)
+    results = asyncio.run(benchmark(args))
+    print_results(results)
+    path = args.json
+    if path is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        path = RESULTS_DIR / f"e2e-{results['commit']}-{stamp}.json"
+    path.write_text(json.dumps(results, indent=2))
+    print(f"results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Compare PDF extractor backends on a generated corpus.
+
+Each backend runs in its own subprocess so peak RSS is measured in isolation.
+
+    cd backend
+    python -m benchmarks.extractors --documents 5 --pages 40
+"""
+
+import argparse
+import json
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.services.extraction.backends import EXTRACTORS, get_extractor
+
+WORDS = (
+    "lecture note theorem proof matrix vector integral derivative algorithm "
+    "graph network protocol memory process thread kernel compiler parser "
+    "entropy probability variance regression gradient tensor"
+).split()
+
+
+def generate_corpus(directory: Path, documents: int, pages: int, seed: int = 7):
+    import pymupdf
+
+    rng = random.Random(seed)
+    for number in range(documents):
+        pdf = pymupdf.open()
+        for _ in range(pages):
+            page = pdf.new_page()
+            paragraphs = [
+                " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 90)))
+                for _ in range(6)
+            ]
+            page.insert_textbox(
+                pymupdf.Rect(50, 50, 545, 790), "\n\n".join(paragraphs), fontsize=9
+            )
+        pdf.save(directory / f"doc_{number}.pdf")
+        pdf.close()
+
+
+def run_backend(name: str, corpus: Path) -> dict:
+    extractor = get_extractor(name)
+    pages = 0
+    characters = 0
+    started = time.perf_counter()
+    for path in sorted(corpus.glob("*.pdf")):
+        contents = path.read_bytes()
+        page_count = extractor.count_pages(contents)
+        texts = extractor.extract_pages(contents, range(page_count))
+        pages += page_count
+        characters += sum(len(text) for text in texts)
+    elapsed = time.perf_counter() - started
+    return {
+        "backend": name,
+        "pages": pages,
+        "characters": characters,
+        "seconds": round(elapsed, 3),
+        "pages_per_sec": round(pages / elapsed, 1) if elapsed else None,
+        # ru_maxrss is reported in KiB on Linux.
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=40)
+    parser.add_argument("--backends", nargs="+", default=sorted(EXTRACTORS))
+    parser.add_argument("--corpus", type=Path, help="reuse an existing PDF folder")
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_backend(args.worker, args.corpus)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = args.corpus
+        if corpus is None:
+            corpus = Path(tmp)
+            generate_corpus(corpus, args.documents, args.pages)
+
+        results = []
+        for name in args.backends:
+            output = subprocess.run(
+                [sys.executable, __file__, "--worker", name, "--corpus", str(corpus)],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"{'backend':<12}{'pages':>8}{'pages/sec':>12}{'peak RSS MB':>14}")
+    for result in results:
+        print(
+            f"{result['backend']:<12}{result['pages']:>8}"
+            f"{result['pages_per_sec']:>12}{result['peak_rss_mb']:>14}"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
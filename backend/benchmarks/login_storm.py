@@ -0,0 +1,140 @@
+"""Login storm: login throughput and latency of unrelated requests meanwhile.
+
+Runs the real app in-process over ASGI with the user lookup stubbed out, so
+only password hashing and request handling are measured. "blocking" hashes on
+the event loop the way login used to; "executor" uses the hashing pool.
+
+    cd backend
+    python -m benchmarks.login_storm --logins 40 --concurrency 20 --rounds 12
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+# Login only asks the client for a database handle; nothing is sent to it.
+os.environ.setdefault("DB_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "benchmark")
+
+import httpx
+from passlib.context import CryptContext
+
+from app.core import utils
+from app.main import app
+from app.services import auth
+
+PASSWORD = "correct horse battery staple"
+PROBE_INTERVAL = 0.01
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def storm(mode: str, logins: int, concurrency: int, context) -> dict:
+    user = {
+        "id": "storm-user",
+        "name": "Storm User",
+        "email": "storm@example.com",
+        "hashed_password": context.hash(PASSWORD),
+        "createdAt": datetime(2025, 1, 1, tzinfo=ZoneInfo("Asia/Jerusalem")),
+    }
+
+    async def get_user_by_email(email):
+        return dict(user)
+
+    async def blocking_verify(plain_password, hashed_password):
+        return context.verify(plain_password, hashed_password)
+
+    verify = blocking_verify if mode == "blocking" else utils.verify_password
+    semaphore = asyncio.Semaphore(concurrency)
+    done = asyncio.Event()
+    probe_latencies = []
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as client:
+
+        async def login():
+            async with semaphore:
+                response = await client.post(
+                    "/token", data={"username": user["email"], "password": PASSWORD}
+                )
+                response.raise_for_status()
+
+        async def probe():
+            # Latency counts from when the probe was due, so time spent waiting
+            # for a blocked event loop is included.
+            due = time.perf_counter()
+            while not done.is_set():
+                await asyncio.sleep(max(0, due - time.perf_counter()))
+                await client.get("/health")
+                probe_latencies.append(time.perf_counter() - due)
+                # Slots missed while this probe waited are skipped, not queued.
+                due = max(due + PROBE_INTERVAL, time.perf_counter())
+
+        with patch.object(utils, "pwd_context", context), patch.object(
+            auth, "get_user_by_email", get_user_by_email
+        ), patch.object(auth, "verify_password", verify):
+            prober = asyncio.create_task(probe())
+            start = time.perf_counter()
+            await asyncio.gather(*(login() for _ in range(logins)))
+            elapsed = time.perf_counter() - start
+            done.set()
+            await prober
+
+    return {
+        "mode": mode,
+        "logins": logins,
+        "logins_per_sec": round(logins / elapsed, 1),
+        "probes": len(probe_latencies),
+        "probe_p50_ms": round(statistics.median(probe_latencies) * 1000, 1),
+        "probe_p99_ms": round(percentile(probe_latencies, 0.99) * 1000, 1),
+        "probe_max_ms": round(max(probe_latencies) * 1000, 1),
+    }
+
+
+async def main(args):
+    context = CryptContext(
+        schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=args.rounds
+    )
+    results = [
+        await storm(mode, args.logins, args.concurrency, context)
+        for mode in ("blocking", "executor")
+    ]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(
+        f"{'mode':<9} {'logins':>7} {'logins/s':>9} {'probes':>7} "
+        f"{'p50 ms':>7} {'p99 ms':>7} {'max ms':>7}"
+    )
+    for row in results:
+        print(
+            f"{row['mode']:<9} {row['logins']:>7} {row['logins_per_sec']:>9} "
+            f"{row['probes']:>7} {row['probe_p50_ms']:>7} {row['probe_p99_ms']:>7} "
+            f"{row['probe_max_ms']:>7}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=utils.BCRYPT_ROUNDS)
+    parser.add_argument("--json", action="store_true")
+    asyncio.run(main(parser.parse_args()))
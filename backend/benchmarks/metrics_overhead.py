@@ -0,0 +1,125 @@
+"""Cost of metrics instrumentation per request and per observation.
+
+Requests are sent straight to the ASGI app, without a server or HTTP client,
+so the framework's own per-request cost is as small as it gets and the
+middleware's share is as large as it can be.
+
+    cd backend
+    python -m benchmarks.metrics_overhead --requests 20000 --rounds 5
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from fastapi import FastAPI
+
+from app.core.metrics import Counter, Histogram, MetricsMiddleware, Registry
+
+
+def make_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+    if instrumented:
+        app.add_middleware(MetricsMiddleware)
+
+    @app.get("/documents/{document_id}")
+    async def document(document_id: int):
+        return {"id": document_id}
+
+    return app
+
+
+async def drive(app, requests: int) -> float:
+    """Seconds per request for ``requests`` sequential GETs."""
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for number in range(requests):
+        path = f"/documents/{number % 100}"
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [],
+            "client": ("127.0.0.1", 1234),
+            "server": ("bench", 80),
+        }
+        await app(scope, receive, send)
+    return (time.perf_counter() - started) / requests
+
+
+def time_call(func, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - started) / calls
+
+
+async def main(args):
+    plain, instrumented = make_app(False), make_app(True)
+    # Warm both apps so routing tables and middleware stacks are built.
+    await drive(plain, 200)
+    await drive(instrumented, 200)
+    rounds = {"plain": [], "instrumented": []}
+    for _ in range(args.rounds):
+        rounds["plain"].append(await drive(plain, args.requests))
+        rounds["instrumented"].append(await drive(instrumented, args.requests))
+    plain_us = statistics.median(rounds["plain"]) * 1e6
+    instrumented_us = statistics.median(rounds["instrumented"]) * 1e6
+
+    histogram = Histogram("bench", "Bench.", ("route", "status"))
+    counter = Counter("bench_total", "Bench.", ("model", "kind"))
+    registry = Registry()
+    registry.register(histogram)
+    for route in range(args.series):
+        histogram.observe(0.1, route=f"/route/{route}", status=200)
+
+    results = {
+        "request_plain_us": round(plain_us, 2),
+        "request_instrumented_us": round(instrumented_us, 2),
+        "request_overhead_us": round(instrumented_us - plain_us, 2),
+        "request_overhead_pct": round((instrumented_us / plain_us - 1) * 100, 1),
+        "histogram_observe_ns": round(
+            time_call(
+                lambda: histogram.observe(0.2, route="/route/1", status=200), 100_000
+            )
+            * 1e9
+        ),
+        "counter_inc_ns": round(
+            time_call(lambda: counter.inc(12, model="llama3", kind="prompt"), 100_000)
+            * 1e9
+        ),
+        f"render_{args.series}_series_ms": round(
+            time_call(registry.render, 20) * 1000, 2
+        ),
+    }
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, value in results.items():
+        print(f"{name:<28}{value:>10}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--series", type=int, default=200, help="for the render timing")
+    parser.add_argument("--json", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,138 @@
+"""Compare peak memory of reading an upload into bytes vs spooling it to disk.
+
+Each mode runs in its own subprocess. The upload arrives the way Starlette
+hands it over, in a spooled temp file; "bytes" then reads it whole and
+extracts from the copy, "spooled" copies it to a named file in chunks and
+extracts from the path.
+
+    cd backend
+    python -m benchmarks.upload_memory --size-mb 40
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("PDF_EXTRACT_WORKERS", "0")
+
+from fastapi import UploadFile
+
+from app.services.extraction.engine import extract_pdf_text
+from app.services.uploads import spool_upload
+
+MODES = ["bytes", "spooled"]
+
+
+def generate_pdf(path: Path, size_mb: int, pages: int = 20):
+    """A PDF of about ``size_mb`` MiB: some text plus incompressible images."""
+    import pymupdf
+
+    pdf = pymupdf.open()
+    image_bytes = size_mb * 1024 * 1024 // pages
+    side = int((image_bytes / 3) ** 0.5)
+    for number in range(pages):
+        page = pdf.new_page()
+        page.insert_text((72, 72), f"Page number {number}")
+        pixmap = pymupdf.Pixmap(
+            pymupdf.csRGB, side, side, os.urandom(side * side * 3), False
+        )
+        page.insert_image(pymupdf.Rect(72, 100, 500, 528), pixmap=pixmap)
+    pdf.save(path, deflate=False)
+    pdf.close()
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is reported in KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def receive_upload(path: Path) -> UploadFile:
+    """Copy the file into a spooled temp file, as the multipart parser does."""
+    spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    with open(path, "rb") as f:
+        shutil.copyfileobj(f, spool, 64 * 1024)
+    spool.seek(0)
+    return UploadFile(spool, filename=path.name)
+
+
+async def run_mode(mode: str, path: Path) -> dict:
+    upload = receive_upload(path)
+    baseline = peak_rss_mb()
+    started = time.perf_counter()
+    if mode == "bytes":
+        contents = await upload.read()
+        digest = hashlib.sha256(contents).hexdigest()
+        text = await extract_pdf_text(contents)
+    else:
+        spooled = await spool_upload(upload, max_bytes=0)
+        try:
+            digest = spooled.sha256
+            text = await extract_pdf_text(spooled.path)
+        finally:
+            spooled.unlink()
+    elapsed = time.perf_counter() - started
+    return {
+        "mode": mode,
+        "file_mb": round(path.stat().st_size / 1024 / 1024, 1),
+        "pages": len(text.split("\f")),
+        "digest": digest[:12],
+        "seconds": round(elapsed, 3),
+        "baseline_rss_mb": round(baseline, 1),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "upload_rss_mb": round(peak_rss_mb() - baseline, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=40)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--pdf", type=Path, help="use an existing PDF")
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(asyncio.run(run_mode(args.worker, args.pdf))))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf = args.pdf
+        if pdf is None:
+            pdf = Path(tmp) / "upload.pdf"
+            generate_pdf(pdf, args.size_mb)
+
+        results = []
+        for mode in args.modes:
+            output = subprocess.run(
+                [sys.executable, __file__, "--worker", mode, "--pdf", str(pdf)],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            results.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(
+        f"{'mode':<10}{'file MB':>9}{'seconds':>10}{'peak RSS MB':>14}{'upload MB':>12}"
+    )
+    for result in results:
+        print(
+            f"{result['mode']:<10}{result['file_mb']:>9}{result['seconds']:>10}"
+            f"{result['peak_rss_mb']:>14}{result['upload_rss_mb']:>12}"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Compress the content of documents stored before compression existed.
+
+Safe to run while the backend is serving, and safe to re-run: only documents
+whose content is still a plain string are read, and each is rewritten only if
+its content has not changed in the meantime. Content too short to compress
+stays as it is.
+
+    cd backend
+    python -m scripts.compress_documents
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.services.database.documents import encode_content, get_documents_collection
+
+logger = logging.getLogger("compress_documents")
+
+
+async def compress_document(doc: dict) -> int:
+    """Bytes saved by compressing one document's content."""
+    stored = encode_content(doc["content"])
+    if isinstance(stored, str):
+        return 0
+    documents = await get_documents_collection()
+    result = await documents.update_one(
+        {"user_id": doc["user_id"], "id": doc["id"], "content": doc["content"]},
+        {"$set": {"content": stored}},
+    )
+    if not result.modified_count:
+        return 0
+    return len(doc["content"].encode()) - len(stored)
+
+
+async def compress(batch_size: int):
+    documents = await get_documents_collection()
+    cursor = documents.find(
+        {"content": {"$type": "string"}}, {"user_id": 1, "id": 1, "content": 1}
+    ).batch_size(batch_size)
+
+    document_count = saved = 0
+    async for doc in cursor:
+        saved += await compress_document(doc)
+        document_count += 1
+        if document_count % 100 == 0:
+            logger.info(f"{document_count} documents checked, {saved} bytes saved")
+    logger.info(f"Done: {document_count} documents checked, {saved} bytes saved")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    asyncio.run(compress(args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Move documents embedded in user records into the ``documents`` collection.
+
+Safe to run while the backend is serving the new code, and safe to re-run:
+
+1. Each embedded document is inserted only if ``(user_id, id)`` is not in the
+   collection yet (``$setOnInsert``), so records written by the running
+   backend are never overwritten.
+2. With ``--prune``, documents that are confirmed in the collection are then
+   ``$pull``ed from the user record, shrinking it back to the profile alone.
+
+    cd backend
+    python -m scripts.migrate_documents            # copy only
+    python -m scripts.migrate_documents --prune    # copy, then remove from users
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.services.database.documents import (
+    ensure_document_indexes,
+    get_documents_collection,
+)
+from app.services.database.user import get_users_collection
+
+logger = logging.getLogger("migrate_documents")
+
+
+async def migrate_user(user: dict, prune: bool) -> int:
+    documents = await get_documents_collection()
+    migrated_ids = []
+    for doc in user.get("documents", []):
+        await documents.update_one(
+            {"user_id": user["id"], "id": doc["id"]},
+            {"$setOnInsert": {**doc, "user_id": user["id"]}},
+            upsert=True,
+        )
+        migrated_ids.append(doc["id"])
+
+    if prune and migrated_ids:
+        users = await get_users_collection()
+        await users.update_one(
+            {"id": user["id"]},
+            {"$pull": {"documents": {"id": {"$in": migrated_ids}}}},
+        )
+    return len(migrated_ids)
+
+
+async def migrate(prune: bool, batch_size: int):
+    await ensure_document_indexes()
+    users = await get_users_collection()
+    cursor = users.find(
+        {"documents.0": {"$exists": True}}, {"id": 1, "documents": 1}
+    ).batch_size(batch_size)
+
+    user_count = document_count = 0
+    async for user in cursor:
+        document_count += await migrate_user(user, prune)
+        user_count += 1
+        if user_count % 100 == 0:
+            logger.info(f"{user_count} users, {document_count} documents migrated")
+    logger.info(f"Done: {user_count} users, {document_count} documents migrated")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--prune",
+        action="store_true",
+        help="remove migrated documents from the user records",
+    )
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    asyncio.run(migrate(args.prune, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Move queries embedded in documents into the ``queries`` collection.
+
+Safe to run while the backend is serving the new code, and safe to re-run:
+
+1. Each embedded query gets an ``_id`` built from its timestamp and position,
+   so it sorts with the queries the backend writes and is inserted only once
+   (``$setOnInsert``).
+2. The document's ``queries`` array is then ``$unset``. Until that happens the
+   backend reads both places, so nothing is shown twice or lost.
+
+    cd backend
+    python -m scripts.migrate_queries
+"""
+
+import argparse
+import asyncio
+import calendar
+import hashlib
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from bson import ObjectId
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.services.database.documents import get_documents_collection
+from app.services.database.queries import ensure_query_indexes, get_queries_collection
+
+logger = logging.getLogger("migrate_queries")
+
+
+def legacy_query_id(doc: dict, position: int, query: dict) -> ObjectId:
+    """A stable ObjectId whose time part is when the query was asked."""
+    asked = query.get("timestamp") or doc["uploadedDate"]
+    if isinstance(asked, str):
+        # Documents stored from model_dump() hold ISO strings.
+        asked = datetime.fromisoformat(asked)
+    key = f"{doc['user_id']}:{doc['id']}:{position}".encode()
+    # Naive datetimes come from Mongo and are UTC, not local time.
+    timestamp = calendar.timegm(asked.utctimetuple()).to_bytes(4, "big")
+    return ObjectId(timestamp + hashlib.sha256(key).digest()[:8])
+
+
+async def migrate_document(doc: dict) -> int:
+    queries = await get_queries_collection()
+    legacy = doc.get("queries", [])
+    for position, query in enumerate(legacy):
+        await queries.update_one(
+            {"_id": legacy_query_id(doc, position, query)},
+            {
+                "$setOnInsert": {
+                    **query,
+                    "user_id": doc["user_id"],
+                    "document_id": doc["id"],
+                }
+            },
+            upsert=True,
+        )
+
+    documents = await get_documents_collection()
+    await documents.update_one(
+        {"user_id": doc["user_id"], "id": doc["id"]}, {"$unset": {"queries": ""}}
+    )
+    return len(legacy)
+
+
+async def migrate(batch_size: int):
+    await ensure_query_indexes()
+    documents = await get_documents_collection()
+    cursor = documents.find(
+        {"queries": {"$exists": True}},
+        {"user_id": 1, "id": 1, "uploadedDate": 1, "queries": 1},
+    ).batch_size(batch_size)
+
+    document_count = query_count = 0
+    async for doc in cursor:
+        query_count += await migrate_document(doc)
+        document_count += 1
+        if document_count % 100 == 0:
+            logger.info(f"{document_count} documents, {query_count} queries migrated")
+    logger.info(f"Done: {document_count} documents, {query_count} queries migrated")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    asyncio.run(migrate(args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
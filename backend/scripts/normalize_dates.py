@@ -0,0 +1,72 @@
+"""Turn document dates stored as ISO strings back into BSON dates.
+
+Older versions saved ``uploadedDate`` (and sometimes ``lastViewed``) as the
+string the API returns. Strings sort apart from dates in Mongo, so listing
+cursors skipped or repeated those documents. Safe to re-run: only string
+values are read, and each is replaced only if it is still that string.
+
+    cd backend
+    python -m scripts.normalize_dates
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.services.database.documents import get_documents_collection
+
+logger = logging.getLogger("normalize_dates")
+
+DATE_FIELDS = ["uploadedDate", "lastViewed"]
+
+
+async def normalize_document(doc: dict) -> int:
+    """How many of the document's date fields were rewritten."""
+    strings = {
+        field: doc[field] for field in DATE_FIELDS if isinstance(doc.get(field), str)
+    }
+    if not strings:
+        return 0
+    documents = await get_documents_collection()
+    result = await documents.update_one(
+        {"user_id": doc["user_id"], "id": doc["id"], **strings},
+        {
+            "$set": {
+                field: datetime.fromisoformat(value) for field, value in strings.items()
+            }
+        },
+    )
+    return len(strings) if result.modified_count else 0
+
+
+async def normalize(batch_size: int):
+    documents = await get_documents_collection()
+    cursor = documents.find(
+        {"$or": [{field: {"$type": "string"}} for field in DATE_FIELDS]},
+        {"user_id": 1, "id": 1, **{field: 1 for field in DATE_FIELDS}},
+    ).batch_size(batch_size)
+
+    document_count = field_count = 0
+    async for doc in cursor:
+        field_count += await normalize_document(doc)
+        document_count += 1
+        if document_count % 100 == 0:
+            logger.info(f"{document_count} documents, {field_count} dates fixed")
+    logger.info(f"Done: {document_count} documents, {field_count} dates fixed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    asyncio.run(normalize(args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
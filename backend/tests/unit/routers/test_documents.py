@@ -2,7 +2,7 @@ import sys
 from pathlib import Path
 import pytest
 from unittest.mock import patch
-from fastapi import HTTPException
+from fastapi import HTTPException, Response
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent.parent))
 from app.routers.documents import get_documents, get_single_document
@@ -15,15 +15,73 @@ async def test_get_documents(mock_user):
         {"id": 1, "title": "Doc 1"},
         {"id": 2, "title": "Doc 2"},
     ]
+    response = Response()
 
     with patch(
-        "app.routers.documents.get_user_documents", return_value=mock_documents
-    ) as mock_get_docs:
+        "app.routers.documents.list_user_documents",
+        return_value=(mock_documents, "next-page"),
+    ) as mock_list_docs:
 
-        result = await get_documents(mock_user)
+        result = await get_documents(
+            response,
+            subject="Math",
+            sort="viewed",
+            limit=2,
+            cursor=None,
+            current_user=mock_user,
+        )
 
         assert result == mock_documents
-        mock_get_docs.assert_called_once_with(mock_user.id)
+        assert response.headers["X-Next-Cursor"] == "next-page"
+        mock_list_docs.assert_called_once_with(mock_user.id, "Math", "viewed", 2, None)
+
+
+@pytest.mark.asyncio
+async def test_get_documents_invalid_cursor(mock_user):
+
+    with patch(
+        "app.routers.documents.list_user_documents", side_effect=ValueError("bad")
+    ), pytest.raises(HTTPException) as exc_info:
+
+        await get_documents(
+            Response(),
+            subject=None,
+            sort="recent",
+            limit=None,
+            cursor="garbage",
+            current_user=mock_user,
+        )
+
+    assert exc_info.value.status_code == 400
+
+
+def test_dashboard_returns_metadata_only(test_client, mock_user, mock_document):
+    from app.main import app
+    from app.services.auth import get_current_user
+
+    app.dependency_overrides[get_current_user] = lambda: mock_user
+    try:
+        with patch(
+            "app.routers.documents.list_user_documents",
+            return_value=([mock_document], None),
+        ) as mock_list_docs:
+            response = test_client.get("/dashboard")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert "X-Next-Cursor" not in response.headers
+    assert set(response.json()[0]) == {
+        "id",
+        "title",
+        "subject",
+        "summary",
+        "uploadedDate",
+        "lastViewed",
+    }
+    mock_list_docs.assert_called_once_with(
+        mock_user.id, "All Subjects", "recent", None, None
+    )
 
 
 @pytest.mark.asyncio
@@ -54,3 +112,386 @@ async def test_get_single_document_not_found(mock_user):
         assert exc_info.value.status_code == 404
         assert exc_info.value.detail == "Document not found"
         mock_get_doc.assert_called_once_with(mock_user.id, 999)
+
+
+def test_upload_document_job_mode_returns_accepted(test_client, mock_user):
+    from app.main import app
+    from app.services.auth import get_current_user
+
+    app.dependency_overrides[get_current_user] = lambda: mock_user
+    try:
+        with patch(
+            "app.routers.documents.submit_upload_job",
+            return_value={"id": "job-1", "status": "queued"},
+        ) as mock_submit, patch("app.routers.documents.extract_stage") as mock_extract:
+            response = test_client.post(
+                "/documents/upload?mode=job",
+                files={"file": ("notes.pdf", b"%PDF-1.4", "application/pdf")},
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 202
+    assert response.json() == {
+        "job_id": "job-1",
+        "status": "queued",
+        "status_url": "/jobs/job-1",
+    }
+    user_id, filename, spooled, extractor = mock_submit.call_args.args
+    # The job reads the PDF from the spooled file, which outlives the request.
+    try:
+        assert (user_id, filename, extractor) == (mock_user.id, "notes.pdf", None)
+        assert Path(spooled.path).read_bytes() == b"%PDF-1.4"
+    finally:
+        spooled.unlink()
+    mock_extract.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_query_document_sends_only_relevant_chunks(mock_user, mock_document):
+    from unittest.mock import AsyncMock
+    from app.routers.documents import query_document
+    from app.schemas.query_schemas import QueryRequest
+    from app.services.retrieval import build_index
+
+    mock_document["content"] = "\n\n".join(
+        ["# Algebra", "Groups and rings.", "# Calculus", "Limits and derivatives."]
+    )
+    index = build_index(mock_document["content"], chunk_words=6)
+    llm_response = {"choices": [{"message": {"content": "An answer"}}]}
+
+    with patch(
+        "app.routers.documents.get_stored_content",
+        return_value=mock_document["content"],
+    ), patch("app.routers.documents.find_cached_answer", return_value=None), patch(
+        "app.routers.documents.get_document_index", return_value=index
+    ), patch(
+        "app.routers.documents.call_groq", return_value=llm_response
+    ) as mock_call_groq, patch(
+        "app.routers.documents.add_query_to_document",
+        return_value=AsyncMock(modified_count=1),
+    ) as mock_add_query:
+
+        result = await query_document(
+            1, QueryRequest(question="derivatives"), mock_user
+        )
+
+    prompt = mock_call_groq.call_args.args[0]
+    assert "Limits and derivatives." in prompt
+    assert "Groups and rings." not in prompt
+    assert result["answer"] == "An answer"
+    assert result["chunks"] == [1]
+    assert result["cached"] is False
+    assert mock_add_query.call_args.args[2]["chunks"] == [1]
+    assert mock_add_query.call_args.args[3]["key"] == "derivatives"
+
+
+@pytest.mark.asyncio
+async def test_query_document_returns_cached_answer(mock_user, mock_document):
+    from unittest.mock import AsyncMock
+    from app.routers.documents import query_document
+    from app.schemas.query_schemas import QueryRequest
+
+    match = {"answer": "Stored answer", "chunks": [0]}
+
+    with patch(
+        "app.routers.documents.get_stored_content",
+        return_value=mock_document["content"],
+    ), patch(
+        "app.routers.documents.find_cached_answer", AsyncMock(return_value=match)
+    ) as mock_find, patch(
+        "app.routers.documents.call_groq"
+    ) as mock_call_groq, patch(
+        "app.routers.documents.add_query_to_document", AsyncMock()
+    ) as mock_add_query:
+
+        result = await query_document(
+            1, QueryRequest(question="Summarize chapter 2?"), mock_user
+        )
+
+    mock_call_groq.assert_not_called()
+    assert result["answer"] == "Stored answer"
+    assert result["cached"] is True
+    assert mock_find.call_args.args[2]["key"] == "summarize chapter 2"
+    # Only answers from the LLM are offered to later lookups.
+    assert mock_add_query.call_args.args[3] is None
+
+
+@pytest.mark.asyncio
+async def test_query_cache_key_ignores_how_content_is_stored(mock_user):
+    from unittest.mock import AsyncMock
+    from app.routers.documents import query_document
+    from app.schemas.query_schemas import QueryRequest
+    from app.services.database.documents import encode_content
+
+    content = "Groups and rings. " * 100
+    match = {"answer": "Stored answer", "chunks": [0]}
+    keys = []
+    for stored in (content, encode_content(content)):
+        with patch(
+            "app.routers.documents.get_stored_content", return_value=stored
+        ), patch(
+            "app.routers.documents.find_cached_answer", AsyncMock(return_value=match)
+        ) as mock_find, patch(
+            "app.routers.documents.add_query_to_document", AsyncMock()
+        ):
+            await query_document(1, QueryRequest(question="Q"), mock_user)
+        keys.append(mock_find.call_args.args[2]["content"])
+
+    # Compressing a document must not orphan its cached answers.
+    assert keys[0] == keys[1]
+
+
+def test_upload_document_reuses_artifacts_of_known_file(test_client, mock_user):
+    from unittest.mock import AsyncMock
+    from app.main import app
+    from app.services.auth import get_current_user
+    import hashlib
+
+    metadata = {"title": "T", "subject": "S", "summary": "Sum"}
+    shared = {"text": "raw", "cleaned": "cleaned", "metadata": metadata}
+    stored = {
+        "id": 7,
+        "title": "T",
+        "subject": "S",
+        "content": "cleaned",
+        "summary": "Sum",
+        "queries": [],
+        "uploadedDate": "2025-01-01T00:00:00",
+        "lastViewed": None,
+    }
+
+    app.dependency_overrides[get_current_user] = lambda: mock_user
+    try:
+        with patch(
+            "app.routers.documents.get_artifacts", AsyncMock(return_value=shared)
+        ) as mock_artifacts, patch(
+            "app.routers.documents.extract_stage"
+        ) as mock_extract, patch(
+            "app.routers.documents.clean_stage"
+        ) as mock_clean, patch(
+            "app.routers.documents.summarize_stage"
+        ) as mock_summarize, patch(
+            "app.routers.documents.store_stage", AsyncMock(return_value=stored)
+        ) as mock_store:
+            response = test_client.post(
+                "/documents/upload",
+                files={"file": ("notes.pdf", b"%PDF-1.4", "application/pdf")},
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    mock_artifacts.assert_awaited_once_with(hashlib.sha256(b"%PDF-1.4").hexdigest())
+    mock_extract.assert_not_called()
+    mock_clean.assert_not_called()
+    mock_summarize.assert_not_called()
+    mock_store.assert_awaited_once_with(mock_user.id, "cleaned", metadata)
+
+
+def test_query_document_stream_forwards_tokens_and_saves_answer(
+    test_client, mock_user, mock_document
+):
+    import json
+    from unittest.mock import AsyncMock, MagicMock
+    from app.main import app
+    from app.services.auth import get_current_user
+    from app.services.retrieval import build_index
+
+    async def stream_groq(prompt):
+        for token in ["An", " answer"]:
+            yield token
+
+    app.dependency_overrides[get_current_user] = lambda: mock_user
+    try:
+        with patch(
+            "app.routers.documents.get_stored_content",
+            return_value=mock_document["content"],
+        ), patch(
+            "app.routers.documents.find_cached_answer", AsyncMock(return_value=None)
+        ), patch(
+            "app.routers.documents.get_document_index",
+            return_value=build_index(mock_document["content"]),
+        ), patch(
+            "app.routers.documents.stream_groq", stream_groq
+        ), patch(
+            "app.routers.documents.add_query_to_document",
+            AsyncMock(return_value=MagicMock(modified_count=1)),
+        ) as mock_add_query:
+            response = test_client.post(
+                "/documents/1/query/stream", json={"question": "What?"}
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    events = [
+        json.loads(line[len("data: ") :])
+        for line in response.text.splitlines()
+        if line.startswith("data: ")
+    ]
+    assert [event["delta"] for event in events[:2]] == ["An", " answer"]
+    assert events[-1]["answer"] == "An answer"
+    assert "event: done" in response.text
+    assert mock_add_query.call_args.args[2]["answer"] == "An answer"
+
+
+def test_query_document_stream_upstream_failure_is_bad_gateway(
+    test_client, mock_user, mock_document
+):
+    from unittest.mock import AsyncMock
+    from app.main import app
+    from app.services.auth import get_current_user
+    from app.services.retrieval import build_index
+
+    async def stream_groq(prompt):
+        raise RuntimeError("Groq API error: 429")
+        yield
+
+    app.dependency_overrides[get_current_user] = lambda: mock_user
+    try:
+        with patch(
+            "app.routers.documents.get_stored_content",
+            return_value=mock_document["content"],
+        ), patch(
+            "app.routers.documents.find_cached_answer", AsyncMock(return_value=None)
+        ), patch(
+            "app.routers.documents.get_document_index",
+            return_value=build_index(mock_document["content"]),
+        ), patch(
+            "app.routers.documents.stream_groq", stream_groq
+        ), patch(
+            "app.routers.documents.add_query_to_document"
+        ) as mock_add_query:
+            response = test_client.post(
+                "/documents/1/query/stream", json={"question": "What?"}
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 502
+    mock_add_query.assert_not_called()
+
+
+def test_get_document_queries_pages_with_cursor_header(test_client, mock_user):
+    from unittest.mock import AsyncMock
+    from app.main import app
+    from app.services.auth import get_current_user
+
+    page = [{"question": "Newest"}, {"question": "Older"}]
+    app.dependency_overrides[get_current_user] = lambda: mock_user
+    try:
+        with patch(
+            "app.routers.documents.document_exists", AsyncMock(return_value=True)
+        ), patch(
+            "app.routers.documents.list_document_queries",
+            AsyncMock(return_value=(page, "next-page")),
+        ) as mock_list:
+            response = test_client.get("/documents/1/queries?limit=2&cursor=abc")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.json() == page
+    assert response.headers["X-Next-Cursor"] == "next-page"
+    mock_list.assert_awaited_once_with(mock_user.id, 1, 2, "abc")
+
+
+def test_get_document_queries_errors(test_client, mock_user):
+    from unittest.mock import AsyncMock
+    from app.main import app
+    from app.services.auth import get_current_user
+
+    app.dependency_overrides[get_current_user] = lambda: mock_user
+    try:
+        with patch(
+            "app.routers.documents.document_exists", AsyncMock(return_value=False)
+        ):
+            missing = test_client.get("/documents/999/queries")
+        with patch(
+            "app.routers.documents.document_exists", AsyncMock(return_value=True)
+        ), patch(
+            "app.routers.documents.list_document_queries",
+            AsyncMock(side_effect=ValueError("Invalid cursor")),
+        ):
+            bad_cursor = test_client.get("/documents/1/queries?cursor=garbage")
+    finally:
+        app.dependency_overrides.clear()
+
+    assert missing.status_code == 404
+    assert bad_cursor.status_code == 400
+    assert bad_cursor.json()["detail"] == "Invalid cursor"
+
+
+def test_upload_document_cleanup_failure_is_a_gateway_error(test_client, mock_user):
+    from unittest.mock import AsyncMock
+    from fastapi import HTTPException
+    from app.main import app
+    from app.services.auth import get_current_user
+
+    app.dependency_overrides[get_current_user] = lambda: mock_user
+    try:
+        with patch(
+            "app.routers.documents.get_artifacts", AsyncMock(return_value={})
+        ), patch("app.services.pipeline.save_artifact", AsyncMock()), patch(
+            "app.routers.documents.extract_stage", AsyncMock(return_value="raw")
+        ), patch(
+            "app.routers.documents.clean_stage",
+            AsyncMock(
+                side_effect=[
+                    HTTPException(status_code=504, detail="Text cleanup timed out"),
+                    RuntimeError("connection reset"),
+                ]
+            ),
+        ), patch(
+            "app.routers.documents.store_stage", AsyncMock()
+        ) as mock_store:
+            responses = [
+                test_client.post(
+                    "/documents/upload",
+                    files={"file": ("notes.pdf", b"%PDF-1.4", "application/pdf")},
+                )
+                for _ in range(2)
+            ]
+    finally:
+        app.dependency_overrides.clear()
+
+    assert [response.status_code for response in responses] == [504, 502]
+    assert responses[1].json()["detail"] == "Text cleanup failed"
+    mock_store.assert_not_called()
+
+
+def test_upload_document_with_extractor_leaves_shared_artifacts_alone(
+    test_client, mock_user
+):
+    from unittest.mock import AsyncMock
+    from app.main import app
+    from app.services.auth import get_current_user
+
+    metadata = {"title": "T", "subject": "S", "summary": "Sum"}
+    app.dependency_overrides[get_current_user] = lambda: mock_user
+    try:
+        with patch(
+            "app.routers.documents.get_artifacts", AsyncMock()
+        ) as mock_artifacts, patch(
+            "app.services.pipeline.save_artifact", AsyncMock()
+        ) as mock_save, patch(
+            "app.routers.documents.extract_stage", AsyncMock(return_value="raw")
+        ) as mock_extract, patch(
+            "app.routers.documents.clean_stage", AsyncMock(return_value="cleaned")
+        ), patch(
+            "app.routers.documents.summarize_stage", AsyncMock(return_value=metadata)
+        ), patch(
+            "app.routers.documents.store_stage", AsyncMock(return_value={"id": 7})
+        ):
+            response = test_client.post(
+                "/documents/upload?extractor=pdfplumber",
+                files={"file": ("notes.pdf", b"%PDF-1.4", "application/pdf")},
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert mock_extract.call_args.args[1] == "pdfplumber"
+    mock_artifacts.assert_not_called()
+    mock_save.assert_not_called()
@@ -0,0 +1,55 @@
+import sys
+from pathlib import Path
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent.parent))
+from app.core.limits import BodySizeLimitMiddleware
+
+
+def make_client(max_bytes: int) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(BodySizeLimitMiddleware, max_bytes=max_bytes)
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    return TestClient(app)
+
+
+def test_body_under_limit_is_accepted():
+    client = make_client(4096)
+
+    response = client.post(
+        "/upload", files={"file": ("notes.pdf", b"x" * 1000, "application/pdf")}
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"size": 1000}
+
+
+def test_declared_content_length_over_limit_is_rejected():
+    client = make_client(4096)
+
+    response = client.post(
+        "/upload", files={"file": ("notes.pdf", b"x" * 5000, "application/pdf")}
+    )
+
+    assert response.status_code == 413
+
+
+def test_streamed_body_over_limit_is_rejected_while_reading():
+    client = make_client(4096)
+
+    def chunks():
+        for _ in range(10):
+            yield b"x" * 1024
+
+    response = client.post(
+        "/upload",
+        content=chunks(),
+        headers={"Content-Type": "multipart/form-data; boundary=b"},
+    )
+
+    assert response.status_code == 413
@@ -0,0 +1,36 @@
+import sys
+from pathlib import Path
+import pytest
+from unittest.mock import AsyncMock, patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent.parent))
+from app.services.pipeline import clean_stage
+
+
+@pytest.mark.asyncio
+async def test_metrics_reports_requests_and_upload_stages(test_client):
+    with patch("app.services.pipeline.clean_text_with_groq", AsyncMock()):
+        await clean_stage("raw")
+    test_client.get("/health")
+
+    response = test_client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/health",status="200"}'
+        in response.text
+    )
+    assert 'upload_stage_duration_seconds_count{stage="clean"}' in response.text
+    assert "# TYPE mongo_command_duration_seconds histogram" in response.text
+
+
+def test_debug_traces_are_hidden_unless_enabled(test_client):
+    with patch("app.main.get_groq_trace", AsyncMock(return_value=[])):
+        hidden = test_client.get("/debug/traces/" + "a" * 32)
+        with patch("app.core.tracing.TRACE_DEBUG_ENDPOINTS", True):
+            shown = test_client.get("/debug/traces/" + "a" * 32)
+
+    assert test_client.get("/debug/traces").status_code == 404
+    assert hidden.status_code == 404
+    assert shown.status_code == 200
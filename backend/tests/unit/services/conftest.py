@@ -1,7 +1,7 @@
 import sys
 from pathlib import Path
 import pytest
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 import asyncio
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent.parent))
@@ -22,15 +22,56 @@ def mock_users_collection():
     """Mock users collection"""
     with patch(
         "app.services.database.user.get_users_collection", new_callable=AsyncMock
-    ) as mock_get_users, patch(
-        "app.services.database.documents.get_users_collection", new_callable=AsyncMock
-    ) as mock_get_docs_users:
+    ) as mock_get_users:
         mock_collection = AsyncMock()
         mock_get_users.return_value = mock_collection
-        mock_get_docs_users.return_value = mock_collection
         yield mock_collection
 
 
+@pytest.fixture
+def mock_documents_collection():
+    """Mock documents collection"""
+    with patch(
+        "app.services.database.documents.get_documents_collection",
+        new_callable=AsyncMock,
+    ) as mock_get_documents:
+        mock_collection = AsyncMock()
+        mock_collection.find = MagicMock()
+        mock_get_documents.return_value = mock_collection
+        yield mock_collection
+
+
+@pytest.fixture
+def mock_queries_collection():
+    """Mock queries collection"""
+    with patch(
+        "app.services.database.queries.get_queries_collection",
+        new_callable=AsyncMock,
+    ) as mock_get_queries:
+        mock_collection = AsyncMock()
+        mock_collection.find = MagicMock()
+        mock_get_queries.return_value = mock_collection
+        yield mock_collection
+
+
+@pytest.fixture
+def memory_db():
+    """In-memory Mongo for tests that depend on real query semantics"""
+    from mongomock_motor import AsyncMongoMockClient
+
+    db = AsyncMongoMockClient()["test_db"]
+
+    async def get_db():
+        return db
+
+    with patch("app.services.database.documents.get_database", get_db), patch(
+        "app.services.database.queries.get_database", get_db
+    ), patch("app.services.database.postings.get_database", get_db), patch(
+        "app.services.database.jobs.get_database", get_db
+    ):
+        yield db
+
+
 @pytest.fixture(scope="session")
 def event_loop_policy():
     return asyncio.DefaultEventLoopPolicy()
@@ -0,0 +1,78 @@
+import sys
+from pathlib import Path
+import pytest
+from unittest.mock import patch, AsyncMock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent.parent))
+from app.services.answer_cache import (
+    ANSWER_CACHE_LOOKUPS,
+    best_match,
+    cache_key,
+    find_cached_answer,
+    normalize_question,
+    similarity,
+)
+
+
+def lookups(result):
+    return ANSWER_CACHE_LOOKUPS._values.get((result,), 0)
+
+
+def test_normalize_question_ignores_case_punctuation_and_spacing():
+    assert normalize_question("Summarize chapter 2?") == "summarize chapter 2"
+    assert normalize_question("  summarize   CHAPTER 2 ") == "summarize chapter 2"
+
+
+def test_similar_questions_share_most_of_their_signature():
+    first = cache_key("content", "Can you summarize the proof of theorem 4 briefly")
+    second = cache_key("content", "Can you summarize the proof of theorem 4 quickly")
+    other = cache_key("content", "Which exercises cover integration by parts")
+
+    assert similarity(first["minhash"], first["minhash"]) == 1.0
+    assert similarity(first["minhash"], second["minhash"]) > 0.6
+    assert similarity(first["minhash"], other["minhash"]) < 0.2
+
+
+def test_cache_key_changes_with_content():
+    assert (
+        cache_key("old text", "Q")["content"] != cache_key("new text", "Q")["content"]
+    )
+
+
+def test_best_match_requires_the_same_numbers():
+    key = cache_key("content", "summarize chapter 2 in detail please")
+    other_chapter = {
+        "answer": "About chapter 3",
+        "cache": cache_key("content", "summarize chapter 3 in detail please"),
+    }
+    same_chapter = {
+        "answer": "About chapter 2",
+        "cache": cache_key("content", "please summarize chapter 2 in detail"),
+    }
+
+    with patch("app.services.answer_cache.ANSWER_CACHE_SIMILARITY", 0.5):
+        assert best_match(key, [other_chapter]) is None
+        assert best_match(key, [other_chapter, same_chapter]) is same_chapter
+
+
+@pytest.mark.asyncio
+async def test_find_cached_answer_prefers_exact_match_and_counts_lookups():
+    key = cache_key("content", "What is a group?")
+    stored = {"answer": "A set with an operation", "cache": key}
+    exact_before, miss_before = lookups("exact"), lookups("miss")
+
+    with patch(
+        "app.services.answer_cache.find_cached_query", AsyncMock(return_value=stored)
+    ), patch("app.services.answer_cache.list_cache_candidates") as mock_candidates:
+        assert await find_cached_answer("test-user-id", 1, key) is stored
+    mock_candidates.assert_not_called()
+
+    with patch(
+        "app.services.answer_cache.find_cached_query", AsyncMock(return_value=None)
+    ), patch(
+        "app.services.answer_cache.list_cache_candidates", AsyncMock(return_value=[])
+    ):
+        assert await find_cached_answer("test-user-id", 1, key) is None
+
+    assert lookups("exact") == exact_before + 1
+    assert lookups("miss") == miss_before + 1
@@ -71,3 +71,118 @@ def test_create_access_token():
 
     assert isinstance(token, str)
     assert len(token) > 0
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_caches_principal():
+    from app.services.auth import get_current_user, principal_cache
+
+    mock_user_data = {
+        "id": "1",
+        "email": "test@example.com",
+        "name": "Test User",
+        "hashed_password": "hashed_password",
+        "createdAt": datetime(2023, 1, 1, 0, 0, 0, tzinfo=ZoneInfo("Asia/Jerusalem")),
+    }
+    token = create_access_token({"sub": "test@example.com"})
+    principal_cache.clear()
+
+    with patch(
+        "app.services.auth.get_user_by_email", AsyncMock(return_value=mock_user_data)
+    ) as mock_get_user:
+        first = await get_current_user(token)
+        second = await get_current_user(token)
+        principal_cache.forget("1")
+        await get_current_user(token)
+
+    assert first is second
+    assert not hasattr(first, "hashed_password")
+    assert mock_get_user.await_count == 2
+    principal_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_stateless_trusts_claims():
+    from app.schemas.user_schemas import User
+    from app.services.auth import get_current_user, token_claims
+
+    user = User(
+        id="1",
+        name="Test User",
+        email="test@example.com",
+        createdAt=datetime(2023, 1, 1, tzinfo=ZoneInfo("Asia/Jerusalem")),
+    )
+    token = create_access_token(token_claims(user))
+
+    with patch("app.services.auth.AUTH_STATELESS", True), patch(
+        "app.services.auth.get_user_by_email", AsyncMock()
+    ) as mock_get_user:
+        current = await get_current_user(token)
+
+    mock_get_user.assert_not_called()
+    assert (current.id, current.email, current.createdAt) == (
+        "1",
+        "test@example.com",
+        user.createdAt,
+    )
+
+
+def test_principal_cache_is_bounded_and_expires():
+    from app.schemas.user_schemas import User
+    from app.services.auth import PrincipalCache
+
+    cache = PrincipalCache(max_size=2, ttl_seconds=60)
+    for number in range(3):
+        cache.set(f"{number}@x", User(id=str(number), name="n", email=f"{number}@x"))
+
+    assert len(cache) == 2
+    assert cache.get("0@x") is None
+
+    with patch("app.services.auth.time.monotonic", return_value=10**9):
+        assert cache.get("2@x") is None
+
+
+@pytest.mark.asyncio
+async def test_password_hashing_runs_off_the_event_loop():
+    from passlib.context import CryptContext
+    from app.core import utils
+
+    fast_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=4)
+    with patch.object(utils, "pwd_context", fast_context):
+        hashed = await utils.get_password_hash("password123")
+
+        assert await utils.verify_password("password123", hashed)
+        assert not await utils.verify_password("wrong", hashed)
+        assert not utils.password_needs_rehash(hashed)
+        assert not utils.password_needs_rehash("not-a-bcrypt-hash")
+
+    stronger_context = CryptContext(
+        schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=5
+    )
+    with patch.object(utils, "pwd_context", stronger_context):
+        assert utils.password_needs_rehash(hashed)
+
+
+@pytest.mark.asyncio
+async def test_authenticate_user_rehashes_outdated_password(mock_db):
+    mock_user_data = {
+        "id": "1",
+        "email": "test@example.com",
+        "name": "Test User",
+        "hashed_password": "old_hash",
+        "createdAt": datetime(2023, 1, 1, 0, 0, 0, tzinfo=ZoneInfo("Asia/Jerusalem")),
+    }
+
+    with patch(
+        "app.services.auth.get_user_by_email", AsyncMock(return_value=mock_user_data)
+    ), patch("app.services.auth.verify_password", return_value=True), patch(
+        "app.services.auth.password_needs_rehash", return_value=True
+    ), patch(
+        "app.services.auth.get_password_hash", return_value="new_hash"
+    ), patch(
+        "app.services.auth.update_user", AsyncMock()
+    ) as mock_update:
+        user = await authenticate_user(mock_db, "test@example.com", "password123")
+
+    assert user.hashed_password == "new_hash"
+    mock_update.assert_awaited_once_with("1", {"hashed_password": "new_hash"})
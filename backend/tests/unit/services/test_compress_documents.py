@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent.parent))
+from app.services.database.documents import decode_content
+from scripts.compress_documents import compress_document
+
+NOTES = "Lecture notes about limits. " * 100
+
+
+@pytest.fixture
+def patched_documents(mock_documents_collection):
+    mock_documents_collection.update_one.return_value = MagicMock(modified_count=1)
+    with patch(
+        "scripts.compress_documents.get_documents_collection",
+        AsyncMock(return_value=mock_documents_collection),
+    ):
+        yield mock_documents_collection
+
+
+@pytest.mark.asyncio
+async def test_compress_document_rewrites_unchanged_content(patched_documents):
+    doc = {"user_id": "test-user-id", "id": 1, "content": NOTES}
+
+    saved = await compress_document(doc)
+
+    query, update = patched_documents.update_one.call_args.args
+    assert query == {"user_id": "test-user-id", "id": 1, "content": NOTES}
+    assert decode_content(update["$set"]["content"]) == NOTES
+    assert saved == len(NOTES) - len(update["$set"]["content"])
+
+
+@pytest.mark.asyncio
+async def test_compress_document_leaves_short_content(patched_documents):
+    doc = {"user_id": "test-user-id", "id": 1, "content": "Short note"}
+
+    assert await compress_document(doc) == 0
+    patched_documents.update_one.assert_not_called()
@@ -0,0 +1,107 @@
+import sys
+from pathlib import Path
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent.parent))
+from app.services.database import core
+from app.services.database.core import PoolStats, get_client, close_client
+from app.services.database.indexes import ensure_indexes
+
+
+def test_get_client_is_shared_and_configured():
+    close_client()
+    try:
+        client = get_client()
+
+        assert get_client() is client
+        assert client.options.pool_options.max_pool_size == core.MONGO_MAX_POOL_SIZE
+        assert client.options.pool_options.max_idle_time_seconds == (
+            core.MONGO_MAX_IDLE_TIME_MS / 1000
+        )
+    finally:
+        close_client()
+
+
+def test_pool_stats_tracks_connections():
+    stats = PoolStats()
+    event = MagicMock()
+
+    stats.connection_created(event)
+    stats.connection_created(event)
+    stats.connection_checked_out(event)
+    stats.connection_checked_in(event)
+    stats.connection_checked_out(event)
+    stats.connection_closed(event)
+
+    assert stats.snapshot() == {
+        "open": 1,
+        "in_use": 1,
+        "idle": 0,
+        "created": 2,
+        "closed": 1,
+        "checkouts": 2,
+        "checkout_failures": 0,
+        "clears": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_ensure_indexes_creates_unique_user_indexes():
+    users = AsyncMock()
+    jobs = AsyncMock()
+    artifacts = AsyncMock()
+
+    with patch(
+        "app.services.database.indexes.get_users_collection",
+        AsyncMock(return_value=users),
+    ), patch(
+        "app.services.database.indexes.get_jobs_collection",
+        AsyncMock(return_value=jobs),
+    ), patch(
+        "app.services.database.indexes.get_artifacts_collection",
+        AsyncMock(return_value=artifacts),
+    ), patch(
+        "app.services.database.indexes.ensure_document_indexes", AsyncMock()
+    ) as mock_document_indexes, patch(
+        "app.services.database.indexes.ensure_query_indexes", AsyncMock()
+    ) as mock_query_indexes, patch(
+        "app.services.database.indexes.ensure_postings_indexes", AsyncMock()
+    ) as mock_postings_indexes:
+        await ensure_indexes()
+
+    users.create_index.assert_any_call([("email", 1)], unique=True)
+    users.create_index.assert_any_call([("id", 1)], unique=True)
+    jobs.create_index.assert_any_call([("id", 1)], unique=True)
+    artifacts.create_index.assert_any_call([("hash", 1)], unique=True)
+    mock_document_indexes.assert_called_once()
+    mock_query_indexes.assert_called_once()
+    mock_postings_indexes.assert_called_once()
+
+
+def test_command_timings_record_duration_and_in_flight():
+    from app.services.database.core import (
+        MONGO_COMMAND_SECONDS,
+        MONGO_COMMANDS_IN_FLIGHT,
+        CommandTimings,
+    )
+
+    timings = CommandTimings()
+    event = MagicMock(command_name="bench_find", duration_micros=2500)
+
+    timings.started(event)
+    assert MONGO_COMMANDS_IN_FLIGHT.render()[-1] == "mongo_commands_in_flight 1"
+    timings.succeeded(event)
+    timings.started(event)
+    timings.failed(event)
+
+    lines = MONGO_COMMAND_SECONDS.render()
+    assert MONGO_COMMANDS_IN_FLIGHT.render()[-1] == "mongo_commands_in_flight 0"
+    assert (
+        'mongo_command_duration_seconds_sum{command="bench_find",outcome="ok"} 0.0025'
+        in lines
+    )
+    assert (
+        'mongo_command_duration_seconds_count{command="bench_find",outcome="error"} 1'
+        in lines
+    )
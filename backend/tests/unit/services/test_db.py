@@ -1,69 +1,383 @@
 import sys
 from pathlib import Path
 import pytest
-from unittest.mock import patch, AsyncMock
+from unittest.mock import patch, AsyncMock, MagicMock
 from datetime import datetime
 from zoneinfo import ZoneInfo
+from fastapi import HTTPException
+from bson import ObjectId
 
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent.parent))
 from app.services.database.documents import (
-    get_user_documents,
+    list_user_documents,
+    decode_cursor,
     get_document,
     add_document_to_user,
+    delete_document,
+    decode_content,
+    encode_content,
 )
+from app.services.database.queries import (
+    DOCUMENT_RECENT_QUERIES,
+    add_query_to_document,
+    find_cached_query,
+    list_document_queries,
+)
+
+
+def make_cursor(documents):
+    cursor = MagicMock()
+    cursor.sort.return_value = cursor
+    cursor.limit.return_value = cursor
+    cursor.to_list = AsyncMock(return_value=documents)
+    return cursor
 
 
 @pytest.mark.asyncio
-async def test_get_user_documents(mock_users_collection):
+async def test_list_user_documents(mock_documents_collection):
 
-    mock_user = {
-        "id": "test-user-id",
-        "documents": [
-            {"id": 1, "title": "Doc 1"},
-            {"id": 2, "title": "Doc 2"},
-        ],
-    }
-    mock_users_collection.find_one.return_value = mock_user
+    mock_documents = [
+        {"id": 2, "title": "Doc 2"},
+        {"id": 1, "title": "Doc 1"},
+    ]
+    cursor = make_cursor(mock_documents)
+    mock_documents_collection.find.return_value = cursor
+
+    result, next_cursor = await list_user_documents("test-user-id", "All Subjects")
+
+    assert result == mock_documents
+    assert next_cursor is None
+    query, projection = mock_documents_collection.find.call_args.args
+    assert query == {"user_id": "test-user-id"}
+    assert "content" not in projection and "queries" not in projection
+    cursor.sort.assert_called_once_with([("uploadedDate", -1), ("id", -1)])
+
+
+@pytest.mark.asyncio
+async def test_list_user_documents_filters_subject_and_pages(
+    mock_documents_collection,
+):
+
+    uploaded = datetime(2025, 3, 1, 12, 0)
+    page = [
+        {"id": 5, "uploadedDate": uploaded},
+        {"id": 4, "uploadedDate": uploaded},
+        {"id": 3, "uploadedDate": uploaded},
+    ]
+    mock_documents_collection.find.return_value = make_cursor(page)
+
+    result, next_cursor = await list_user_documents(
+        "test-user-id", "Math", "recent", limit=2
+    )
+
+    assert [doc["id"] for doc in result] == [5, 4]
+    assert decode_cursor(next_cursor) == (uploaded, 4)
+    query = mock_documents_collection.find.call_args.args[0]
+    assert query == {"user_id": "test-user-id", "subject": "Math"}
+
+    mock_documents_collection.find.return_value = make_cursor(page[2:])
+    result, next_cursor = await list_user_documents(
+        "test-user-id", "Math", "recent", limit=2, cursor=next_cursor
+    )
+
+    assert [doc["id"] for doc in result] == [3]
+    assert next_cursor is None
+    query = mock_documents_collection.find.call_args.args[0]
+    assert query["$or"][1] == {"uploadedDate": uploaded, "id": {"$lt": 4}}
+
+
+@pytest.mark.asyncio
+async def test_stored_documents_page_by_upload_date(memory_db):
+    from app.services.pipeline import store_stage
+
+    metadata = {"title": "Notes", "subject": "Math", "summary": "Summary"}
+    for _ in range(5):
+        await store_stage("test-user-id", "Some notes.", metadata)
+
+    stored = await memory_db["documents"].find_one({})
+    assert isinstance(stored["uploadedDate"], datetime)
 
-    result = await get_user_documents("test-user-id", "All Subjects")
+    pages, cursor = [], None
+    while True:
+        page, cursor = await list_user_documents(
+            "test-user-id", "All Subjects", "recent", limit=2, cursor=cursor
+        )
+        pages.append([doc["id"] for doc in page])
+        if cursor is None:
+            break
+    assert pages == [[5, 4], [3, 2], [1]]
 
-    assert result == mock_user["documents"]
-    mock_users_collection.find_one.assert_called_once_with({"id": "test-user-id"})
+
+@pytest.mark.asyncio
+async def test_document_listing_indexes_cover_the_cursor_sort(memory_db):
+    from app.services.database.documents import ensure_document_indexes
+
+    await ensure_document_indexes()
+
+    keys = [
+        index["key"]
+        for index in (await memory_db["documents"].index_information()).values()
+    ]
+    for field in ("uploadedDate", "lastViewed"):
+        assert [("user_id", 1), (field, -1), ("id", -1)] in keys
+    assert [("user_id", 1), ("subject", 1), ("uploadedDate", -1), ("id", -1)] in keys
 
 
 @pytest.mark.asyncio
-async def test_get_document(mock_users_collection):
+async def test_document_index_reads_only_the_question_terms(memory_db):
+    from app.services.database.documents import (
+        get_document_index,
+        set_document_index,
+    )
+    from app.services.retrieval import build_index
+
+    content = "# Algebra\n\nGroups and rings.\n\n# Calculus\n\nLimits."
+    await memory_db["documents"].insert_one(
+        {"user_id": "test-user-id", "id": 1, "chunk_index": {"version": 1}}
+    )
+    # Indexes in an older format are rebuilt.
+    assert await get_document_index("test-user-id", 1, ["limits"]) is None
 
-    mock_user = {
-        "documents": [
-            {
-                "id": 1,
-                "title": "Test Document",
-                "content": "Test content",
-                "subject": "Test Subject",
-                "uploadedDate": datetime.now(ZoneInfo("Asia/Jerusalem")),
-            }
-        ]
+    await set_document_index("test-user-id", 1, build_index(content, chunk_words=5))
+
+    stored = await memory_db["documents"].find_one({"id": 1})
+    assert "postings" not in stored["chunk_index"]
+    index = await get_document_index("test-user-id", 1, ["limits", "unknown"])
+    assert index["postings"] == {"limits": ([1], [1])}
+    assert content[slice(*index["spans"][1])] == "# Calculus\n\nLimits."
+
+
+def test_decode_cursor_rejects_garbage():
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_get_document(mock_documents_collection, mock_queries_collection):
+
+    mock_document = {
+        "id": 1,
+        "title": "Test Document",
+        "content": "Test content",
+        "subject": "Test Subject",
+        "uploadedDate": datetime.now(ZoneInfo("Asia/Jerusalem")),
     }
-    mock_users_collection.find_one.return_value = mock_user
+    mock_documents_collection.find_one.return_value = mock_document
+    mock_queries_collection.find.return_value = make_cursor([])
 
     result = await get_document("test-user-id", 1)
 
     assert result is not None
     assert result["id"] == 1
     assert result["title"] == "Test Document"
-    mock_users_collection.find_one.assert_called_once()
+    assert result["queries"] == []
+    query, projection = mock_documents_collection.find_one.call_args.args
+    assert query == {"user_id": "test-user-id", "id": 1}
+    assert projection["queries"] == {"$slice": -DOCUMENT_RECENT_QUERIES}
 
 
 @pytest.mark.asyncio
-async def test_add_document_to_user(mock_users_collection):
+async def test_get_document_returns_only_recent_queries(
+    mock_documents_collection, mock_queries_collection
+):
+
+    # Older versions kept queries inside the document.
+    legacy = [{"question": f"old {i}"} for i in range(DOCUMENT_RECENT_QUERIES)]
+    mock_documents_collection.find_one.return_value = {
+        "id": 1,
+        "title": "Test Document",
+        "content": "Test content",
+        "subject": "Test Subject",
+        "uploadedDate": datetime.now(ZoneInfo("Asia/Jerusalem")),
+        "queries": legacy,
+    }
+    newest_first = [
+        {"_id": ObjectId(), "question": "new 2"},
+        {"_id": ObjectId(), "question": "new 1"},
+    ]
+    cursor = make_cursor(newest_first)
+    mock_queries_collection.find.return_value = cursor
+
+    result = await get_document("test-user-id", 1)
+
+    questions = [query["question"] for query in result["queries"]]
+    assert len(questions) == DOCUMENT_RECENT_QUERIES
+    assert questions[-2:] == ["new 1", "new 2"]
+    assert all("_id" not in query for query in result["queries"])
+    cursor.limit.assert_called_once_with(DOCUMENT_RECENT_QUERIES)
+
+
+@pytest.mark.asyncio
+async def test_add_query_to_document_inserts_into_queries(mock_queries_collection):
+
+    query_data = {"question": "Q", "answer": "A"}
+
+    await add_query_to_document("test-user-id", 1, query_data)
+
+    inserted = mock_queries_collection.insert_one.call_args.args[0]
+    assert inserted == {
+        "question": "Q",
+        "answer": "A",
+        "user_id": "test-user-id",
+        "document_id": 1,
+    }
+    assert "_id" not in query_data
+
+
+@pytest.mark.asyncio
+async def test_list_document_queries_pages_by_id(mock_queries_collection):
+
+    ids = [ObjectId() for _ in range(3)]
+    page = [{"_id": _id, "question": str(_id)} for _id in ids]
+    mock_queries_collection.find.return_value = make_cursor(page)
+
+    result, next_cursor = await list_document_queries("test-user-id", 1, limit=2)
+
+    assert [query["question"] for query in result] == [str(ids[0]), str(ids[1])]
+    assert next_cursor == str(ids[1])
+
+    mock_queries_collection.find.return_value = make_cursor(page[2:])
+    result, next_cursor = await list_document_queries(
+        "test-user-id", 1, limit=2, cursor=next_cursor
+    )
 
-    mock_users_collection.update_one.return_value = AsyncMock(modified_count=1)
+    assert len(result) == 1 and next_cursor is None
+    query = mock_queries_collection.find.call_args.args[0]
+    assert query == {
+        "user_id": "test-user-id",
+        "document_id": 1,
+        "_id": {"$lt": ids[1]},
+    }
+
+
+@pytest.mark.asyncio
+async def test_list_document_queries_rejects_bad_cursor(mock_queries_collection):
+
+    with pytest.raises(ValueError):
+        await list_document_queries("test-user-id", 1, limit=2, cursor="garbage")
+
+
+@pytest.mark.asyncio
+async def test_get_document_not_found(mock_documents_collection):
+
+    mock_documents_collection.find_one.return_value = None
+
+    assert await get_document("test-user-id", 999) is None
+
+
+def test_content_round_trips_through_compression():
+    notes = "# Chapter 1\n\nGroups, rings and fields.\n\n" * 200
+
+    stored = encode_content(notes)
+
+    assert isinstance(stored, bytes) and stored[:1] == b"\x01"
+    assert len(stored) * 5 < len(notes.encode())
+    assert decode_content(stored) == notes
+    # Short content and records written before compression are plain strings.
+    assert encode_content("Short note") == "Short note"
+    assert decode_content("Legacy content") == "Legacy content"
+    with pytest.raises(ValueError):
+        decode_content(b"\x7fnot compressed")
+
+
+@pytest.mark.asyncio
+async def test_get_document_decompresses_content(
+    mock_documents_collection, mock_queries_collection
+):
+
+    notes = "Lecture notes about limits. " * 100
+    mock_documents_collection.find_one.return_value = {
+        "id": 1,
+        "title": "Test Document",
+        "content": encode_content(notes),
+        "subject": "Test Subject",
+        "uploadedDate": datetime.now(ZoneInfo("Asia/Jerusalem")),
+    }
+    mock_queries_collection.find.return_value = make_cursor([])
+
+    result = await get_document("test-user-id", 1)
+
+    assert result["content"] == notes
+
+
+@pytest.mark.asyncio
+async def test_add_document_to_user_compresses_content(mock_documents_collection):
+
+    notes = "Lecture notes about limits. " * 100
+
+    await add_document_to_user("test-user-id", {"id": 1, "content": notes})
+
+    inserted = mock_documents_collection.insert_one.call_args.args[0]
+    assert isinstance(inserted["content"], bytes)
+    assert decode_content(inserted["content"]) == notes
+
+
+@pytest.mark.asyncio
+async def test_add_document_to_user(mock_documents_collection):
+
+    mock_documents_collection.insert_one.return_value = MagicMock(inserted_id="oid")
     document_data = {"id": 1, "title": "New Document"}
 
     result = await add_document_to_user("test-user-id", document_data)
 
-    assert result.modified_count == 1
-    mock_users_collection.update_one.assert_called_once_with(
-        {"id": "test-user-id"}, {"$push": {"documents": document_data}}
+    assert result.inserted_id == "oid"
+    mock_documents_collection.insert_one.assert_called_once_with(
+        {"id": 1, "title": "New Document", "user_id": "test-user-id"}
     )
+
+
+@pytest.mark.asyncio
+async def test_delete_document_not_found(mock_documents_collection):
+
+    mock_documents_collection.delete_one.return_value = MagicMock(deleted_count=0)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await delete_document("test-user-id", 999)
+
+    assert exc_info.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_save_artifact_upserts_by_hash_without_owner():
+    from app.services.database.artifacts import save_artifact
+
+    artifacts = AsyncMock()
+    with patch(
+        "app.services.database.artifacts.get_artifacts_collection",
+        AsyncMock(return_value=artifacts),
+    ):
+        await save_artifact("abc", "cleaned", "text")
+
+    query, update = artifacts.update_one.call_args.args
+    assert query == {"hash": "abc"}
+    assert update["$set"] == {"cleaned": "text"}
+    assert "user_id" not in update["$setOnInsert"]
+    assert artifacts.update_one.call_args.kwargs == {"upsert": True}
+
+
+@pytest.mark.asyncio
+async def test_find_cached_query_matches_key_and_content(mock_queries_collection):
+
+    cache = {"content": "abc", "key": "what is a group", "numbers": [], "minhash": []}
+
+    await find_cached_query("test-user-id", 1, cache)
+
+    query, projection = mock_queries_collection.find_one.call_args.args
+    assert query == {
+        "user_id": "test-user-id",
+        "document_id": 1,
+        "cache.key": "what is a group",
+        "cache.content": "abc",
+    }
+    assert projection["answer"] == 1
+    assert mock_queries_collection.find_one.call_args.kwargs["sort"] == [("_id", -1)]
+
+
+def test_postings_pack_into_uint16_pairs():
+    from app.services.database.postings import pack_postings, unpack_postings
+
+    packed = pack_postings([0, 7, 300], [2, 1, 70000])
+
+    assert len(packed) == 12
+    # Counts past the uint16 range are clamped; BM25 saturates long before.
+    assert unpack_postings(packed) == ([0, 7, 300], [2, 1, 65535])
@@ -0,0 +1,119 @@
+import sys
+from pathlib import Path
+import pytest
+import pymupdf
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent.parent))
+from app.services.extraction import engine
+from app.services.extraction.backends import EXTRACTORS, get_extractor
+from app.services.extraction.engine import (
+    extract_page_range,
+    extract_pdf_pages,
+    extract_pdf_text,
+    split_page_ranges,
+)
+
+
+def make_pdf(page_count: int) -> bytes:
+    pdf = pymupdf.open()
+    for number in range(page_count):
+        page = pdf.new_page()
+        page.insert_text((72, 72), f"Page number {number}")
+    contents = pdf.tobytes()
+    pdf.close()
+    return contents
+
+
+def test_split_page_ranges_covers_every_page_in_order():
+    ranges = split_page_ranges(37, workers=4, pages_per_task=5)
+
+    assert ranges[0] == (0, 5)
+    assert ranges[-1] == (35, 37)
+    assert [page for start, end in ranges for page in range(start, end)] == list(
+        range(37)
+    )
+
+
+def test_split_page_ranges_spreads_small_documents_across_workers():
+    assert split_page_ranges(4, workers=4, pages_per_task=16) == [
+        (0, 1),
+        (1, 2),
+        (2, 3),
+        (3, 4),
+    ]
+    assert split_page_ranges(0, workers=4) == []
+
+
+@pytest.mark.parametrize("name", sorted(EXTRACTORS))
+def test_every_extractor_returns_requested_pages(name):
+    contents = make_pdf(4)
+    extractor = get_extractor(name)
+
+    assert extractor.count_pages(contents) == 4
+    assert extractor.extract_pages(contents, [3, 1]) == [
+        "Page number 3",
+        "Page number 1",
+    ]
+
+
+@pytest.mark.parametrize("name", sorted(EXTRACTORS))
+def test_every_extractor_reads_from_a_path(name, tmp_path):
+    path = tmp_path / "notes.pdf"
+    path.write_bytes(make_pdf(2))
+    extractor = get_extractor(name)
+
+    assert extractor.count_pages(str(path)) == 2
+    assert extractor.extract_pages(str(path), [1]) == ["Page number 1"]
+
+
+def test_get_extractor_rejects_unknown_name():
+    with pytest.raises(ValueError):
+        get_extractor("tesseract")
+
+
+def test_extract_page_range_retries_empty_pages_with_fallback():
+    contents = make_pdf(3)
+    pymupdf_extractor = EXTRACTORS["pymupdf"]
+
+    with patch.object(
+        pymupdf_extractor,
+        "extract_pages",
+        return_value=["Page number 0", "", "Page number 2"],
+    ), patch.object(
+        EXTRACTORS["pdfplumber"], "extract_pages", return_value=["recovered"]
+    ) as mock_fallback:
+        pages = extract_page_range(contents, 0, 3, "pymupdf", "pdfplumber")
+
+    assert pages == ["Page number 0", "recovered", "Page number 2"]
+    mock_fallback.assert_called_once_with(contents, [1])
+
+
+@pytest.mark.asyncio
+async def test_extract_pdf_pages_in_process_pool_keeps_page_order():
+    contents = make_pdf(7)
+
+    with patch.object(engine, "PDF_EXTRACT_WORKERS", 2), patch.object(
+        engine, "PDF_PAGES_PER_TASK", 2
+    ), patch.object(engine, "_pool", None):
+        try:
+            pages = await extract_pdf_pages(contents)
+        finally:
+            engine.shutdown_extraction_pool()
+
+    assert [page.strip() for page in pages] == [
+        f"Page number {number}" for number in range(7)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_extract_pdf_text_without_pool_uses_thread():
+    contents = make_pdf(3)
+
+    with patch.object(engine, "PDF_EXTRACT_WORKERS", 0), patch.object(
+        engine, "_pool", None
+    ):
+        text = await extract_pdf_text(contents)
+        assert engine._pool is None
+
+    assert text.split("\f") == ["Page number 0", "Page number 1", "Page number 2"]
@@ -0,0 +1,412 @@
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+import pytest
+from fastapi import HTTPException
+from unittest.mock import patch, AsyncMock, MagicMock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent.parent))
+from app.services.jobs import run_job, submit_upload_job
+from app.services.uploads import SpooledUpload
+
+
+def make_job(**overrides):
+    # run_job deletes the spooled file when it is done with it, so every job
+    # gets its own throwaway file.
+    fd, file_path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    job = {
+        "id": "job-1",
+        "user_id": "test-user-id",
+        "filename": "notes.pdf",
+        "extractor": None,
+        "status": "running",
+        "stages": {
+            stage: {"status": "pending"}
+            for stage in ["extract", "clean", "summarize", "store"]
+        },
+        "file_path": file_path,
+        "artifacts": {},
+        "document_id": None,
+        "attempts": 1,
+    }
+    job.update(overrides)
+    return job
+
+
+@pytest.mark.asyncio
+async def test_run_job_runs_every_stage_in_order():
+    calls = []
+    metadata = {"title": "T", "subject": "S", "summary": "Sum"}
+
+    async def extract(contents, extractor):
+        calls.append("extract")
+        return "raw"
+
+    async def clean(text, deadline):
+        calls.append("clean")
+        return "cleaned"
+
+    async def summarize(text):
+        calls.append("summarize")
+        return metadata
+
+    async def store(user_id, cleaned, meta, document_id):
+        calls.append("store")
+        return MagicMock(id=document_id)
+
+    with patch(
+        "app.services.jobs.claim_job", AsyncMock(return_value=make_job())
+    ), patch("app.services.jobs.update_job", AsyncMock()) as mock_update, patch(
+        "app.services.jobs.renew_job_lease", AsyncMock()
+    ), patch(
+        "app.services.jobs.get_next_document_id", AsyncMock(return_value=42)
+    ), patch(
+        "app.services.jobs.extract_stage", extract
+    ), patch(
+        "app.services.jobs.clean_stage", clean
+    ), patch(
+        "app.services.jobs.summarize_stage", summarize
+    ), patch(
+        "app.services.jobs.store_stage", store
+    ):
+        await run_job("job-1")
+
+    assert calls == ["extract", "clean", "summarize", "store"]
+    updates = [call.args[1] for call in mock_update.call_args_list]
+    assert {"document_id": 42} in updates
+    assert updates[-1]["status"] == "completed"
+
+
+@pytest.mark.asyncio
+async def test_run_job_resumes_after_last_completed_stage():
+    job = make_job(artifacts={"text": "raw"}, file=None)
+    job["stages"]["extract"]["status"] = "completed"
+
+    with patch("app.services.jobs.claim_job", AsyncMock(return_value=job)), patch(
+        "app.services.jobs.update_job", AsyncMock()
+    ), patch("app.services.jobs.renew_job_lease", AsyncMock()), patch(
+        "app.services.jobs.get_next_document_id", AsyncMock(return_value=7)
+    ), patch(
+        "app.services.jobs.extract_stage", AsyncMock()
+    ) as mock_extract, patch(
+        "app.services.jobs.clean_stage", AsyncMock(return_value="cleaned")
+    ) as mock_clean, patch(
+        "app.services.jobs.summarize_stage",
+        AsyncMock(return_value={"title": "T", "subject": "S", "summary": "Sum"}),
+    ), patch(
+        "app.services.jobs.store_stage", AsyncMock(return_value=MagicMock(id=7))
+    ):
+        await run_job("job-1")
+
+    mock_extract.assert_not_called()
+    assert mock_clean.call_args.args == ("raw",)
+
+
+@pytest.mark.asyncio
+async def test_run_job_failed_stage_is_requeued_for_retry():
+    with patch(
+        "app.services.jobs.claim_job", AsyncMock(return_value=make_job())
+    ), patch("app.services.jobs.update_job", AsyncMock()) as mock_update, patch(
+        "app.services.jobs.extract_stage", AsyncMock(return_value="raw")
+    ), patch(
+        "app.services.jobs.renew_job_lease", AsyncMock()
+    ), patch(
+        "app.services.jobs.clean_stage", AsyncMock(side_effect=RuntimeError("boom"))
+    ):
+        await run_job("job-1")
+
+    last_update = mock_update.call_args_list[-1].args[1]
+    assert last_update["status"] == "queued"
+    assert last_update["stages.clean.status"] == "pending"
+    assert last_update["lease_until"] is not None
+    assert "boom" in last_update["error"]
+
+
+@pytest.mark.asyncio
+async def test_run_job_skips_job_leased_elsewhere():
+    with patch("app.services.jobs.claim_job", AsyncMock(return_value=None)), patch(
+        "app.services.jobs.extract_stage", AsyncMock()
+    ) as mock_extract:
+        await run_job("job-1")
+
+    mock_extract.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_run_job_reuses_shared_artifacts():
+    shared = {
+        "hash": "abc",
+        "text": "raw",
+        "cleaned": "cleaned",
+        "metadata": {"title": "T", "subject": "S", "summary": "Sum"},
+    }
+    store = AsyncMock(return_value=MagicMock(id=42))
+
+    with patch(
+        "app.services.jobs.claim_job",
+        AsyncMock(return_value=make_job(content_hash="abc")),
+    ), patch("app.services.jobs.update_job", AsyncMock()), patch(
+        "app.services.jobs.renew_job_lease", AsyncMock()
+    ), patch(
+        "app.services.jobs.get_next_document_id", AsyncMock(return_value=42)
+    ), patch(
+        "app.services.jobs.get_artifacts", AsyncMock(return_value=shared)
+    ), patch(
+        "app.services.jobs.extract_stage"
+    ) as mock_extract, patch(
+        "app.services.jobs.clean_stage"
+    ) as mock_clean, patch(
+        "app.services.jobs.summarize_stage"
+    ) as mock_summarize, patch(
+        "app.services.jobs.store_stage", store
+    ):
+        await run_job("job-1")
+
+    mock_extract.assert_not_called()
+    mock_clean.assert_not_called()
+    mock_summarize.assert_not_called()
+    store.assert_awaited_once_with("test-user-id", "cleaned", shared["metadata"], 42)
+
+
+@pytest.mark.asyncio
+async def test_run_job_with_extractor_neither_reuses_nor_saves_artifacts():
+    metadata = {"title": "T", "subject": "S", "summary": "Sum"}
+
+    with patch(
+        "app.services.jobs.claim_job",
+        AsyncMock(return_value=make_job(content_hash="abc", extractor="pdfplumber")),
+    ), patch("app.services.jobs.update_job", AsyncMock()), patch(
+        "app.services.jobs.renew_job_lease", AsyncMock()
+    ), patch(
+        "app.services.jobs.get_next_document_id", AsyncMock(return_value=42)
+    ), patch(
+        "app.services.jobs.get_artifacts", AsyncMock()
+    ) as mock_artifacts, patch(
+        "app.services.pipeline.save_artifact", AsyncMock()
+    ) as mock_save, patch(
+        "app.services.jobs.extract_stage", AsyncMock(return_value="raw")
+    ) as mock_extract, patch(
+        "app.services.jobs.clean_stage", AsyncMock(return_value="cleaned")
+    ), patch(
+        "app.services.jobs.summarize_stage", AsyncMock(return_value=metadata)
+    ), patch(
+        "app.services.jobs.store_stage", AsyncMock(return_value=MagicMock(id=42))
+    ):
+        await run_job("job-1")
+
+    mock_extract.assert_awaited_once()
+    mock_artifacts.assert_not_called()
+    mock_save.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_submitted_job_keeps_the_spooled_path_not_the_pdf(tmp_path):
+    path = tmp_path / "upload.pdf"
+    path.write_bytes(b"%PDF-1.4")
+
+    with patch("app.services.jobs.create_job", AsyncMock()) as mock_create:
+        job = await submit_upload_job(
+            "test-user-id", "notes.pdf", SpooledUpload(str(path), 8, "abc")
+        )
+
+    stored = mock_create.call_args.args[0]
+    assert stored is job
+    assert stored["file_path"] == str(path)
+    assert stored["content_hash"] == "abc"
+    assert "file" not in stored
+
+
+@pytest.mark.asyncio
+async def test_run_job_extracts_by_path_and_removes_the_upload(tmp_path):
+    path = tmp_path / "upload.pdf"
+    path.write_bytes(b"%PDF-1.4")
+    sources = []
+
+    async def extract(source, extractor):
+        sources.append(source)
+        assert path.exists()
+        return "raw"
+
+    with patch(
+        "app.services.jobs.claim_job",
+        AsyncMock(return_value=make_job(file_path=str(path))),
+    ), patch("app.services.jobs.update_job", AsyncMock()) as mock_update, patch(
+        "app.services.jobs.renew_job_lease", AsyncMock()
+    ), patch(
+        "app.services.jobs.get_next_document_id", AsyncMock(return_value=42)
+    ), patch(
+        "app.services.jobs.extract_stage", extract
+    ), patch(
+        "app.services.jobs.clean_stage", AsyncMock(return_value="cleaned")
+    ), patch(
+        "app.services.jobs.summarize_stage",
+        AsyncMock(return_value={"title": "T", "subject": "S", "summary": "Sum"}),
+    ), patch(
+        "app.services.jobs.store_stage", AsyncMock(return_value=MagicMock(id=42))
+    ):
+        await run_job("job-1")
+
+    assert sources == [str(path)]
+    assert not path.exists()
+    extract_checkpoint = next(
+        call for call in mock_update.call_args_list if "artifacts.text" in call.args[1]
+    )
+    assert "file_path" in extract_checkpoint.kwargs["unset"]
+
+
+@pytest.mark.asyncio
+async def test_run_job_removes_the_upload_once_it_gives_up(tmp_path):
+    path = tmp_path / "upload.pdf"
+    path.write_bytes(b"%PDF-1.4")
+
+    with patch(
+        "app.services.jobs.claim_job",
+        AsyncMock(return_value=make_job(file_path=str(path), attempts=3)),
+    ), patch("app.services.jobs.update_job", AsyncMock()) as mock_update, patch(
+        "app.services.jobs.extract_stage", AsyncMock(side_effect=RuntimeError("bad"))
+    ):
+        await run_job("job-1")
+
+    assert mock_update.call_args_list[-1].args[1]["status"] == "failed"
+    assert not path.exists()
+
+
+@pytest.mark.asyncio
+async def test_run_job_renews_its_lease_while_a_stage_runs():
+    async def slow_clean(text, deadline):
+        await asyncio.sleep(0.05)
+        return "cleaned"
+
+    with patch("app.services.jobs.JOB_HEARTBEAT_SECONDS", 0.01), patch(
+        "app.services.jobs.claim_job", AsyncMock(return_value=make_job())
+    ), patch("app.services.jobs.update_job", AsyncMock()), patch(
+        "app.services.jobs.renew_job_lease", AsyncMock()
+    ) as mock_renew, patch(
+        "app.services.jobs.get_next_document_id", AsyncMock(return_value=42)
+    ), patch(
+        "app.services.jobs.extract_stage", AsyncMock(return_value="raw")
+    ), patch(
+        "app.services.jobs.clean_stage", slow_clean
+    ), patch(
+        "app.services.jobs.summarize_stage",
+        AsyncMock(return_value={"title": "T", "subject": "S", "summary": "Sum"}),
+    ), patch(
+        "app.services.jobs.store_stage", AsyncMock(return_value=MagicMock(id=42))
+    ):
+        await run_job("job-1")
+        renewals = mock_renew.await_count
+        await asyncio.sleep(0.03)
+
+    assert renewals >= 2
+    # The heartbeat stops with the job.
+    assert mock_renew.await_count == renewals
+
+
+@pytest.mark.asyncio
+async def test_lease_of_a_dead_worker_expires_quickly(memory_db):
+    from datetime import datetime, timedelta
+    from zoneinfo import ZoneInfo
+    from app.services.database.jobs import (
+        claim_job,
+        create_job,
+        get_resumable_job_ids,
+        renew_job_lease,
+    )
+
+    await create_job({**make_job(status="queued"), "lease_until": None})
+    assert await claim_job("job-1", 60)
+    assert await get_resumable_job_ids() == []
+
+    # A restart stops the heartbeat; the short lease then runs out.
+    later = datetime.now(ZoneInfo("Asia/Jerusalem")) + timedelta(seconds=61)
+    with patch("app.services.database.jobs.datetime") as mock_datetime:
+        mock_datetime.now.return_value = later
+        assert await get_resumable_job_ids() == ["job-1"]
+
+    # Renewals only extend running jobs, so a requeued job keeps its backoff.
+    await memory_db["jobs"].update_one(
+        {"id": "job-1"}, {"$set": {"status": "queued", "lease_until": None}}
+    )
+    await renew_job_lease("job-1", 60)
+    assert (await memory_db["jobs"].find_one({"id": "job-1"}))["lease_until"] is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "error",
+    [
+        HTTPException(status_code=413, detail="Document too long to clean in time"),
+        FileNotFoundError("upload is gone"),
+    ],
+)
+async def test_run_job_fails_at_once_on_errors_that_would_recur(error):
+    with patch(
+        "app.services.jobs.claim_job", AsyncMock(return_value=make_job(attempts=1))
+    ), patch("app.services.jobs.update_job", AsyncMock()) as mock_update, patch(
+        "app.services.jobs.extract_stage", AsyncMock(return_value="raw")
+    ), patch(
+        "app.services.jobs.clean_stage", AsyncMock(side_effect=error)
+    ):
+        await run_job("job-1")
+
+    last_update = mock_update.call_args_list[-1].args[1]
+    assert last_update["status"] == "failed"
+    assert last_update["stages.clean.status"] == "failed"
+    assert last_update["lease_until"] is None
+
+
+@pytest.mark.asyncio
+async def test_run_job_retries_gateway_errors():
+    with patch(
+        "app.services.jobs.claim_job", AsyncMock(return_value=make_job(attempts=1))
+    ), patch("app.services.jobs.update_job", AsyncMock()) as mock_update, patch(
+        "app.services.jobs.extract_stage", AsyncMock(return_value="raw")
+    ), patch(
+        "app.services.jobs.clean_stage",
+        AsyncMock(side_effect=HTTPException(status_code=504, detail="timed out")),
+    ):
+        await run_job("job-1")
+
+    assert mock_update.call_args_list[-1].args[1]["status"] == "queued"
+
+
+@pytest.mark.asyncio
+async def test_run_job_cleans_with_the_longer_job_deadline():
+    from app.llm.groq import GROQ_JOB_CLEANUP_DEADLINE
+
+    with patch(
+        "app.services.jobs.claim_job", AsyncMock(return_value=make_job())
+    ), patch("app.services.jobs.update_job", AsyncMock()), patch(
+        "app.services.jobs.get_next_document_id", AsyncMock(return_value=42)
+    ), patch(
+        "app.services.jobs.extract_stage", AsyncMock(return_value="raw")
+    ), patch(
+        "app.services.jobs.clean_stage", AsyncMock(return_value="cleaned")
+    ) as mock_clean, patch(
+        "app.services.jobs.summarize_stage",
+        AsyncMock(return_value={"title": "T", "subject": "S", "summary": "Sum"}),
+    ), patch(
+        "app.services.jobs.store_stage", AsyncMock(return_value=MagicMock(id=42))
+    ):
+        await run_job("job-1")
+
+    mock_clean.assert_awaited_once_with("raw", deadline=GROQ_JOB_CLEANUP_DEADLINE)
+
+
+@pytest.mark.asyncio
+async def test_run_job_with_a_lost_upload_fails_once_with_a_clear_error(tmp_path):
+    with patch(
+        "app.services.jobs.claim_job",
+        AsyncMock(return_value=make_job(file_path=str(tmp_path / "gone.pdf"))),
+    ), patch("app.services.jobs.update_job", AsyncMock()) as mock_update, patch(
+        "app.services.jobs.extract_stage", AsyncMock()
+    ) as mock_extract:
+        await run_job("job-1")
+
+    last_update = mock_update.call_args_list[-1].args[1]
+    assert last_update["status"] == "failed"
+    assert "upload it again" in last_update["error"]
+    mock_extract.assert_not_called()
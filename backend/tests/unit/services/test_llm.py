@@ -0,0 +1,180 @@
+import json
+import sys
+from pathlib import Path
+import httpx
+import pytest
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent.parent))
+from app.llm import groq
+from app.llm.groq import call_groq, clean_text_with_groq, get_groq_client
+
+
+@pytest.fixture
+def groq_requests():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.url.path == "/clean-text":
+            return httpx.Response(200, json={"content": "cleaned"})
+        return httpx.Response(200, json={"choices": []})
+
+    client = httpx.AsyncClient(
+        base_url="http://groq", transport=httpx.MockTransport(handler)
+    )
+    with patch.object(groq, "_client", client):
+        yield requests
+
+
+@pytest.mark.asyncio
+async def test_calls_share_one_client(groq_requests):
+    client = get_groq_client()
+
+    await call_groq("prompt")
+    await clean_text_with_groq("raw")
+
+    assert get_groq_client() is client
+    assert [request.url.path for request in groq_requests] == [
+        "/call-groq",
+        "/clean-text",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_operations_use_their_own_read_timeout(groq_requests):
+    await call_groq("prompt", timeout=12)
+    await clean_text_with_groq("raw")
+
+    query_timeout, cleanup_timeout = [
+        request.extensions["timeout"] for request in groq_requests
+    ]
+    assert query_timeout["read"] == 12
+    assert query_timeout["connect"] == groq.GROQ_SERVICE_CONNECT_TIMEOUT
+    assert cleanup_timeout["read"] == groq.GROQ_CLEANUP_TIMEOUT
+
+
+@pytest.mark.asyncio
+async def test_clean_text_can_ask_for_a_longer_deadline(groq_requests):
+    await clean_text_with_groq("raw", deadline=1800)
+
+    assert groq_requests[0].url.params["deadline"] == "1800"
+    assert groq_requests[0].extensions["timeout"]["read"] == (
+        1800 + groq.GROQ_DEADLINE_MARGIN_SECONDS
+    )
+
+
+@pytest.mark.asyncio
+async def test_calls_opt_in_to_response_cache(groq_requests):
+    await call_groq("prompt")
+    await call_groq("prompt", cache=False)
+
+    assert [json.loads(request.content)["cache"] for request in groq_requests] == [
+        True,
+        False,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stream_groq_yields_deltas_and_raises_on_error_event():
+    from app.llm.groq import stream_groq
+
+    bodies = [
+        'data: {"delta": "Hel"}\n\ndata: {"delta": "lo"}\n\ndata: [DONE]\n\n',
+        'data: {"delta": "Hel"}\n\nevent: error\ndata: {"detail": "boom"}\n\n',
+    ]
+
+    def handler(request):
+        return httpx.Response(200, text=bodies.pop(0))
+
+    client = httpx.AsyncClient(
+        base_url="http://groq", transport=httpx.MockTransport(handler)
+    )
+    with patch.object(groq, "_client", client):
+        assert [delta async for delta in stream_groq("prompt")] == ["Hel", "lo"]
+
+        received = []
+        with pytest.raises(RuntimeError, match="boom"):
+            async for delta in stream_groq("prompt"):
+                received.append(delta)
+        assert received == ["Hel"]
+
+
+@pytest.mark.asyncio
+async def test_call_groq_batch_sends_one_request():
+    from app.llm.groq import call_groq_batch
+
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        items = json.loads(request.content)["items"]
+        return httpx.Response(
+            200, json={"results": [{"response": item["prompt"]} for item in items]}
+        )
+
+    client = httpx.AsyncClient(
+        base_url="http://groq", transport=httpx.MockTransport(handler)
+    )
+    with patch.object(groq, "_client", client):
+        results = await call_groq_batch(["one", "two"])
+
+    assert len(requests) == 1
+    assert requests[0].url.path == "/call-groq/batch"
+    assert [result["response"] for result in results] == ["one", "two"]
+
+
+@pytest.mark.asyncio
+async def test_calls_name_their_task_and_leave_model_to_routing(groq_requests):
+    await call_groq("prompt")
+    await clean_text_with_groq("raw")
+    await call_groq("prompt", model="llama3-70b-8192")
+
+    bodies = [json.loads(request.content) for request in groq_requests]
+    assert [body["task"] for body in bodies] == ["query", "cleanup", "query"]
+    assert "model" not in bodies[0] and "model" not in bodies[1]
+    assert bodies[2]["model"] == "llama3-70b-8192"
+
+
+@pytest.mark.asyncio
+async def test_calls_carry_the_current_trace(groq_requests):
+    from app.core.tracing import parse_traceparent, span, tracer
+
+    with span("POST /documents/upload") as server:
+        await clean_text_with_groq("raw")
+
+    trace_id, parent_id = parse_traceparent(groq_requests[0].headers["traceparent"])
+    client_span = [s for s in tracer.trace(server.trace_id) if s["spanId"] == parent_id]
+    assert trace_id == server.trace_id
+    assert groq_requests[0].headers["x-request-id"] == server.trace_id
+    assert client_span[0]["name"] == "groq_service /clean-text"
+    assert client_span[0]["parentSpanId"] == server.span_id
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "failure, status",
+    [
+        (httpx.ReadTimeout("read timed out"), 504),
+        (httpx.Response(504, json={"detail": "deadline"}), 504),
+        (httpx.Response(413, json={"detail": "too long"}), 413),
+        (httpx.Response(503, json={"detail": "queue"}), 502),
+        (httpx.ConnectError("refused"), 502),
+    ],
+)
+async def test_clean_text_failures_map_to_gateway_errors(failure, status):
+    from fastapi import HTTPException
+
+    def handler(request):
+        if isinstance(failure, Exception):
+            raise failure
+        return failure
+
+    client = httpx.AsyncClient(
+        base_url="http://groq", transport=httpx.MockTransport(handler)
+    )
+    with patch.object(groq, "_client", client):
+        with pytest.raises(HTTPException) as error:
+            await clean_text_with_groq("raw")
+
+    assert error.value.status_code == status
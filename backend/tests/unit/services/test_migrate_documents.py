@@ -0,0 +1,51 @@
+import sys
+from pathlib import Path
+import pytest
+from unittest.mock import patch, AsyncMock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent.parent))
+from scripts.migrate_documents import migrate_user
+
+USER = {
+    "id": "test-user-id",
+    "documents": [{"id": 1, "title": "Doc 1"}, {"id": 2, "title": "Doc 2"}],
+}
+
+
+@pytest.fixture
+def patched_collections(mock_documents_collection, mock_users_collection):
+    with patch(
+        "scripts.migrate_documents.get_documents_collection",
+        AsyncMock(return_value=mock_documents_collection),
+    ), patch(
+        "scripts.migrate_documents.get_users_collection",
+        AsyncMock(return_value=mock_users_collection),
+    ):
+        yield mock_documents_collection, mock_users_collection
+
+
+@pytest.mark.asyncio
+async def test_migrate_user_copies_without_overwriting(patched_collections):
+    mock_documents_collection, mock_users_collection = patched_collections
+
+    migrated = await migrate_user(USER, prune=False)
+
+    assert migrated == 2
+    first_call = mock_documents_collection.update_one.call_args_list[0]
+    assert first_call.args == (
+        {"user_id": "test-user-id", "id": 1},
+        {"$setOnInsert": {"id": 1, "title": "Doc 1", "user_id": "test-user-id"}},
+    )
+    assert first_call.kwargs == {"upsert": True}
+    mock_users_collection.update_one.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_migrate_user_prune_pulls_migrated_documents(patched_collections):
+    mock_documents_collection, mock_users_collection = patched_collections
+
+    await migrate_user(USER, prune=True)
+
+    mock_users_collection.update_one.assert_called_once_with(
+        {"id": "test-user-id"}, {"$pull": {"documents": {"id": {"$in": [1, 2]}}}}
+    )
@@ -0,0 +1,72 @@
+import sys
+from pathlib import Path
+import pytest
+import time
+from datetime import datetime, timezone
+from unittest.mock import patch, AsyncMock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent.parent))
+from scripts.migrate_queries import legacy_query_id, migrate_document
+
+ASKED = datetime(2025, 3, 1, 12, 0, tzinfo=timezone.utc)
+DOC = {
+    "user_id": "test-user-id",
+    "id": 1,
+    "uploadedDate": datetime(2025, 2, 1, tzinfo=timezone.utc),
+    "queries": [
+        {"question": "Q1", "answer": "A1", "timestamp": ASKED},
+        {"question": "Q2", "answer": "A2", "timestamp": ASKED},
+    ],
+}
+
+
+@pytest.mark.asyncio
+async def test_migrate_document_copies_then_unsets(
+    mock_documents_collection, mock_queries_collection
+):
+    with patch(
+        "scripts.migrate_queries.get_documents_collection",
+        AsyncMock(return_value=mock_documents_collection),
+    ), patch(
+        "scripts.migrate_queries.get_queries_collection",
+        AsyncMock(return_value=mock_queries_collection),
+    ):
+        migrated = await migrate_document(DOC)
+
+    assert migrated == 2
+    first_call = mock_queries_collection.update_one.call_args_list[0]
+    assert first_call.args[0] == {"_id": legacy_query_id(DOC, 0, DOC["queries"][0])}
+    assert first_call.args[1]["$setOnInsert"]["document_id"] == 1
+    assert first_call.kwargs == {"upsert": True}
+    mock_documents_collection.update_one.assert_called_once_with(
+        {"user_id": "test-user-id", "id": 1}, {"$unset": {"queries": ""}}
+    )
+
+
+def test_legacy_query_id_is_stable_and_dated():
+    first = legacy_query_id(DOC, 0, DOC["queries"][0])
+
+    assert first == legacy_query_id(DOC, 0, DOC["queries"][0])
+    assert first != legacy_query_id(DOC, 1, DOC["queries"][1])
+    assert first.generation_time == ASKED
+
+
+def test_legacy_query_id_reads_naive_dates_as_utc():
+    naive = {"question": "Q", "answer": "A", "timestamp": ASKED.replace(tzinfo=None)}
+
+    try:
+        with patch.dict("os.environ", {"TZ": "Asia/Jerusalem"}):
+            time.tzset()
+            query_id = legacy_query_id(DOC, 0, naive)
+    finally:
+        time.tzset()
+
+    assert query_id.generation_time == ASKED
+
+
+def test_legacy_query_id_falls_back_to_string_upload_date():
+    doc = {**DOC, "uploadedDate": "2025-02-01T02:00:00+02:00"}
+
+    query_id = legacy_query_id(doc, 0, {"question": "Q", "answer": "A"})
+
+    assert query_id.generation_time == datetime(2025, 2, 1, tzinfo=timezone.utc)
@@ -0,0 +1,36 @@
+import sys
+from pathlib import Path
+import pytest
+from datetime import datetime
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent.parent))
+from app.services.database.documents import list_user_documents
+from scripts.normalize_dates import normalize
+
+
+@pytest.mark.asyncio
+async def test_normalize_turns_string_dates_into_dates(memory_db):
+    for document_id in range(1, 4):
+        await memory_db["documents"].insert_one(
+            {
+                "user_id": "test-user-id",
+                "id": document_id,
+                "title": f"Doc {document_id}",
+                "subject": "Math",
+                "uploadedDate": f"2025-03-0{document_id}T12:00:00+02:00",
+                "lastViewed": None,
+            }
+        )
+
+    await normalize(batch_size=2)
+
+    stored = await memory_db["documents"].find_one({"id": 1})
+    assert isinstance(stored["uploadedDate"], datetime)
+    page, cursor = await list_user_documents(
+        "test-user-id", "All Subjects", "recent", limit=2
+    )
+    assert [doc["id"] for doc in page] == [3, 2]
+    page, cursor = await list_user_documents(
+        "test-user-id", "All Subjects", "recent", limit=2, cursor=cursor
+    )
+    assert [doc["id"] for doc in page] == [1] and cursor is None
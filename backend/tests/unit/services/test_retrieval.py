@@ -0,0 +1,89 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent.parent))
+from app.services.retrieval import (
+    build_index,
+    chunk_document,
+    query_terms,
+    search,
+    select_context,
+)
+
+CONTENT = "\n\n".join(
+    [
+        "# Photosynthesis",
+        "Plants convert light energy into chemical energy in the chloroplast.",
+        "# Cell Division",
+        "Mitosis produces two identical daughter cells from one parent cell.",
+        "# Respiration",
+        "Cells release energy from glucose through cellular respiration.",
+    ]
+)
+
+
+def test_chunk_document_respects_word_budget():
+    paragraphs = [f"paragraph {n} " + "word " * 48 for n in range(6)]
+
+    chunks = chunk_document("\n\n".join(paragraphs), chunk_words=120)
+
+    assert len(chunks) == 3
+    assert all(len(chunk.split()) <= 120 for chunk in chunks)
+
+
+def test_chunk_document_starts_new_chunk_at_heading():
+    chunks = chunk_document(CONTENT, chunk_words=20)
+
+    assert [chunk.splitlines()[0] for chunk in chunks] == [
+        "# Photosynthesis",
+        "# Cell Division",
+        "# Respiration",
+    ]
+
+
+def test_search_ranks_matching_chunk_first():
+    index = build_index(CONTENT, chunk_words=20)
+
+    assert search(index, "What is mitosis?", top_k=1) == [1]
+    assert search(index, "How do cells get energy from glucose?")[0] == 2
+
+
+def test_index_keeps_offsets_instead_of_chunk_text():
+    index = build_index(CONTENT, chunk_words=20)
+
+    assert "chunks" not in index
+    start, end = index["spans"][1]
+    assert CONTENT[start:end].startswith("# Cell Division")
+    assert index["postings"]["mitosis"] == ([1], [1])
+
+
+def test_search_needs_only_the_question_terms():
+    index = build_index(CONTENT, chunk_words=20)
+    terms = query_terms("What is mitosis?")
+    partial = {**index, "postings": {t: index["postings"][t] for t in terms}}
+
+    assert terms == ["mitosis"]
+    assert search(partial, "What is mitosis?") == search(index, "What is mitosis?")
+
+
+def test_select_context_returns_chunks_in_document_order():
+    index = build_index(CONTENT, chunk_words=20)
+
+    context, chunk_ids = select_context(
+        index, CONTENT, "respiration and photosynthesis", top_k=2
+    )
+
+    assert chunk_ids == [0, 2]
+    assert context.index("Photosynthesis") < context.index("Respiration")
+    assert "Mitosis" not in context
+
+
+def test_select_context_falls_back_to_opening_chunks():
+    index = build_index(CONTENT, chunk_words=20)
+
+    context, chunk_ids = select_context(
+        index, CONTENT, "quantum chromodynamics", top_k=1
+    )
+
+    assert chunk_ids == [0]
+    assert context.startswith("# Photosynthesis")
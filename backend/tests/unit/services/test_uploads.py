@@ -0,0 +1,52 @@
+import sys
+import hashlib
+import os
+from io import BytesIO
+from pathlib import Path
+import pytest
+from fastapi import HTTPException, UploadFile
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent.parent.parent))
+from app.services.uploads import spool_upload
+
+
+@pytest.mark.asyncio
+async def test_spool_upload_copies_and_hashes_in_chunks():
+    contents = os.urandom(10_000)
+    upload = UploadFile(BytesIO(contents), filename="notes.pdf")
+
+    spooled = await spool_upload(upload, max_bytes=20_000, chunk_bytes=1024)
+    try:
+        assert spooled.size == len(contents)
+        assert spooled.sha256 == hashlib.sha256(contents).hexdigest()
+        assert Path(spooled.path).read_bytes() == contents
+    finally:
+        spooled.unlink()
+
+    assert not os.path.exists(spooled.path)
+
+
+@pytest.mark.asyncio
+async def test_spool_upload_rejects_oversized_file_and_removes_it(tmp_path):
+    upload = UploadFile(BytesIO(b"x" * 5000), filename="notes.pdf")
+
+    with patch("app.services.uploads.UPLOAD_SPOOL_DIR", str(tmp_path)), pytest.raises(
+        HTTPException
+    ) as exc_info:
+        await spool_upload(upload, max_bytes=4096, chunk_bytes=1024)
+
+    assert exc_info.value.status_code == 413
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_spool_upload_creates_the_spool_directory(tmp_path):
+    spool_dir = tmp_path / "data" / "uploads"
+    upload = UploadFile(BytesIO(b"%PDF-1.4"), filename="notes.pdf")
+
+    with patch("app.services.uploads.UPLOAD_SPOOL_DIR", str(spool_dir)):
+        spooled = await spool_upload(upload)
+
+    assert Path(spooled.path).parent == spool_dir
+    spooled.unlink()
@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+# Leave empty to keep the cache in memory only.
+LLM_CACHE_SQLITE_PATH = os.getenv("LLM_CACHE_SQLITE_PATH", "")
+
+
+def cache_key(model: str, prompt: str, params: dict) -> str:
+    """Stable hash of everything that determines a completion."""
+    material = json.dumps(
+        {"model": model, "prompt": prompt, "params": params}, sort_keys=True
+    )
+    return hashlib.sha256(material.encode()).hexdigest()
+
+
+class MemoryCache:
+    """LRU cache with a per-entry TTL and a total size budget in bytes."""
+
+    def __init__(self, max_bytes: int, ttl_seconds: int):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.size = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: str, ttl_seconds: Optional[float] = None):
+        size = len(value.encode())
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        expires_at = time.monotonic() + (ttl_seconds or self.ttl_seconds)
+        self._entries[key] = (expires_at, value)
+        self.size += size
+        while self.size > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str):
+        _, value = self._entries.pop(key)
+        self.size -= len(value.encode())
+
+
+class SqliteCache:
+    """On-disk tier that survives restarts. Calls block; run them off the loop."""
+
+    def __init__(self, path: str, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),)
+            )
+
+    def get(self, key: str) -> Optional[tuple]:
+        """Return ``(value, seconds_left)`` for a live entry."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < time.time():
+            return None
+        return row[0], row[1] - time.time()
+
+    def set(self, key: str, value: str):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?)",
+                (key, value, time.time() + self.ttl_seconds),
+            )
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class ResponseCache:
+    """Memory LRU in front of an optional SQLite tier, with hit/miss counters."""
+
+    def __init__(self, memory: MemoryCache, disk: Optional[SqliteCache] = None):
+        self.memory = memory
+        self.disk = disk
+        self.counters = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "bypasses": 0,
+            "uncacheable": 0,
+        }
+
+    async def get(self, key: str) -> Optional[dict]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.counters["memory_hits"] += 1
+            return json.loads(value)
+        if self.disk is not None:
+            found = await asyncio.to_thread(self.disk.get, key)
+            if found is not None:
+                value, seconds_left = found
+                self.memory.set(key, value, seconds_left)
+                self.counters["disk_hits"] += 1
+                return json.loads(value)
+        self.counters["misses"] += 1
+        return None
+
+    async def set(self, key: str, response: dict):
+        value = json.dumps(response)
+        self.memory.set(key, value)
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.set, key, value)
+        self.counters["stores"] += 1
+
+    def stats(self) -> dict:
+        lookups = (
+            self.counters["memory_hits"]
+            + self.counters["disk_hits"]
+            + self.counters["misses"]
+        )
+        hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+        return {
+            **self.counters,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "memory_bytes": self.memory.size,
+            "disk_enabled": self.disk is not None,
+        }
+
+    def close(self):
+        if self.disk is not None:
+            self.disk.close()
+
+
+def create_response_cache() -> ResponseCache:
+    disk = (
+        SqliteCache(LLM_CACHE_SQLITE_PATH, LLM_CACHE_TTL_SECONDS)
+        if LLM_CACHE_SQLITE_PATH
+        else None
+    )
+    return ResponseCache(MemoryCache(LLM_CACHE_MAX_BYTES, LLM_CACHE_TTL_SECONDS), disk)
+
+
+response_cache = create_response_cache()
@@ -0,0 +1,109 @@
+import math
+import re
+from dataclasses import dataclass
+from typing import List
+
+# Rough llama3 ratio for English prose; keeps chunking free of a tokenizer dependency.
+CHARS_PER_TOKEN = 4
+
+PAGE_BREAK = "\f"
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+@dataclass
+class Chunk:
+    text: str
+    # True when the chunk was cut in the middle of a paragraph.
+    continues: bool = False
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _split_oversized(paragraph: str, max_tokens: int) -> List[str]:
+    """Split a paragraph that alone exceeds the budget, on sentences then words."""
+    pieces: List[str] = []
+    current = ""
+    for sentence in SENTENCE_END.split(paragraph):
+        words = (
+            [sentence] if estimate_tokens(sentence) <= max_tokens else sentence.split()
+        )
+        for word in words:
+            candidate = f"{current} {word}" if current else word
+            if current and estimate_tokens(candidate) > max_tokens:
+                pieces.append(current)
+                current = word
+            else:
+                current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def split_into_chunks(text: str, max_tokens: int) -> List[Chunk]:
+    """Pack whole paragraphs into chunks of at most ``max_tokens``.
+
+    Page breaks (form feeds) are treated as paragraph boundaries. Paragraphs are
+    only cut when a single one is larger than the budget.
+    """
+    units: List[Chunk] = []
+    for page in text.split(PAGE_BREAK):
+        for paragraph in PARAGRAPH_BREAK.split(page):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if estimate_tokens(paragraph) <= max_tokens:
+                units.append(Chunk(paragraph))
+                continue
+            pieces = _split_oversized(paragraph, max_tokens)
+            units.extend(
+                Chunk(piece, continues=index < len(pieces) - 1)
+                for index, piece in enumerate(pieces)
+            )
+
+    chunks: List[Chunk] = []
+    for unit in units:
+        if chunks and not chunks[-1].continues:
+            candidate = f"{chunks[-1].text}\n\n{unit.text}"
+            if estimate_tokens(candidate) <= max_tokens:
+                chunks[-1] = Chunk(candidate, unit.continues)
+                continue
+        chunks.append(unit)
+    return chunks
+
+
+def _first_line(text: str) -> str:
+    return next((line.strip() for line in text.splitlines() if line.strip()), "")
+
+
+def _last_line(text: str) -> str:
+    return next(
+        (line.strip() for line in reversed(text.splitlines()) if line.strip()), ""
+    )
+
+
+def stitch_chunks(chunks: List[Chunk], cleaned: List[str]) -> str:
+    """Join cleaned chunks in order, repairing the seams between them.
+
+    A chunk cut mid-paragraph is glued to the next one with a space, and a line
+    repeated on both sides of a seam (e.g. a heading restated by the model) is
+    kept once.
+    """
+    result = ""
+    for index, (chunk, text) in enumerate(zip(chunks, cleaned)):
+        text = text.strip()
+        if not text:
+            continue
+        if not result:
+            result = text
+            continue
+        previous_line = _last_line(result)
+        if previous_line and _first_line(text) == previous_line:
+            text = text[len(previous_line) :].lstrip()
+            if not text:
+                continue
+        separator = " " if chunks[index - 1].continues else "\n\n"
+        result = f"{result}{separator}{text}"
+    return result
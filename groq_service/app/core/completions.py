@@ -0,0 +1,263 @@
+import json
+import logging
+import os
+import time
+from typing import AsyncIterator, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from app.core.cache import cache_key, response_cache
+from app.core.http_client import GROQ_API_URL, get_upstream_client
+from app.core.metrics import registry
+from app.core.tracing import record_span, span
+from app.core.model_health import model_health
+from app.core.scheduler import (
+    GROQ_MAX_RETRIES,
+    estimate_request_tokens,
+    parse_retry_after,
+    scheduler,
+)
+from app.core.single_flight import single_flight
+from app.schemas.groq_schema import GroqRequest
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Values of the X-LLM-Cache request header.
+CACHE_BYPASS = "bypass"
+CACHE_REFRESH = "refresh"
+
+GROQ_UPSTREAM_SECONDS = registry.histogram(
+    "groq_upstream_duration_seconds",
+    "Time for the Groq API to answer, to the response headers for streams.",
+    ("model", "outcome"),
+)
+GROQ_UPSTREAM_IN_FLIGHT = registry.gauge(
+    "groq_upstream_in_flight", "Calls to the Groq API awaiting an answer.", ("model",)
+)
+GROQ_TOKENS = registry.counter(
+    "groq_tokens_total",
+    "Tokens reported by the Groq API, by model and kind (prompt or completion).",
+    ("model", "kind"),
+)
+
+
+def _upstream_request(request: GroqRequest, **options) -> Tuple[dict, dict]:
+    groq_api_key = os.getenv("GROQ_API_KEY")
+    if not groq_api_key:
+        raise HTTPException(status_code=500, detail="GROQ_API_KEY not configured")
+
+    headers = {
+        "Authorization": f"Bearer {groq_api_key}",
+        "Content-Type": "application/json",
+    }
+    payload = {
+        "model": request.model,
+        "messages": [{"role": "user", "content": request.prompt}],
+        "temperature": request.temperature,
+        **options,
+    }
+    return headers, payload
+
+
+def _record_attempt(model: str, started: float, outcome: str):
+    latency = time.perf_counter() - started
+    model_health.record(model, latency, outcome == "ok")
+    GROQ_UPSTREAM_SECONDS.observe(latency, model=model, outcome=outcome)
+
+
+def _count_tokens(model: str, usage: dict):
+    for kind in ("prompt", "completion"):
+        if usage.get(f"{kind}_tokens"):
+            GROQ_TOKENS.inc(usage[f"{kind}_tokens"], model=model, kind=kind)
+
+
+def _cache_key(request: GroqRequest) -> str:
+    return cache_key(
+        request.model, request.prompt, {"temperature": request.temperature}
+    )
+
+
+def _transport_error(error: httpx.TransportError) -> HTTPException:
+    """A gateway error for a Groq API call that got no response."""
+    logger.error(f"Groq API unreachable: {error!r}")
+    if isinstance(error, httpx.TimeoutException):
+        return HTTPException(status_code=504, detail="Groq API timed out")
+    return HTTPException(status_code=502, detail="Groq API unreachable")
+
+
+async def request_completion(request: GroqRequest) -> dict:
+    """Send one chat completion to the Groq API once the scheduler admits it.
+
+    A 429 pauses the model and the call queues again, up to GROQ_MAX_RETRIES.
+    """
+    headers, payload = _upstream_request(request)
+    tokens = estimate_request_tokens(request.prompt)
+    try:
+        for attempt in range(GROQ_MAX_RETRIES + 1):
+            with span("scheduler.wait", model=request.model):
+                await scheduler.acquire(request.model, tokens, request.priority)
+            started = time.perf_counter()
+            try:
+                with GROQ_UPSTREAM_IN_FLIGHT.track(model=request.model), span(
+                    "groq.chat_completion", model=request.model, attempt=attempt
+                ) as call:
+                    response = await get_upstream_client().post(
+                        GROQ_API_URL, headers=headers, json=payload
+                    )
+                    call.attributes["http.status_code"] = response.status_code
+                if response.status_code == 429 and attempt < GROQ_MAX_RETRIES:
+                    _record_attempt(request.model, started, "rate_limited")
+                    retry_after = parse_retry_after(response.headers)
+                    scheduler.rate_limited(request.model, retry_after, attempt)
+                    continue
+                response.raise_for_status()
+            except Exception:
+                _record_attempt(request.model, started, "error")
+                raise
+            _record_attempt(request.model, started, "ok")
+            body = response.json()
+            usage = body.get("usage") or {}
+            _count_tokens(request.model, usage)
+            scheduler.settle(request.model, tokens, usage.get("total_tokens"))
+            return body
+    except HTTPException:
+        raise
+    except httpx.HTTPStatusError as e:
+        logger.error(f"Groq API error: {str(e)} Response: {e.response.text}")
+        raise HTTPException(
+            status_code=502, detail=f"Groq API error: {e.response.status_code}"
+        )
+    except httpx.TransportError as e:
+        raise _transport_error(e)
+    except Exception as e:
+        logger.exception("Unexpected error during Groq API call")
+        raise HTTPException(status_code=500, detail=f"Groq call failed: {str(e)}")
+
+
+async def create_completion(
+    request: GroqRequest, cache_mode: Optional[str] = None
+) -> Tuple[dict, str]:
+    """Serve a completion from the cache when allowed, else from the Groq API.
+
+    Returns the response and how the cache was used: hit, miss, bypass or off.
+    Identical requests already in flight share one upstream call either way.
+    """
+    key = _cache_key(request)
+
+    async def upstream():
+        return await single_flight.run(key, lambda: request_completion(request))
+
+    if not request.is_cacheable():
+        response_cache.counters["uncacheable"] += 1
+        return await upstream(), "off"
+    if cache_mode == CACHE_BYPASS:
+        response_cache.counters["bypasses"] += 1
+        return await upstream(), "bypass"
+
+    if cache_mode != CACHE_REFRESH:
+        cached = await response_cache.get(key)
+        if cached is not None:
+            return cached, "hit"
+
+    response = await upstream()
+    await response_cache.set(key, response)
+    return response, "miss"
+
+
+async def stream_upstream(request: GroqRequest) -> AsyncIterator[str]:
+    """Yield the content deltas of a streamed chat completion from the Groq API."""
+    headers, payload = _upstream_request(request, stream=True)
+    tokens = estimate_request_tokens(request.prompt)
+    try:
+        for attempt in range(GROQ_MAX_RETRIES + 1):
+            await scheduler.acquire(request.model, tokens, request.priority)
+            started = time.perf_counter()
+            opened = time.time()
+            with GROQ_UPSTREAM_IN_FLIGHT.track(model=request.model):
+                async with get_upstream_client().stream(
+                    "POST", GROQ_API_URL, headers=headers, json=payload
+                ) as response:
+                    # Streams are judged by the time to the response headers.
+                    if response.status_code == 429:
+                        outcome = "rate_limited"
+                    else:
+                        outcome = "error" if response.is_error else "ok"
+                    _record_attempt(request.model, started, outcome)
+                    record_span(
+                        "groq.chat_completion.stream",
+                        opened,
+                        model=request.model,
+                        attempt=attempt,
+                        **{"http.status_code": response.status_code},
+                    )
+                    if response.status_code == 429 and attempt < GROQ_MAX_RETRIES:
+                        retry_after = parse_retry_after(response.headers)
+                        scheduler.rate_limited(request.model, retry_after, attempt)
+                        continue
+                    if response.is_error:
+                        await response.aread()
+                        logger.error(
+                            f"Groq API error: {response.status_code} {response.text}"
+                        )
+                        raise HTTPException(
+                            status_code=502,
+                            detail=f"Groq API error: {response.status_code}",
+                        )
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:") :].strip()
+                        if data == "[DONE]":
+                            break
+                        chunk = json.loads(data)
+                        # Groq reports usage on the last chunk of a stream.
+                        usage = (chunk.get("x_groq") or {}).get("usage")
+                        if usage:
+                            _count_tokens(request.model, usage)
+                        choices = chunk.get("choices") or [{}]
+                        delta = choices[0].get("delta", {}).get("content")
+                        if delta:
+                            yield delta
+                    return
+    except HTTPException:
+        raise
+    except httpx.TransportError as e:
+        raise _transport_error(e)
+    except Exception as e:
+        logger.exception("Unexpected error during Groq API stream")
+        raise HTTPException(status_code=500, detail=f"Groq call failed: {str(e)}")
+
+
+async def stream_completion(
+    request: GroqRequest, cache_mode: Optional[str] = None
+) -> AsyncIterator[str]:
+    """Streaming counterpart of ``create_completion``.
+
+    A cached answer arrives as a single delta; a streamed answer is stored once
+    it has been received in full.
+    """
+    key = None
+    if not request.is_cacheable():
+        response_cache.counters["uncacheable"] += 1
+    elif cache_mode == CACHE_BYPASS:
+        response_cache.counters["bypasses"] += 1
+    else:
+        key = _cache_key(request)
+        if cache_mode != CACHE_REFRESH:
+            cached = await response_cache.get(key)
+            if cached is not None:
+                yield cached["choices"][0]["message"]["content"]
+                return
+
+    parts = []
+    async for delta in stream_upstream(request):
+        parts.append(delta)
+        yield delta
+
+    if key is not None:
+        message = {"role": "assistant", "content": "".join(parts)}
+        await response_cache.set(key, {"choices": [{"message": message}]})
@@ -0,0 +1,59 @@
+import importlib.util
+import logging
+import os
+from typing import Optional
+
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GROQ_API_URL = os.getenv(
+    "GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions"
+)
+# HTTP/2 needs the optional h2 package (pip install "httpx[http2]").
+GROQ_HTTP2 = os.getenv("GROQ_HTTP2", "false").lower() in ("1", "true", "yes")
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "50"))
+GROQ_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("GROQ_MAX_KEEPALIVE_CONNECTIONS", "20"))
+GROQ_KEEPALIVE_EXPIRY = float(os.getenv("GROQ_KEEPALIVE_EXPIRY", "30"))
+GROQ_CONNECT_TIMEOUT = float(os.getenv("GROQ_CONNECT_TIMEOUT", "5"))
+GROQ_READ_TIMEOUT = float(os.getenv("GROQ_READ_TIMEOUT", "60"))
+GROQ_POOL_TIMEOUT = float(os.getenv("GROQ_POOL_TIMEOUT", "10"))
+
+logger = logging.getLogger(__name__)
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def _http2_enabled() -> bool:
+    if GROQ_HTTP2 and importlib.util.find_spec("h2") is None:
+        logger.warning("GROQ_HTTP2 is set but h2 is not installed; using HTTP/1.1")
+        return False
+    return GROQ_HTTP2
+
+
+def get_upstream_client() -> httpx.AsyncClient:
+    """Long-lived client for the Groq API, reusing TCP and TLS connections."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            http2=_http2_enabled(),
+            limits=httpx.Limits(
+                max_connections=GROQ_MAX_CONNECTIONS,
+                max_keepalive_connections=GROQ_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=GROQ_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                GROQ_READ_TIMEOUT,
+                connect=GROQ_CONNECT_TIMEOUT,
+                pool=GROQ_POOL_TIMEOUT,
+            ),
+        )
+    return _client
+
+
+async def close_upstream_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,67 @@
+import os
+import statistics
+import time
+from collections import deque
+from typing import Deque, Dict, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+GROQ_HEALTH_WINDOW = int(os.getenv("GROQ_HEALTH_WINDOW", "20"))
+GROQ_HEALTH_MIN_SAMPLES = int(os.getenv("GROQ_HEALTH_MIN_SAMPLES", "3"))
+GROQ_FAILOVER_ERROR_RATE = float(os.getenv("GROQ_FAILOVER_ERROR_RATE", "0.5"))
+GROQ_FAILOVER_LATENCY_SECONDS = float(os.getenv("GROQ_FAILOVER_LATENCY_SECONDS", "20"))
+# Calls older than this no longer count. A degraded model is tried last, so it
+# gets few new samples; letting the old ones expire is what lets it recover.
+GROQ_HEALTH_MAX_AGE_SECONDS = float(os.getenv("GROQ_HEALTH_MAX_AGE_SECONDS", "300"))
+
+
+class ModelHealth:
+    """Rolling latency and error rate of the most recent upstream calls per model."""
+
+    def __init__(
+        self,
+        window: int = GROQ_HEALTH_WINDOW,
+        max_age: float = GROQ_HEALTH_MAX_AGE_SECONDS,
+    ):
+        self.window = window
+        self.max_age = max_age
+        self._samples: Dict[str, Deque[Tuple[float, float, bool]]] = {}
+
+    def record(self, model: str, latency: float, ok: bool):
+        samples = self._samples.setdefault(model, deque(maxlen=self.window))
+        samples.append((time.monotonic(), latency, ok))
+
+    def _expire(self, samples: Deque[Tuple[float, float, bool]]):
+        oldest = time.monotonic() - self.max_age
+        while samples and samples[0][0] < oldest:
+            samples.popleft()
+
+    def snapshot(self, model: str) -> dict:
+        samples = self._samples.get(model) or deque()
+        self._expire(samples)
+        if not samples:
+            return {"samples": 0, "error_rate": 0.0, "median_latency": 0.0}
+        return {
+            "samples": len(samples),
+            "error_rate": round(sum(not ok for _, _, ok in samples) / len(samples), 3),
+            "median_latency": round(
+                statistics.median(latency for _, latency, _ in samples), 3
+            ),
+        }
+
+    def is_degraded(self, model: str) -> bool:
+        health = self.snapshot(model)
+        if health["samples"] < GROQ_HEALTH_MIN_SAMPLES:
+            return False
+        return (
+            health["error_rate"] >= GROQ_FAILOVER_ERROR_RATE
+            or health["median_latency"] >= GROQ_FAILOVER_LATENCY_SECONDS
+        )
+
+    def stats(self) -> dict:
+        return {model: self.snapshot(model) for model in self._samples}
+
+
+model_health = ModelHealth()
@@ -8,3 +8,15 @@ Rewrite and organize this text using Markdown formatting while preserving paragr
 
 Respond with **only** the refined text — no explanations or additional content.
 """
+
+TEXT_CLEANUP_CHUNK_PROMPT = """
+Given the following PDF text, which is part {part} of {total} of a longer document:
+-- START OF TEXT --
+\n{raw_text}\n
+-- END OF TEXT --
+
+Rewrite and organize this text using Markdown formatting while preserving paragraph meaning.
+Continue the document seamlessly: do not add a title, introduction or closing remarks that are not in the text.
+
+Respond with **only** the refined text — no explanations or additional content.
+"""
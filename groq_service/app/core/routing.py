@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+import time
+from typing import AsyncIterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from app.core.completions import create_completion, stream_completion
+from app.core.model_health import model_health
+from app.core.scheduler import scheduler
+from app.core.tracing import span
+from app.schemas.groq_schema import GroqRequest
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Task -> models to try, best first. Mechanical work goes to a small fast
+# model; answering questions keeps the large one. GROQ_MODEL_ROUTES replaces
+# entries with the same JSON shape.
+MODEL_ROUTES = {
+    "cleanup": ["llama3-8b-8192", "llama3-70b-8192"],
+    "metadata": ["llama3-8b-8192", "llama3-70b-8192"],
+    "query": ["llama3-70b-8192", "llama3-8b-8192"],
+}
+MODEL_ROUTES.update(json.loads(os.getenv("GROQ_MODEL_ROUTES") or "{}"))
+
+# Upstream failures worth retrying on another model, timeouts included.
+FAILOVER_STATUSES = {502, 503, 504}
+
+
+def _is_paused(model: str) -> bool:
+    return scheduler.limiter(model).blocked_until > time.monotonic()
+
+
+def candidate_models(request: GroqRequest) -> List[str]:
+    """Models to try for a request, healthy ones first.
+
+    An explicit model pins the request to it; otherwise the task's route is
+    used, and requests with neither keep the default model.
+    """
+    if not request.task or "model" in request.model_fields_set:
+        return [request.model]
+    if request.task not in MODEL_ROUTES:
+        raise HTTPException(status_code=400, detail=f"Unknown task {request.task}")
+    models = MODEL_ROUTES[request.task]
+    healthy = [
+        model
+        for model in models
+        if not model_health.is_degraded(model) and not _is_paused(model)
+    ]
+    return healthy + [model for model in models if model not in healthy]
+
+
+async def routed_completion(
+    request: GroqRequest, cache_mode: Optional[str] = None
+) -> Tuple[dict, str, str]:
+    """Run the request on the first of its candidate models that answers.
+
+    Returns the response, the cache status and the model used.
+    """
+    models = candidate_models(request)
+    for number, model in enumerate(models):
+        try:
+            with span("route", task=request.task, model=model) as routed:
+                result, cache_status = await create_completion(
+                    request.model_copy(update={"model": model}), cache_mode
+                )
+                routed.attributes["cache"] = cache_status
+            return result, cache_status, model
+        except HTTPException as e:
+            if e.status_code not in FAILOVER_STATUSES or number == len(models) - 1:
+                raise
+            logger.warning(f"{model} failed with {e.status_code}, failing over")
+
+
+async def routed_stream(
+    request: GroqRequest, cache_mode: Optional[str] = None
+) -> Tuple[Optional[str], AsyncIterator[str], str]:
+    """Open a stream on the first candidate model that starts answering.
+
+    Returns the first delta, the remaining deltas and the model used. Once a
+    model has started streaming there is no failover.
+    """
+    models = candidate_models(request)
+    for number, model in enumerate(models):
+        deltas = stream_completion(
+            request.model_copy(update={"model": model}), cache_mode
+        )
+        try:
+            first = await anext(deltas)
+        except StopAsyncIteration:
+            first = None
+        except HTTPException as e:
+            if e.status_code not in FAILOVER_STATUSES or number == len(models) - 1:
+                raise
+            logger.warning(f"{model} failed with {e.status_code}, failing over")
+            continue
+        return first, deltas, model
+
+
+def routing_stats() -> dict:
+    return {
+        "routes": MODEL_ROUTES,
+        "health": model_health.stats(),
+        "degraded": [
+            model
+            for model in model_health.stats()
+            if model_health.is_degraded(model) or _is_paused(model)
+        ],
+    }
@@ -0,0 +1,207 @@
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import random
+import time
+from typing import Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from app.core.chunking import estimate_tokens
+
+load_dotenv()
+
+# Groq limits are per model. 0 turns a limit off. GROQ_MODEL_LIMITS overrides
+# them per model, e.g. {"llama3-8b-8192": {"rpm": 30, "tpm": 30000}}.
+GROQ_REQUESTS_PER_MINUTE = int(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+GROQ_TOKENS_PER_MINUTE = int(os.getenv("GROQ_TOKENS_PER_MINUTE", "6000"))
+GROQ_MODEL_LIMITS = json.loads(os.getenv("GROQ_MODEL_LIMITS") or "{}")
+# Completion tokens charged up front; corrected from the reported usage.
+GROQ_COMPLETION_TOKENS_ESTIMATE = int(
+    os.getenv("GROQ_COMPLETION_TOKENS_ESTIMATE", "1024")
+)
+GROQ_MAX_QUEUE_WAIT_SECONDS = float(os.getenv("GROQ_MAX_QUEUE_WAIT_SECONDS", "30"))
+GROQ_BULK_MAX_QUEUE_WAIT_SECONDS = float(
+    os.getenv("GROQ_BULK_MAX_QUEUE_WAIT_SECONDS", "240")
+)
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "3"))
+GROQ_RETRY_BASE_SECONDS = float(os.getenv("GROQ_RETRY_BASE_SECONDS", "1"))
+
+# Lower runs first.
+PRIORITIES = {"interactive": 0, "bulk": 1}
+
+
+class TokenBucket:
+    """Holds up to ``per_minute`` units and refills continuously."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float) -> float:
+        """Seconds until ``amount`` can be taken; oversized requests wait for a full bucket."""
+        self._refill()
+        needed = min(amount, self.capacity) - self.level
+        return max(0.0, needed / self.rate)
+
+    def take(self, amount: float):
+        self._refill()
+        self.level -= amount
+
+
+class ModelLimiter:
+    """Request and token buckets of one model plus its queue of waiters."""
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self.buckets = {}
+        if requests_per_minute > 0:
+            self.buckets["requests"] = TokenBucket(requests_per_minute)
+        if tokens_per_minute > 0:
+            self.buckets["tokens"] = TokenBucket(tokens_per_minute)
+        self.blocked_until = 0.0
+        self.waiters = []
+        self.changed = asyncio.Condition()
+
+    def delay(self, tokens: int) -> float:
+        amounts = {"requests": 1, "tokens": tokens}
+        delay = max(0.0, self.blocked_until - time.monotonic())
+        for name, bucket in self.buckets.items():
+            delay = max(delay, bucket.delay(amounts[name]))
+        return delay
+
+    def take(self, tokens: int):
+        amounts = {"requests": 1, "tokens": tokens}
+        for name, bucket in self.buckets.items():
+            bucket.take(amounts[name])
+
+
+class Scheduler:
+    """Admits upstream calls per model within its rate limits.
+
+    Waiters for a model are served strictly by priority, then arrival, so
+    interactive calls overtake queued bulk work. A 429 pauses the whole model.
+    """
+
+    def __init__(self):
+        self._limiters: Dict[str, ModelLimiter] = {}
+        self._sequence = itertools.count()
+        self.counters = {
+            "admitted": 0,
+            "queued": 0,
+            "timeouts": 0,
+            "rate_limited": 0,
+        }
+
+    def limiter(self, model: str) -> ModelLimiter:
+        if model not in self._limiters:
+            self._limiters[model] = ModelLimiter(*model_limits(model))
+        return self._limiters[model]
+
+    async def acquire(self, model: str, tokens: int, priority: str = "interactive"):
+        """Wait for a slot; raises a 503 once the maximum queue wait is over."""
+        limiter = self.limiter(model)
+        max_wait = (
+            GROQ_BULK_MAX_QUEUE_WAIT_SECONDS
+            if priority == "bulk"
+            else GROQ_MAX_QUEUE_WAIT_SECONDS
+        )
+        deadline = time.monotonic() + max_wait
+        entry = (PRIORITIES[priority], next(self._sequence))
+        heapq.heappush(limiter.waiters, entry)
+        waited = False
+        try:
+            async with limiter.changed:
+                while True:
+                    delay = None
+                    if limiter.waiters[0] == entry:
+                        delay = limiter.delay(tokens)
+                        if delay == 0:
+                            limiter.take(tokens)
+                            self.counters["admitted"] += 1
+                            self.counters["queued"] += waited
+                            return
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.counters["timeouts"] += 1
+                        raise HTTPException(
+                            status_code=503,
+                            detail="Timed out waiting for the Groq rate limit",
+                        )
+                    waited = True
+                    timeout = remaining if delay is None else min(delay, remaining)
+                    try:
+                        await asyncio.wait_for(limiter.changed.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            limiter.waiters.remove(entry)
+            heapq.heapify(limiter.waiters)
+            async with limiter.changed:
+                limiter.changed.notify_all()
+
+    def settle(self, model: str, estimated: int, actual: Optional[int]):
+        """Correct the token bucket once the real usage of a call is known."""
+        bucket = self.limiter(model).buckets.get("tokens")
+        if bucket is not None and actual is not None:
+            bucket.take(actual - estimated)
+
+    def rate_limited(self, model: str, retry_after: Optional[float], attempt: int):
+        """Pause the model after a 429, as told by Retry-After or by backoff."""
+        self.counters["rate_limited"] += 1
+        if retry_after is not None:
+            pause = retry_after + random.uniform(0, GROQ_RETRY_BASE_SECONDS)
+        else:
+            pause = GROQ_RETRY_BASE_SECONDS * 2**attempt * random.uniform(0.5, 1.5)
+        limiter = self.limiter(model)
+        limiter.blocked_until = max(limiter.blocked_until, time.monotonic() + pause)
+
+    def stats(self) -> dict:
+        return {
+            **self.counters,
+            "models": {
+                model: {
+                    "waiting": len(limiter.waiters),
+                    "paused_seconds": round(
+                        max(0.0, limiter.blocked_until - time.monotonic()), 3
+                    ),
+                    **{
+                        f"{name}_available": round(bucket.level, 1)
+                        for name, bucket in limiter.buckets.items()
+                    },
+                }
+                for model, limiter in self._limiters.items()
+            },
+        }
+
+
+def model_limits(model: str) -> Tuple[int, int]:
+    """Requests and tokens per minute configured for ``model``; 0 is unlimited."""
+    limits = GROQ_MODEL_LIMITS.get(model, {})
+    return (
+        limits.get("rpm", GROQ_REQUESTS_PER_MINUTE),
+        limits.get("tpm", GROQ_TOKENS_PER_MINUTE),
+    )
+
+
+def estimate_request_tokens(prompt: str) -> int:
+    return estimate_tokens(prompt) + GROQ_COMPLETION_TOKENS_ESTIMATE
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+scheduler = Scheduler()
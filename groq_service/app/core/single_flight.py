@@ -0,0 +1,50 @@
+import asyncio
+from typing import Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers with the same key.
+
+    The call runs as its own task, so a caller that goes away does not cancel
+    it for the others; once every caller has gone, the call is cancelled.
+    """
+
+    def __init__(self):
+        self._calls: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self.counters = {"calls": 0, "coalesced": 0}
+
+    def __len__(self):
+        return len(self._calls)
+
+    async def run(self, key: str, call: Callable[[], Awaitable]):
+        task = self._calls.get(key)
+        if task is None:
+            self.counters["calls"] += 1
+            task = asyncio.create_task(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.counters["coalesced"] += 1
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():
+                    # Nobody is left to use the answer, so stop spending quota
+                    # on it; later callers start a fresh call.
+                    self._forget(key, task)
+                    task.cancel()
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    def stats(self) -> dict:
+        return {**self.counters, "in_flight": len(self._calls)}
+
+
+single_flight = SingleFlight()
@@ -1,10 +1,49 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Response
 from app.routes.groq_routes import router as groq_router
+from app.core.http_client import close_upstream_client, get_upstream_client
+from app.core.cache import response_cache
+from app.core.metrics import CONTENT_TYPE, MetricsMiddleware, registry
+from app.core.tracing import (
+    TracingMiddleware,
+    require_trace_debug,
+    tracer,
+    waterfall,
+)
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    get_upstream_client()
+    yield
+    await close_upstream_client()
+    response_cache.close()
+    tracer.flush()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(TracingMiddleware)
 app.include_router(groq_router)
 
 
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "service": "backend"}
+
+
+@app.get("/metrics")
+async def metrics():
+    return Response(registry.render(), media_type=CONTENT_TYPE)
+
+
+@app.get("/debug/traces", dependencies=[Depends(require_trace_debug)])
+async def slow_traces(limit: int = 10):
+    """Recent requests slower than TRACE_SLOW_MS, newest first."""
+    return tracer.slow(limit)
+
+
+@app.get("/debug/traces/{trace_id}", dependencies=[Depends(require_trace_debug)])
+async def trace_spans(trace_id: str):
+    spans = tracer.trace(trace_id)
+    return {"traceId": trace_id, "spans": spans, "waterfall": waterfall(spans)}
@@ -1,9 +1,22 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
-from app.schemas.groq_schema import GroqRequest
-from app.core.prompts import TEXT_CLEANUP_PROMPT
+from typing import Annotated, List, Optional
+from app.schemas.groq_schema import GroqBatchRequest, GroqRequest
+from app.core.prompts import TEXT_CLEANUP_PROMPT, TEXT_CLEANUP_CHUNK_PROMPT
+from app.core.chunking import Chunk, estimate_tokens, split_into_chunks, stitch_chunks
+from app.core.cache import response_cache
+from app.core.scheduler import model_limits, scheduler
+from app.core.single_flight import single_flight
+from app.core.routing import (
+    candidate_models,
+    routed_completion,
+    routed_stream,
+    routing_stats,
+)
+import asyncio
+import json
 import os
-import httpx
 import logging
 import traceback
 
@@ -11,48 +24,228 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 load_dotenv()
 
+# Input budget per cleanup call; the cleaned output is about as long, so this
+# keeps prompt + completion inside the 8192-token context.
+CLEANUP_CHUNK_TOKENS = int(os.getenv("CLEANUP_CHUNK_TOKENS", "2000"))
+CLEANUP_CONCURRENCY = int(os.getenv("CLEANUP_CONCURRENCY", "4"))
+# /clean-text answers within this many seconds or gives up on the chunks left.
+# Keep it under the backend's GROQ_CLEANUP_TIMEOUT so the backend gets the 504.
+CLEANUP_DEADLINE_SECONDS = float(os.getenv("CLEANUP_DEADLINE_SECONDS", "270"))
+# Callers that do not wait on the response, like background upload jobs, may
+# ask for a longer deadline up to this.
+CLEANUP_MAX_DEADLINE_SECONDS = float(os.getenv("CLEANUP_MAX_DEADLINE_SECONDS", "3600"))
+CLEANUP_DISCONNECT_POLL_SECONDS = 1.0
+GROQ_BATCH_MAX_ITEMS = int(os.getenv("GROQ_BATCH_MAX_ITEMS", "50"))
+GROQ_BATCH_CONCURRENCY = int(os.getenv("GROQ_BATCH_CONCURRENCY", "8"))
+
 
 @router.post("/call-groq")
-async def call_groq_endpoint(request: GroqRequest):
-    groq_api_key = os.getenv("GROQ_API_KEY")
-    if not groq_api_key:
-        raise HTTPException(status_code=500, detail="GROQ_API_KEY not configured")
-
-    headers = {
-        "Authorization": f"Bearer {groq_api_key}",
-        "Content-Type": "application/json",
-    }
-    payload = {
-        "model": request.model,
-        "messages": [{"role": "user", "content": request.prompt}],
-        "temperature": 0.7,
-    }
-    try:
-        async with httpx.AsyncClient(timeout=60) as client:
-            response = await client.post(
-                "https://api.groq.com/openai/v1/chat/completions",
-                headers=headers,
-                json=payload,
-            )
-            response.raise_for_status()
-            return response.json()
-    except httpx.HTTPStatusError as e:
-        logger.error(f"Groq API error: {str(e)} Response: {e.response.text}")
+async def call_groq_endpoint(
+    request: GroqRequest,
+    response: Response = None,
+    x_llm_cache: Annotated[Optional[str], Header()] = None,
+):
+    result, cache_status, model = await routed_completion(request, x_llm_cache)
+    if response is not None:
+        response.headers["X-LLM-Cache"] = cache_status
+        response.headers["X-LLM-Model"] = model
+    return result
+
+
+@router.post("/call-groq/batch")
+async def call_groq_batch_endpoint(
+    batch: GroqBatchRequest, x_llm_cache: Annotated[Optional[str], Header()] = None
+):
+    """Run several prompts concurrently; results keep the order of the items.
+
+    Each result holds either the ``response`` with its ``cache`` status and
+    ``model``, or an ``error`` with the status code and detail the single call
+    would have had.
+    """
+    if len(batch.items) > GROQ_BATCH_MAX_ITEMS:
         raise HTTPException(
-            status_code=502, detail=f"Groq API error: {e.response.status_code}"
+            status_code=400,
+            detail=f"A batch holds at most {GROQ_BATCH_MAX_ITEMS} items",
         )
+    semaphore = asyncio.Semaphore(GROQ_BATCH_CONCURRENCY)
+
+    async def run_item(item: GroqRequest) -> dict:
+        async with semaphore:
+            try:
+                result, cache_status, model = await routed_completion(item, x_llm_cache)
+            except HTTPException as e:
+                return {"error": {"status": e.status_code, "detail": e.detail}}
+            except Exception as e:
+                logger.exception("Batch item failed")
+                return {"error": {"status": 500, "detail": str(e)}}
+        return {"response": result, "cache": cache_status, "model": model}
+
+    return {"results": await asyncio.gather(*map(run_item, batch.items))}
+
+
+def _sse(data: dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+async def _delta_events(first, deltas):
+    try:
+        if first is not None:
+            yield _sse({"delta": first})
+        async for delta in deltas:
+            yield _sse({"delta": delta})
     except Exception as e:
-        logger.exception("Unexpected error during Groq API call")
-        raise HTTPException(status_code=500, detail=f"Groq call failed: {str(e)}")
+        detail = getattr(e, "detail", str(e))
+        logger.error(f"Groq stream failed: {detail}")
+        yield _sse({"detail": detail}, event="error")
+        return
+    yield "data: [DONE]\n\n"
+
+
+@router.post("/call-groq/stream")
+async def call_groq_stream_endpoint(
+    request: GroqRequest, x_llm_cache: Annotated[Optional[str], Header()] = None
+):
+    """Relay the completion as server-sent events, one per content delta."""
+    # Waiting for the first delta lets upstream errors keep their status code.
+    first, deltas, model = await routed_stream(request, x_llm_cache)
+    return StreamingResponse(
+        _delta_events(first, deltas),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+            "X-LLM-Model": model,
+        },
+    )
+
+
+def cleanup_call_tokens(chunk_tokens: int) -> int:
+    """Tokens one cleanup call uses: the prompt and an answer as long as the chunk."""
+    return estimate_tokens(TEXT_CLEANUP_CHUNK_PROMPT) + 2 * chunk_tokens
+
+
+def cleanup_chunk_tokens(tokens_per_minute: int) -> int:
+    """Largest chunk whose cleanup call fits in a minute of the token limit."""
+    if tokens_per_minute <= 0:
+        return CLEANUP_CHUNK_TOKENS
+    fitting = (tokens_per_minute - estimate_tokens(TEXT_CLEANUP_CHUNK_PROMPT)) // 2
+    return max(1, min(CLEANUP_CHUNK_TOKENS, fitting))
+
+
+def cleanup_seconds(chunks: List[Chunk], tokens_per_minute: int) -> float:
+    """Least time the token limit takes to admit the cleanup of every chunk."""
+    if tokens_per_minute <= 0:
+        return 0.0
+    needed = sum(cleanup_call_tokens(estimate_tokens(chunk.text)) for chunk in chunks)
+    # A full bucket admits the first minute's worth at once.
+    return max(0, needed - tokens_per_minute) * 60 / tokens_per_minute
+
+
+async def _cancel_on_disconnect(
+    http_request: Request, tasks: List[asyncio.Task], disconnected: asyncio.Event
+):
+    while not await http_request.is_disconnected():
+        await asyncio.sleep(CLEANUP_DISCONNECT_POLL_SECONDS)
+    disconnected.set()
+    for task in tasks:
+        task.cancel()
 
 
 @router.post("/clean-text")
-async def clean_text_endpoint(request: GroqRequest):
-    prompt = TEXT_CLEANUP_PROMPT.format(raw_text=request.prompt)
-    response = await call_groq_endpoint(GroqRequest(prompt=prompt, model=request.model))
+async def clean_text_endpoint(
+    request: GroqRequest,
+    http_request: Request,
+    x_llm_cache: Annotated[Optional[str], Header()] = None,
+    deadline: Annotated[Optional[float], Query(gt=0)] = None,
+):
+    """Clean the text chunk by chunk within the deadline.
+
+    The deadline is CLEANUP_DEADLINE_SECONDS unless the caller asks for
+    another, capped at CLEANUP_MAX_DEADLINE_SECONDS. Chunks are sized so one
+    call fits in the model's token limit. Text that the limit cannot admit
+    before the deadline gets a 413 without spending quota; chunks still
+    pending when the deadline passes (504) or the client disconnects are
+    cancelled.
+    """
+    deadline = min(deadline or CLEANUP_DEADLINE_SECONDS, CLEANUP_MAX_DEADLINE_SECONDS)
+    model = candidate_models(request)[0]
+    _, tokens_per_minute = model_limits(model)
+    chunks = split_into_chunks(request.prompt, cleanup_chunk_tokens(tokens_per_minute))
+    if not chunks:
+        return {"content": ""}
+    needed = cleanup_seconds(chunks, tokens_per_minute)
+    if needed > deadline:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Cleaning this text takes about {needed:.0f}s of the {model} "
+            f"token limit, over the {deadline:.0f}s deadline",
+        )
+
+    semaphore = asyncio.Semaphore(CLEANUP_CONCURRENCY)
+
+    async def clean_chunk(part: int) -> dict:
+        if len(chunks) == 1:
+            prompt = TEXT_CLEANUP_PROMPT.format(raw_text=chunks[part].text)
+        else:
+            prompt = TEXT_CLEANUP_CHUNK_PROMPT.format(
+                raw_text=chunks[part].text, part=part + 1, total=len(chunks)
+            )
+        async with semaphore:
+            return await call_groq_endpoint(
+                request.model_copy(update={"prompt": prompt, "priority": "bulk"}),
+                x_llm_cache=x_llm_cache,
+            )
+
+    tasks = [asyncio.create_task(clean_chunk(part)) for part in range(len(chunks))]
+    disconnected = asyncio.Event()
+    watcher = asyncio.create_task(
+        _cancel_on_disconnect(http_request, tasks, disconnected)
+    )
     try:
-        return {"content": response["choices"][0]["message"]["content"]}
+        async with asyncio.timeout(deadline):
+            responses = await asyncio.gather(*tasks)
+    except TimeoutError:
+        raise HTTPException(
+            status_code=504,
+            detail=f"Cleanup did not finish within {deadline:.0f}s",
+        )
+    except asyncio.CancelledError:
+        if not disconnected.is_set():
+            raise
+        logger.info("Client went away, cancelled the remaining cleanup chunks")
+        raise HTTPException(status_code=499, detail="Client closed the request")
+    finally:
+        watcher.cancel()
+        for task in tasks:
+            task.cancel()
+
+    try:
+        cleaned = [
+            response["choices"][0]["message"]["content"] for response in responses
+        ]
+        return {"content": stitch_chunks(chunks, cleaned)}
     except Exception as e:
         print("Exception in /clean-text:", e)
         traceback.print_exc()
         return {"error": str(e)}
+
+
+@router.get("/cache/stats")
+async def cache_stats():
+    return response_cache.stats()
+
+
+@router.get("/single-flight/stats")
+async def single_flight_stats():
+    return single_flight.stats()
+
+
+@router.get("/scheduler/stats")
+async def scheduler_stats():
+    return scheduler.stats()
+
+
+@router.get("/models/stats")
+async def model_stats():
+    return routing_stats()
@@ -1,6 +1,23 @@
 from pydantic import BaseModel
+from typing import List, Literal, Optional
 
 
 class GroqRequest(BaseModel):
     prompt: str
     model: str = "llama3-70b-8192"
+    temperature: float = 0.7
+    # None caches only deterministic (temperature 0) calls.
+    cache: Optional[bool] = None
+    # Interactive calls are admitted ahead of queued bulk work.
+    priority: Literal["interactive", "bulk"] = "interactive"
+    # Picks the model from the routing table unless a model is given explicitly.
+    task: Optional[str] = None
+
+    def is_cacheable(self) -> bool:
+        if self.cache is None:
+            return self.temperature == 0
+        return self.cache
+
+
+class GroqBatchRequest(BaseModel):
+    items: List[GroqRequest]
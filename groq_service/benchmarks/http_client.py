@@ -0,0 +1,101 @@
+"""Per-call overhead of a fresh httpx client versus a shared keep-alive client.
+
+Starts a local stub server and times sequential POSTs both ways.
+
+    cd groq_service
+    python -m benchmarks.http_client --calls 500
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import uvicorn
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+RESPONSE = json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode()
+
+
+async def stub_app(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    while (await receive()).get("more_body"):
+        pass
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json")],
+        }
+    )
+    await send({"type": "http.response.body", "body": RESPONSE})
+
+
+def start_stub_server() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(
+        uvicorn.Config(stub_app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}/openai/v1/chat/completions"
+
+
+async def fresh_client_calls(url: str, calls: int) -> list:
+    timings = []
+    for _ in range(calls):
+        started = time.perf_counter()
+        async with httpx.AsyncClient(timeout=60) as client:
+            (await client.post(url, json={"prompt": "hi"})).raise_for_status()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+async def shared_client_calls(url: str, calls: int) -> list:
+    from app.core.http_client import close_upstream_client, get_upstream_client
+
+    timings = []
+    client = get_upstream_client()
+    for _ in range(calls):
+        started = time.perf_counter()
+        (await client.post(url, json={"prompt": "hi"})).raise_for_status()
+        timings.append(time.perf_counter() - started)
+    await close_upstream_client()
+    return timings
+
+
+def summarize(timings: list) -> dict:
+    ordered = sorted(timings)
+    return {
+        "mean_ms": round(statistics.mean(ordered) * 1000, 3),
+        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+        "p99_ms": round(ordered[int(len(ordered) * 0.99) - 1] * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+
+    url = start_stub_server()
+    fresh = summarize(asyncio.run(fresh_client_calls(url, args.calls)))
+    shared = summarize(asyncio.run(shared_client_calls(url, args.calls)))
+    saved = round(fresh["mean_ms"] - shared["mean_ms"], 3)
+
+    print(json.dumps({"fresh": fresh, "shared": shared, "saved_ms_per_call": saved}))
+
+
+if __name__ == "__main__":
+    main()
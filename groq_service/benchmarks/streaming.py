@@ -0,0 +1,125 @@
+"""Time to first token of /call-groq versus /call-groq/stream.
+
+A stub upstream emits tokens at a fixed pace, streamed when asked to and as
+one JSON body otherwise. The groq service runs in front of it on uvicorn.
+
+    cd groq_service
+    python -m benchmarks.streaming --tokens 200 --token-ms 10 --calls 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+
+import httpx
+import uvicorn
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def make_stub(tokens: int, token_delay: float):
+    async def stub_app(scope, receive, send):
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        stream = json.loads(body).get("stream", False)
+        content_type = b"text/event-stream" if stream else b"application/json"
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", content_type)],
+            }
+        )
+        words = []
+        for number in range(tokens):
+            await asyncio.sleep(token_delay)
+            word = f"token{number} "
+            words.append(word)
+            if stream:
+                chunk = {"choices": [{"delta": {"content": word}}]}
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": f"data: {json.dumps(chunk)}\n\n".encode(),
+                        "more_body": True,
+                    }
+                )
+        if stream:
+            last = b"data: [DONE]\n\n"
+        else:
+            message = {"role": "assistant", "content": "".join(words)}
+            last = json.dumps({"choices": [{"message": message}]}).encode()
+        await send({"type": "http.response.body", "body": last})
+
+    return stub_app
+
+
+def serve(app) -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+async def measure(service_url: str, path: str, calls: int) -> dict:
+    first_token, total = [], []
+    async with httpx.AsyncClient(base_url=service_url, timeout=120) as client:
+        for _ in range(calls):
+            started = time.perf_counter()
+            async with client.stream(
+                "POST", path, json={"prompt": "Benchmark prompt"}
+            ) as response:
+                response.raise_for_status()
+                first = None
+                async for _ in response.aiter_bytes():
+                    if first is None:
+                        first = time.perf_counter() - started
+            first_token.append(first)
+            total.append(time.perf_counter() - started)
+    return {
+        "ttft_ms": round(statistics.median(first_token) * 1000, 1),
+        "total_ms": round(statistics.median(total) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--token-ms", type=float, default=10)
+    parser.add_argument("--calls", type=int, default=5)
+    args = parser.parse_args()
+
+    upstream = serve(make_stub(args.tokens, args.token_ms / 1000))
+    os.environ["GROQ_API_URL"] = f"{upstream}/openai/v1/chat/completions"
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")
+    from app.main import app
+
+    service = serve(app)
+    results = {
+        "buffered": asyncio.run(measure(service, "/call-groq", args.calls)),
+        "stream": asyncio.run(measure(service, "/call-groq/stream", args.calls)),
+    }
+    print(json.dumps(results))
+
+
+if __name__ == "__main__":
+    main()
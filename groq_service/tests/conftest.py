@@ -31,3 +31,14 @@ def mock_groq_response():
 def sample_groq_request():
     """Sample request data for testing"""
     return {"prompt": "Test prompt", "model": "llama3-70b-8192"}
+
+
+@pytest.fixture(autouse=True)
+def unlimited_scheduler():
+    """Run every test without Groq rate limits or shared queue state"""
+    from app.core import completions, scheduler
+
+    with patch.object(scheduler, "GROQ_REQUESTS_PER_MINUTE", 0), patch.object(
+        scheduler, "GROQ_TOKENS_PER_MINUTE", 0
+    ), patch.object(completions, "scheduler", scheduler.Scheduler()):
+        yield
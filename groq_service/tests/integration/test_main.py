@@ -1,4 +1,5 @@
 import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
 
 
 class TestMainApp:
@@ -19,3 +20,64 @@ class TestMainApp:
 
         response = client.post("/clean-text", json={"prompt": "test"})
         assert response.status_code != 404
+
+    @patch("app.core.completions.get_upstream_client")
+    def test_metrics_endpoint_reports_upstream_calls_and_tokens(
+        self, mock_client, client, mock_groq_api_key, mock_groq_response
+    ):
+        """/metrics exposes request timings, upstream latency and token counts"""
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            **mock_groq_response,
+            "usage": {"prompt_tokens": 12, "completion_tokens": 30},
+        }
+        mock_response.raise_for_status.return_value = None
+        mock_async_client = AsyncMock()
+        mock_async_client.post.return_value = mock_response
+        mock_client.return_value = mock_async_client
+
+        client.post("/call-groq", json={"prompt": "metrics", "model": "metrics-model"})
+        response = client.get("/metrics")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        body = response.text
+        assert 'groq_tokens_total{model="metrics-model",kind="prompt"} 12' in body
+        assert 'groq_tokens_total{model="metrics-model",kind="completion"} 30' in body
+        assert (
+            'groq_upstream_duration_seconds_count{model="metrics-model",outcome="ok"} 1'
+            in body
+        )
+        assert 'route="/call-groq",status="200"' in body
+
+    @patch("app.core.completions.get_upstream_client")
+    def test_trace_of_a_call_is_available_for_debugging(
+        self, mock_client, client, mock_groq_api_key, mock_groq_response
+    ):
+        """A traced call records its spans under the caller's trace id"""
+        mock_response = MagicMock()
+        mock_response.json.return_value = mock_groq_response
+        mock_response.raise_for_status.return_value = None
+        mock_async_client = AsyncMock()
+        mock_async_client.post.return_value = mock_response
+        mock_client.return_value = mock_async_client
+        trace_id = "c" * 32
+
+        response = client.post(
+            "/call-groq",
+            json={"prompt": "traced"},
+            headers={"traceparent": f"00-{trace_id}-{'d' * 16}-01"},
+        )
+        with patch("app.core.tracing.TRACE_DEBUG_ENDPOINTS", True):
+            trace = client.get(f"/debug/traces/{trace_id}").json()
+
+        assert response.headers["x-request-id"] == trace_id
+        names = [row["name"] for row in trace["waterfall"]]
+        assert names[0] == "POST /call-groq"
+        assert "groq.chat_completion" in names
+        assert trace["spans"][-1]["parentSpanId"] == "d" * 16
+
+    def test_debug_traces_are_hidden_by_default(self, client):
+        """Traces of other users' requests are not served unless enabled"""
+        assert client.get("/debug/traces").status_code == 404
+        assert client.get(f"/debug/traces/{'c' * 32}").status_code == 404
@@ -1,3 +1,5 @@
+import json
+import asyncio
 import pytest
 from unittest.mock import patch, AsyncMock, MagicMock
 import httpx
@@ -14,7 +16,7 @@ class TestGroqRoutes:
             assert response.status_code == 500
             assert "GROQ_API_KEY not configured" in response.json()["detail"]
 
-    @patch("httpx.AsyncClient")
+    @patch("app.core.completions.get_upstream_client")
     def test_call_groq_success(
         self, mock_client, client, mock_groq_api_key, mock_groq_response
     ):
@@ -24,10 +26,9 @@ class TestGroqRoutes:
         mock_response.json.return_value = mock_groq_response
         mock_response.raise_for_status.return_value = None
 
-        # Create async context manager mock
         mock_async_client = AsyncMock()
         mock_async_client.post.return_value = mock_response
-        mock_client.return_value.__aenter__.return_value = mock_async_client
+        mock_client.return_value = mock_async_client
 
         response = client.post(
             "/call-groq", json={"prompt": "Test prompt", "model": "llama3-70b-8192"}
@@ -36,7 +37,7 @@ class TestGroqRoutes:
         assert response.status_code == 200
         assert response.json() == mock_groq_response
 
-    @patch("httpx.AsyncClient")
+    @patch("app.core.completions.get_upstream_client")
     def test_call_groq_http_error(self, mock_client, client, mock_groq_api_key):
         """Test /call-groq endpoint with HTTP error"""
         # Mock HTTP error
@@ -49,25 +50,37 @@ class TestGroqRoutes:
         mock_async_client.post.side_effect = httpx.HTTPStatusError(
             "Bad Request", request=MagicMock(), response=mock_response
         )
-        mock_client.return_value.__aenter__.return_value = mock_async_client
+        mock_client.return_value = mock_async_client
 
         response = client.post("/call-groq", json={"prompt": "Test prompt"})
 
         assert response.status_code == 502
         assert "Groq API error" in response.json()["detail"]
 
-    @patch("httpx.AsyncClient")
+    @patch("app.core.completions.get_upstream_client")
     def test_call_groq_timeout_error(self, mock_client, client, mock_groq_api_key):
         """Test /call-groq endpoint with timeout error"""
         # Create async client mock that raises TimeoutException
         mock_async_client = AsyncMock()
         mock_async_client.post.side_effect = httpx.TimeoutException("Timeout")
-        mock_client.return_value.__aenter__.return_value = mock_async_client
+        mock_client.return_value = mock_async_client
 
         response = client.post("/call-groq", json={"prompt": "Test prompt"})
 
-        assert response.status_code == 500
-        assert "Groq call failed" in response.json()["detail"]
+        assert response.status_code == 504
+        assert response.json()["detail"] == "Groq API timed out"
+
+    @patch("app.core.completions.get_upstream_client")
+    def test_call_groq_connection_error(self, mock_client, client, mock_groq_api_key):
+        """Test /call-groq endpoint when the Groq API cannot be reached"""
+        mock_async_client = AsyncMock()
+        mock_async_client.post.side_effect = httpx.ConnectError("Refused")
+        mock_client.return_value = mock_async_client
+
+        response = client.post("/call-groq", json={"prompt": "Test prompt"})
+
+        assert response.status_code == 502
+        assert response.json()["detail"] == "Groq API unreachable"
 
     @patch("app.routes.groq_routes.call_groq_endpoint")
     def test_clean_text_success(self, mock_call_groq, client, mock_groq_response):
@@ -91,6 +104,151 @@ class TestGroqRoutes:
         assert response.status_code == 200
         assert "error" in response.json()
 
+    @patch("app.routes.groq_routes.CLEANUP_CONCURRENCY", 2)
+    @patch("app.routes.groq_routes.CLEANUP_CHUNK_TOKENS", 20)
+    @patch("app.routes.groq_routes.call_groq_endpoint")
+    def test_clean_text_long_input_is_chunked(self, mock_call_groq, client):
+        """Test /clean-text cleans chunks concurrently and stitches them in order"""
+        in_flight = 0
+        peak = 0
+
+        async def fake_call(request, **kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            text = request.prompt.split("-- START OF TEXT --")[1]
+            text = text.split("-- END OF TEXT --")[0].strip()
+            return {"choices": [{"message": {"content": text.upper()}}]}
+
+        mock_call_groq.side_effect = fake_call
+        paragraphs = [f"paragraph {n} " + "word " * 10 for n in range(6)]
+
+        response = client.post("/clean-text", json={"prompt": "\n\n".join(paragraphs)})
+
+        assert response.status_code == 200
+        assert mock_call_groq.call_count == 6
+        assert peak == 2
+        assert response.json()["content"] == "\n\n".join(
+            p.strip().upper() for p in paragraphs
+        )
+
+    @patch("app.core.scheduler.GROQ_TOKENS_PER_MINUTE", 1200)
+    @patch("app.routes.groq_routes.call_groq_endpoint")
+    def test_clean_text_chunks_fit_the_token_limit(self, mock_call_groq, client):
+        """Test /clean-text sizes chunks so one call fits a minute of tokens"""
+        from app.core.chunking import estimate_tokens
+        from app.routes.groq_routes import cleanup_call_tokens
+
+        chunk_tokens = []
+
+        async def fake_call(request, **kwargs):
+            text = request.prompt.split("-- START OF TEXT --")[1]
+            text = text.split("-- END OF TEXT --")[0].strip()
+            chunk_tokens.append(estimate_tokens(text))
+            return {"choices": [{"message": {"content": text}}]}
+
+        mock_call_groq.side_effect = fake_call
+        paragraphs = [f"paragraph {n} " + "word " * 100 for n in range(8)]
+
+        response = client.post("/clean-text", json={"prompt": "\n\n".join(paragraphs)})
+
+        assert response.status_code == 200
+        assert len(chunk_tokens) > 1
+        assert all(cleanup_call_tokens(tokens) <= 1200 for tokens in chunk_tokens)
+
+    @patch("app.core.scheduler.GROQ_TOKENS_PER_MINUTE", 6000)
+    @patch("app.routes.groq_routes.CLEANUP_DEADLINE_SECONDS", 60)
+    @patch("app.routes.groq_routes.call_groq_endpoint")
+    def test_clean_text_over_the_deadline_is_refused_up_front(
+        self, mock_call_groq, client
+    ):
+        """Test /clean-text spends no quota on text the limit cannot admit in time"""
+        paragraphs = [f"paragraph {n} " + "word " * 400 for n in range(20)]
+
+        response = client.post("/clean-text", json={"prompt": "\n\n".join(paragraphs)})
+
+        assert response.status_code == 413
+        assert "deadline" in response.json()["detail"]
+        mock_call_groq.assert_not_called()
+
+    @patch("app.core.scheduler.GROQ_TOKENS_PER_MINUTE", 6000)
+    @patch("app.routes.groq_routes.CLEANUP_DEADLINE_SECONDS", 60)
+    @patch("app.routes.groq_routes.CLEANUP_MAX_DEADLINE_SECONDS", 600)
+    @patch("app.routes.groq_routes.call_groq_endpoint")
+    def test_clean_text_longer_deadline_admits_long_text(self, mock_call_groq, client):
+        """Test /clean-text lets callers that do not wait ask for more time"""
+        mock_call_groq.return_value = {"choices": [{"message": {"content": "x"}}]}
+        prompt = "\n\n".join(f"paragraph {n} " + "word " * 400 for n in range(20))
+
+        response = client.post("/clean-text?deadline=300", json={"prompt": prompt})
+        with patch("app.routes.groq_routes.CLEANUP_MAX_DEADLINE_SECONDS", 120):
+            capped = client.post("/clean-text?deadline=100000", json={"prompt": prompt})
+
+        assert response.status_code == 200
+        assert mock_call_groq.call_count > 1
+        assert capped.status_code == 413
+        assert (
+            client.post("/clean-text?deadline=0", json={"prompt": prompt}).status_code
+            == 422
+        )
+
+    @patch("app.routes.groq_routes.CLEANUP_DEADLINE_SECONDS", 0.05)
+    @patch("app.routes.groq_routes.CLEANUP_CHUNK_TOKENS", 20)
+    @patch("app.routes.groq_routes.call_groq_endpoint")
+    def test_clean_text_deadline_cancels_remaining_chunks(self, mock_call_groq, client):
+        """Test /clean-text answers 504 at the deadline and stops every chunk"""
+        cancelled = 0
+
+        async def stuck_call(request, **kwargs):
+            nonlocal cancelled
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled += 1
+                raise
+
+        mock_call_groq.side_effect = stuck_call
+        paragraphs = [f"paragraph {n} " + "word " * 10 for n in range(6)]
+
+        response = client.post("/clean-text", json={"prompt": "\n\n".join(paragraphs)})
+
+        assert response.status_code == 504
+        assert cancelled == mock_call_groq.call_count > 0
+
+    @pytest.mark.asyncio
+    @patch("app.routes.groq_routes.CLEANUP_DISCONNECT_POLL_SECONDS", 0.01)
+    @patch("app.routes.groq_routes.CLEANUP_CHUNK_TOKENS", 20)
+    @patch("app.routes.groq_routes.call_groq_endpoint")
+    async def test_clean_text_client_disconnect_cancels_chunks(self, mock_call_groq):
+        """Test /clean-text stops cleaning once the client has gone away"""
+        from app.routes.groq_routes import clean_text_endpoint
+        from app.schemas.groq_schema import GroqRequest
+
+        cancelled = 0
+
+        async def stuck_call(request, **kwargs):
+            nonlocal cancelled
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled += 1
+                raise
+
+        mock_call_groq.side_effect = stuck_call
+        http_request = MagicMock()
+        http_request.is_disconnected = AsyncMock(side_effect=[False, True])
+        paragraphs = [f"paragraph {n} " + "word " * 10 for n in range(6)]
+
+        with pytest.raises(HTTPException) as error:
+            await clean_text_endpoint(
+                GroqRequest(prompt="\n\n".join(paragraphs)), http_request
+            )
+
+        assert error.value.status_code == 499
+        assert cancelled == mock_call_groq.call_count > 0
+
     def test_invalid_request_body(self, client, mock_groq_api_key):
         """Test endpoints with invalid request body"""
         response = client.post("/call-groq", json={"invalid_field": "value"})
@@ -100,3 +258,189 @@ class TestGroqRoutes:
             "/clean-text", json={"model": "test-model"}  # Missing prompt
         )
         assert response.status_code == 422
+
+
+class TestResponseCaching:
+    """Integration tests for the /call-groq response cache"""
+
+    @pytest.fixture
+    def upstream(self, mock_groq_api_key, mock_groq_response):
+        from app.core.cache import MemoryCache, ResponseCache
+
+        mock_response = MagicMock()
+        mock_response.json.return_value = mock_groq_response
+        mock_response.raise_for_status.return_value = None
+        mock_async_client = AsyncMock()
+        mock_async_client.post.return_value = mock_response
+
+        fresh_cache = ResponseCache(MemoryCache(1024 * 1024, 60))
+        with patch(
+            "app.core.completions.get_upstream_client",
+            return_value=mock_async_client,
+        ), patch("app.core.completions.response_cache", fresh_cache), patch(
+            "app.routes.groq_routes.response_cache", fresh_cache
+        ):
+            yield mock_async_client.post
+
+    def test_repeated_prompt_is_served_from_cache(self, client, upstream):
+        """An opted-in prompt only reaches Groq once"""
+        body = {"prompt": "Test prompt", "cache": True}
+
+        first = client.post("/call-groq", json=body)
+        second = client.post("/call-groq", json=body)
+
+        assert first.headers["X-LLM-Cache"] == "miss"
+        assert second.headers["X-LLM-Cache"] == "hit"
+        assert second.json() == first.json()
+        assert upstream.call_count == 1
+
+        stats = client.get("/cache/stats").json()
+        assert stats["misses"] == 1
+        assert stats["memory_hits"] == 1
+
+    def test_sampled_calls_are_not_cached_by_default(self, client, upstream):
+        """Without opting in only temperature 0 calls are cached"""
+        client.post("/call-groq", json={"prompt": "Test prompt"})
+        response = client.post("/call-groq", json={"prompt": "Test prompt"})
+        assert response.headers["X-LLM-Cache"] == "off"
+        assert upstream.call_count == 2
+        assert upstream.call_args.kwargs["json"]["temperature"] == 0.7
+
+        body = {"prompt": "Test prompt", "temperature": 0}
+        client.post("/call-groq", json=body)
+        assert client.post("/call-groq", json=body).headers["X-LLM-Cache"] == "hit"
+
+    def test_bypass_and_refresh_headers(self, client, upstream):
+        """bypass skips the cache entirely; refresh replaces the stored entry"""
+        body = {"prompt": "Test prompt", "cache": True}
+
+        bypass = client.post("/call-groq", json=body, headers={"X-LLM-Cache": "bypass"})
+        assert bypass.headers["X-LLM-Cache"] == "bypass"
+        assert client.post("/call-groq", json=body).headers["X-LLM-Cache"] == "miss"
+
+        refresh = client.post(
+            "/call-groq", json=body, headers={"X-LLM-Cache": "refresh"}
+        )
+        assert refresh.headers["X-LLM-Cache"] == "miss"
+        assert upstream.call_count == 3
+        assert client.get("/cache/stats").json()["bypasses"] == 1
+
+
+class TestStreamingRoute:
+    """Integration tests for /call-groq/stream"""
+
+    @pytest.fixture
+    def upstream(self, mock_groq_api_key):
+        from app.core.cache import MemoryCache, ResponseCache
+
+        requests = []
+        status = {"code": 200}
+
+        def handler(request):
+            requests.append(request)
+            if status["code"] != 200:
+                return httpx.Response(status["code"], text="upstream error")
+            chunks = [
+                {"choices": [{"delta": {"role": "assistant"}}]},
+                {"choices": [{"delta": {"content": "Hello"}}]},
+                {"choices": [{"delta": {"content": " world"}}]},
+            ]
+            body = "".join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks)
+            return httpx.Response(200, text=body + "data: [DONE]\n\n")
+
+        upstream_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        fresh_cache = ResponseCache(MemoryCache(1024 * 1024, 60))
+        with patch(
+            "app.core.completions.get_upstream_client", return_value=upstream_client
+        ), patch("app.core.completions.response_cache", fresh_cache):
+            yield requests, status
+
+    @staticmethod
+    def read_events(response):
+        return [
+            line[len("data: ") :]
+            for line in response.text.splitlines()
+            if line.startswith("data: ")
+        ]
+
+    def test_stream_relays_deltas_as_sse(self, client, upstream):
+        """Each upstream delta becomes one event, followed by [DONE]"""
+        requests, _ = upstream
+        response = client.post("/call-groq/stream", json={"prompt": "Test prompt"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = self.read_events(response)
+        assert [json.loads(event)["delta"] for event in events[:-1]] == [
+            "Hello",
+            " world",
+        ]
+        assert events[-1] == "[DONE]"
+        assert json.loads(requests[0].content)["stream"] is True
+
+    def test_stream_upstream_error_keeps_status(self, client, upstream):
+        """An upstream error before the first delta is returned as a 502"""
+        _, status = upstream
+        status["code"] = 500
+
+        response = client.post("/call-groq/stream", json={"prompt": "Test prompt"})
+
+        assert response.status_code == 502
+        assert "Groq API error: 500" in response.json()["detail"]
+
+    def test_streamed_answer_is_cached(self, client, upstream):
+        """An opted-in stream is stored and replayed as a single delta"""
+        requests, _ = upstream
+        body = {"prompt": "Test prompt", "cache": True}
+
+        client.post("/call-groq/stream", json=body)
+        replay = client.post("/call-groq/stream", json=body)
+
+        assert len(requests) == 1
+        assert json.loads(self.read_events(replay)[0])["delta"] == "Hello world"
+
+
+class TestBatchRoute:
+    """Integration tests for /call-groq/batch"""
+
+    def test_batch_returns_results_in_order_with_item_errors(
+        self, client, mock_groq_api_key
+    ):
+        """Every item gets a result in input order; failures stay per item"""
+
+        async def fake_completion(request, cache_mode=None):
+            await asyncio.sleep(0.01 if request.prompt == "first" else 0)
+            if request.prompt == "bad":
+                raise HTTPException(status_code=502, detail="Groq API error: 400")
+            return {"choices": [{"message": {"content": request.prompt}}]}, "off"
+
+        with patch(
+            "app.core.routing.create_completion", side_effect=fake_completion
+        ) as mock_completion:
+            response = client.post(
+                "/call-groq/batch",
+                json={
+                    "items": [
+                        {"prompt": "first"},
+                        {"prompt": "bad"},
+                        {"prompt": "third", "model": "llama3-8b-8192"},
+                    ]
+                },
+            )
+
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert results[0]["response"]["choices"][0]["message"]["content"] == "first"
+        assert results[1] == {"error": {"status": 502, "detail": "Groq API error: 400"}}
+        assert results[2]["cache"] == "off"
+        assert results[2]["model"] == "llama3-8b-8192"
+        models = [call.args[0].model for call in mock_completion.call_args_list]
+        assert models[2] == "llama3-8b-8192"
+
+    def test_batch_size_is_capped(self, client):
+        """Oversized batches are rejected up front"""
+        with patch("app.routes.groq_routes.GROQ_BATCH_MAX_ITEMS", 2):
+            response = client.post(
+                "/call-groq/batch", json={"items": [{"prompt": "p"}] * 3}
+            )
+        assert response.status_code == 400
@@ -0,0 +1,82 @@
+import sys
+from pathlib import Path
+import pytest
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+from app.core import cache
+from app.core.cache import (
+    MemoryCache,
+    ResponseCache,
+    SqliteCache,
+    cache_key,
+)
+
+
+class TestCacheKey:
+    """Test cache key hashing"""
+
+    def test_key_depends_on_model_prompt_and_params(self):
+        """Any input that changes the completion changes the key"""
+        key = cache_key("m", "p", {"temperature": 0})
+        assert key == cache_key("m", "p", {"temperature": 0})
+        assert key != cache_key("other", "p", {"temperature": 0})
+        assert key != cache_key("m", "other", {"temperature": 0})
+        assert key != cache_key("m", "p", {"temperature": 0.7})
+
+
+class TestMemoryCache:
+    """Test the in-memory LRU tier"""
+
+    def test_evicts_least_recently_used_over_byte_budget(self):
+        """Entries are evicted oldest-use first once the byte budget is exceeded"""
+        memory = MemoryCache(max_bytes=10, ttl_seconds=60)
+        memory.set("a", "aaaa")
+        memory.set("b", "bbbb")
+        assert memory.get("a") == "aaaa"
+
+        memory.set("c", "cccc")
+
+        assert memory.get("b") is None
+        assert memory.get("a") == "aaaa"
+        assert memory.get("c") == "cccc"
+        assert memory.size == 8
+
+    def test_skips_values_larger_than_budget(self):
+        """A value that can never fit is not stored"""
+        memory = MemoryCache(max_bytes=3, ttl_seconds=60)
+        memory.set("a", "aaaa")
+        assert len(memory) == 0
+
+    def test_expired_entries_are_dropped(self):
+        """Entries past their TTL are removed on read"""
+        memory = MemoryCache(max_bytes=100, ttl_seconds=60)
+        with patch.object(cache.time, "monotonic", return_value=0):
+            memory.set("a", "aaaa")
+        with patch.object(cache.time, "monotonic", return_value=61):
+            assert memory.get("a") is None
+        assert memory.size == 0
+
+
+class TestResponseCache:
+    """Test the two-tier response cache"""
+
+    @pytest.mark.asyncio
+    async def test_disk_tier_survives_restart(self, tmp_path):
+        """A response stored on disk is served by a new cache and promoted to memory"""
+        path = str(tmp_path / "cache.sqlite")
+        first = ResponseCache(MemoryCache(1024, 60), SqliteCache(path, 60))
+        await first.set("key", {"choices": [1]})
+        first.close()
+
+        second = ResponseCache(MemoryCache(1024, 60), SqliteCache(path, 60))
+        assert await second.get("key") == {"choices": [1]}
+        assert await second.get("key") == {"choices": [1]}
+        assert await second.get("missing") is None
+        second.close()
+
+        stats = second.stats()
+        assert stats["disk_hits"] == 1
+        assert stats["memory_hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["hit_ratio"] == round(2 / 3, 4)
@@ -0,0 +1,71 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+from app.core.chunking import (
+    Chunk,
+    estimate_tokens,
+    split_into_chunks,
+    stitch_chunks,
+)
+
+
+class TestSplitIntoChunks:
+    """Test token-bounded chunking of raw PDF text"""
+
+    def test_short_text_is_single_chunk(self):
+        """Text under the budget stays in one chunk"""
+        chunks = split_into_chunks("First paragraph.\n\nSecond paragraph.", 100)
+        assert chunks == [Chunk("First paragraph.\n\nSecond paragraph.")]
+
+    def test_empty_text_has_no_chunks(self):
+        """Whitespace-only input produces no chunks"""
+        assert split_into_chunks(" \n\f\n ", 100) == []
+
+    def test_chunks_respect_budget_and_paragraphs(self):
+        """Paragraphs are packed whole and never exceed the budget"""
+        paragraphs = [f"Paragraph {n} " + "word " * 30 for n in range(10)]
+        text = "\f".join("\n\n".join(paragraphs[i : i + 2]) for i in range(0, 10, 2))
+
+        chunks = split_into_chunks(text, 100)
+
+        assert len(chunks) > 1
+        assert all(estimate_tokens(chunk.text) <= 100 for chunk in chunks)
+        assert all(not chunk.continues for chunk in chunks)
+        rejoined = [p for chunk in chunks for p in chunk.text.split("\n\n")]
+        assert rejoined == [p.strip() for p in paragraphs]
+
+    def test_oversized_paragraph_is_split_and_marked(self):
+        """A paragraph larger than the budget is cut on sentences"""
+        paragraph = " ".join(f"Sentence number {n} is here." for n in range(40))
+
+        chunks = split_into_chunks(paragraph, 50)
+
+        assert len(chunks) > 1
+        assert all(chunk.continues for chunk in chunks[:-1])
+        assert not chunks[-1].continues
+        assert " ".join(chunk.text for chunk in chunks) == paragraph
+
+
+class TestStitchChunks:
+    """Test reassembly of cleaned chunks"""
+
+    def test_paragraph_seam_uses_blank_line(self):
+        """Whole-paragraph chunks are joined as separate paragraphs"""
+        chunks = [Chunk("a"), Chunk("b")]
+        assert (
+            stitch_chunks(chunks, ["## A\nfirst", "second"]) == "## A\nfirst\n\nsecond"
+        )
+
+    def test_mid_paragraph_seam_uses_space(self):
+        """A chunk cut mid-paragraph is glued back with a space"""
+        chunks = [Chunk("a", continues=True), Chunk("b")]
+        assert stitch_chunks(chunks, ["The cat sat", "on the mat."]) == (
+            "The cat sat on the mat."
+        )
+
+    def test_repeated_line_at_seam_is_dropped(self):
+        """A heading restated at the start of the next chunk is kept once"""
+        chunks = [Chunk("a"), Chunk("b")]
+        result = stitch_chunks(chunks, ["intro\n\n## Methods", "## Methods\n\nbody"])
+        assert result == "intro\n\n## Methods\n\nbody"
@@ -0,0 +1,30 @@
+import sys
+from pathlib import Path
+import pytest
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+from app.core import http_client
+from app.core.http_client import close_upstream_client, get_upstream_client
+
+
+class TestUpstreamClient:
+    """Test the shared upstream Groq client"""
+
+    @pytest.mark.asyncio
+    async def test_client_is_reused_until_closed(self):
+        """The same client serves every call until shutdown"""
+        client = get_upstream_client()
+        assert get_upstream_client() is client
+
+        await close_upstream_client()
+        assert http_client._client is None
+        assert client.is_closed
+
+    @pytest.mark.asyncio
+    async def test_http2_falls_back_without_h2(self):
+        """HTTP/2 is skipped with a warning when h2 is missing"""
+        with patch.object(http_client, "GROQ_HTTP2", True), patch(
+            "importlib.util.find_spec", return_value=None
+        ):
+            assert http_client._http2_enabled() is False
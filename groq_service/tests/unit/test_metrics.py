@@ -0,0 +1,86 @@
+import sys
+from pathlib import Path
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+from app.core import metrics
+from app.core.metrics import Counter, Gauge, Histogram, MetricsMiddleware, Registry
+
+
+class TestMetrics:
+    """Test the Prometheus text rendering of each metric type"""
+
+    def test_counter_sums_per_label_set(self):
+        """Each label combination is its own series"""
+        counter = Counter("tokens_total", "Tokens.", ("model",))
+        counter.inc(10, model="small")
+        counter.inc(5, model="small")
+        counter.inc(1, model="large")
+
+        assert counter.render() == [
+            "# HELP tokens_total Tokens.",
+            "# TYPE tokens_total counter",
+            'tokens_total{model="large"} 1',
+            'tokens_total{model="small"} 15',
+        ]
+
+    def test_gauge_tracks_work_in_progress(self):
+        """The gauge is raised inside the block and restored after it"""
+        gauge = Gauge("in_flight", "Work in progress.")
+
+        with pytest.raises(RuntimeError):
+            with gauge.track():
+                assert gauge.render()[-1] == "in_flight 1"
+                raise RuntimeError("failed")
+
+        assert gauge.render()[-1] == "in_flight 0"
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Buckets count observations at or below their bound"""
+        histogram = Histogram("latency", "Latency.", ("stage",), buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value, stage="clean")
+
+        assert histogram.render()[2:] == [
+            'latency_bucket{stage="clean",le="0.1"} 2',
+            'latency_bucket{stage="clean",le="1.0"} 3',
+            'latency_bucket{stage="clean",le="+Inf"} 4',
+            'latency_sum{stage="clean"} 3.65',
+            'latency_count{stage="clean"} 4',
+        ]
+
+    def test_registry_rejects_duplicate_names(self):
+        """Two metrics cannot share a name"""
+        registry = Registry()
+        registry.counter("calls_total", "Calls.")
+
+        with pytest.raises(ValueError):
+            registry.gauge("calls_total", "Calls.")
+
+
+class TestMetricsMiddleware:
+    """Test request timing by route template"""
+
+    def test_requests_are_labelled_by_route_template(self, monkeypatch):
+        """Path parameters and unknown paths do not create new series"""
+        histogram = Histogram("requests", "Requests.", ("method", "route", "status"))
+        monkeypatch.setattr(metrics, "HTTP_REQUEST_SECONDS", histogram)
+        app = FastAPI()
+        app.add_middleware(MetricsMiddleware)
+
+        @app.get("/items/{item_id}")
+        async def item(item_id: int):
+            return {"id": item_id}
+
+        client = TestClient(app)
+        client.get("/items/1")
+        client.get("/items/2")
+        client.get("/nowhere")
+
+        counts = [line for line in histogram.render() if "_count" in line]
+        assert counts == [
+            'requests_count{method="GET",route="/items/{item_id}",status="200"} 2',
+            'requests_count{method="GET",route="unmatched",status="404"} 1',
+        ]
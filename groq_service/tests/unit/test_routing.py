@@ -0,0 +1,154 @@
+import sys
+from pathlib import Path
+import httpx
+import pytest
+from fastapi import HTTPException
+from unittest.mock import AsyncMock, MagicMock, patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+from app.core import routing
+from app.core.model_health import ModelHealth
+from app.schemas.groq_schema import GroqRequest
+
+ROUTES = {"cleanup": ["small", "large"]}
+
+
+class TestModelHealth:
+    """Test rolling per-model health"""
+
+    def test_degrades_on_errors_or_latency(self):
+        """A model is degraded once enough recent calls failed or were slow"""
+        health = ModelHealth(window=4)
+        health.record("m", 0.1, False)
+        health.record("m", 0.1, False)
+        assert not health.is_degraded("m")
+
+        health.record("m", 0.1, False)
+        assert health.is_degraded("m")
+
+        for _ in range(4):
+            health.record("m", 0.1, True)
+        assert not health.is_degraded("m")
+
+        for _ in range(4):
+            health.record("m", 100.0, True)
+        assert health.is_degraded("m")
+
+    def test_degraded_model_recovers_once_its_failures_age_out(self):
+        """Old failures expire, so a model tried last gets back to the front"""
+        health = ModelHealth(max_age=60)
+        now = 1000.0
+        with patch("app.core.model_health.time.monotonic", lambda: now):
+            for _ in range(3):
+                health.record("small", 0.1, False)
+            with patch.dict(routing.MODEL_ROUTES, ROUTES, clear=True), patch.object(
+                routing, "model_health", health
+            ):
+                request = GroqRequest(prompt="p", task="cleanup")
+                assert routing.candidate_models(request) == ["large", "small"]
+
+                now += 61
+                assert not health.is_degraded("small")
+                assert health.snapshot("small")["samples"] == 0
+                assert routing.candidate_models(request) == ["small", "large"]
+
+
+class TestCandidateModels:
+    """Test model selection for a request"""
+
+    def test_task_uses_route_and_explicit_model_pins(self):
+        """A task picks its route unless a model was given"""
+        with patch.dict(routing.MODEL_ROUTES, ROUTES, clear=True), patch.object(
+            routing, "model_health", ModelHealth()
+        ):
+            assert routing.candidate_models(
+                GroqRequest(prompt="p", task="cleanup")
+            ) == ["small", "large"]
+            assert routing.candidate_models(
+                GroqRequest(prompt="p", task="cleanup", model="pinned")
+            ) == ["pinned"]
+            assert routing.candidate_models(GroqRequest(prompt="p")) == [
+                "llama3-70b-8192"
+            ]
+            with pytest.raises(HTTPException):
+                routing.candidate_models(GroqRequest(prompt="p", task="unknown"))
+
+    def test_degraded_primary_moves_last(self):
+        """A failing primary is tried after its healthy fallbacks"""
+        health = ModelHealth()
+        for _ in range(3):
+            health.record("small", 0.1, False)
+        with patch.dict(routing.MODEL_ROUTES, ROUTES, clear=True), patch.object(
+            routing, "model_health", health
+        ):
+            assert routing.candidate_models(
+                GroqRequest(prompt="p", task="cleanup")
+            ) == ["large", "small"]
+
+
+class TestRoutedCompletion:
+    """Test failover between models"""
+
+    @pytest.mark.asyncio
+    async def test_fails_over_on_upstream_error(self):
+        """An upstream failure moves the call to the next model"""
+        tried = []
+
+        async def create_completion(request, cache_mode=None):
+            tried.append(request.model)
+            if request.model == "small":
+                raise HTTPException(status_code=502, detail="Groq API error: 429")
+            return {"choices": []}, "off"
+
+        with patch.dict(routing.MODEL_ROUTES, ROUTES, clear=True), patch.object(
+            routing, "model_health", ModelHealth()
+        ), patch.object(routing, "create_completion", create_completion):
+            result, cache_status, model = await routing.routed_completion(
+                GroqRequest(prompt="p", task="cleanup")
+            )
+
+        assert tried == ["small", "large"]
+        assert model == "large"
+
+    @pytest.mark.asyncio
+    async def test_fails_over_when_the_primary_times_out(
+        self, mock_groq_api_key, mock_groq_response
+    ):
+        """An upstream timeout moves the call to the next model"""
+        tried = []
+
+        async def post(url, headers, json):
+            tried.append(json["model"])
+            if json["model"] == "small":
+                raise httpx.ReadTimeout("Timeout")
+            response = MagicMock(status_code=200)
+            response.json.return_value = mock_groq_response
+            return response
+
+        upstream = AsyncMock()
+        upstream.post.side_effect = post
+        with patch.dict(routing.MODEL_ROUTES, ROUTES, clear=True), patch.object(
+            routing, "model_health", ModelHealth()
+        ), patch("app.core.completions.get_upstream_client", return_value=upstream):
+            result, cache_status, model = await routing.routed_completion(
+                GroqRequest(prompt="timeout failover", task="cleanup"), "bypass"
+            )
+
+        assert tried == ["small", "large"]
+        assert model == "large"
+        assert result == mock_groq_response
+
+    @pytest.mark.asyncio
+    async def test_client_errors_do_not_fail_over(self):
+        """Errors that another model would repeat are raised at once"""
+
+        async def create_completion(request, cache_mode=None):
+            raise HTTPException(status_code=500, detail="GROQ_API_KEY not configured")
+
+        with patch.dict(routing.MODEL_ROUTES, ROUTES, clear=True), patch.object(
+            routing, "create_completion", create_completion
+        ):
+            with pytest.raises(HTTPException) as exc_info:
+                await routing.routed_completion(GroqRequest(prompt="p", task="cleanup"))
+
+        assert exc_info.value.status_code == 500
@@ -0,0 +1,128 @@
+import asyncio
+import sys
+from pathlib import Path
+import httpx
+import pytest
+from fastapi import HTTPException
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+from app.core import scheduler as scheduler_module
+from app.core.scheduler import Scheduler, TokenBucket, parse_retry_after
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket:
+    """Test token bucket accounting"""
+
+    def test_refills_at_per_minute_rate(self):
+        """An empty bucket refills linearly over a minute"""
+        clock = FakeClock()
+        with patch.object(scheduler_module.time, "monotonic", clock):
+            bucket = TokenBucket(60)
+            bucket.take(60)
+            assert bucket.delay(30) == pytest.approx(30)
+
+            clock.now += 10
+            assert bucket.delay(30) == pytest.approx(20)
+
+    def test_oversized_request_waits_for_full_bucket(self):
+        """A request above the per-minute limit is not starved forever"""
+        bucket = TokenBucket(100)
+        assert bucket.delay(500) == 0
+
+
+class TestScheduler:
+    """Test admission, priorities and rate-limit pauses"""
+
+    @pytest.fixture
+    def limits(self):
+        with patch.object(
+            scheduler_module, "GROQ_REQUESTS_PER_MINUTE", 600
+        ), patch.object(scheduler_module, "GROQ_TOKENS_PER_MINUTE", 0):
+            yield
+
+    @pytest.mark.asyncio
+    async def test_interactive_overtakes_queued_bulk(self, limits):
+        """Once the bucket is empty, waiting interactive calls go before bulk ones"""
+        scheduler = Scheduler()
+        limiter = scheduler.limiter("model")
+        limiter.buckets["requests"].level = 0
+        order = []
+
+        async def call(name, priority):
+            await scheduler.acquire("model", 10, priority)
+            order.append(name)
+
+        bulk = [asyncio.create_task(call(f"bulk{n}", "bulk")) for n in range(2)]
+        await asyncio.sleep(0)
+        interactive = asyncio.create_task(call("interactive", "interactive"))
+        await asyncio.gather(*bulk, interactive)
+
+        assert order[0] == "interactive"
+        assert scheduler.counters["queued"] == 3
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_queue_wait(self, limits):
+        """A call that cannot be admitted in time gets a 503"""
+        scheduler = Scheduler()
+        scheduler.rate_limited("model", retry_after=60, attempt=0)
+
+        with patch.object(scheduler_module, "GROQ_MAX_QUEUE_WAIT_SECONDS", 0.05):
+            with pytest.raises(HTTPException) as exc_info:
+                await scheduler.acquire("model", 10)
+
+        assert exc_info.value.status_code == 503
+        assert scheduler.counters["timeouts"] == 1
+        assert scheduler.limiter("model").waiters == []
+
+    def test_rate_limited_pauses_for_retry_after_with_jitter(self, limits):
+        """Retry-After sets the pause, plus at most the base jitter"""
+        scheduler = Scheduler()
+        clock = FakeClock()
+        with patch.object(scheduler_module.time, "monotonic", clock):
+            scheduler.rate_limited("model", retry_after=5, attempt=0)
+            paused = scheduler.limiter("model").blocked_until - clock.now
+
+        assert 5 <= paused <= 5 + scheduler_module.GROQ_RETRY_BASE_SECONDS
+
+    def test_parse_retry_after(self):
+        """Retry-After seconds are parsed; anything else is ignored"""
+        assert parse_retry_after(httpx.Headers({"retry-after": "2.5"})) == 2.5
+        assert parse_retry_after(httpx.Headers({})) is None
+        assert parse_retry_after(httpx.Headers({"retry-after": "soon"})) is None
+
+
+class TestRateLimitedCompletion:
+    """Test that a 429 is queued and retried instead of failing"""
+
+    @pytest.mark.asyncio
+    async def test_429_is_retried_after_pause(self, mock_groq_api_key):
+        from app.core import completions
+        from app.schemas.groq_schema import GroqRequest
+
+        responses = [
+            httpx.Response(429, headers={"retry-after": "0"}),
+            httpx.Response(200, json={"choices": [], "usage": {"total_tokens": 5}}),
+        ]
+        client = httpx.AsyncClient(
+            transport=httpx.MockTransport(lambda request: responses.pop(0))
+        )
+        scheduler = Scheduler()
+        with patch.object(
+            completions, "get_upstream_client", return_value=client
+        ), patch.object(completions, "scheduler", scheduler), patch.object(
+            scheduler_module, "GROQ_RETRY_BASE_SECONDS", 0.01
+        ):
+            result = await completions.request_completion(GroqRequest(prompt="Hi"))
+
+        assert result["choices"] == []
+        assert scheduler.counters["rate_limited"] == 1
+        assert scheduler.counters["admitted"] == 2
@@ -0,0 +1,129 @@
+import asyncio
+import sys
+from pathlib import Path
+import pytest
+from unittest.mock import AsyncMock, patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+from app.core.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    """Test coalescing of concurrent identical calls"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_callers_share_one_call(self):
+        """Callers with the same key wait for the first caller's call"""
+        flight = SingleFlight()
+        release = asyncio.Event()
+        calls = 0
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return {"answer": 42}
+
+        waiters = [asyncio.create_task(flight.run("key", call)) for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters)
+
+        assert calls == 1
+        assert results == [{"answer": 42}] * 5
+        assert flight.stats() == {"calls": 1, "coalesced": 4, "in_flight": 0}
+
+    @pytest.mark.asyncio
+    async def test_errors_reach_every_caller_and_are_not_kept(self):
+        """A failed call fails all its waiters, and the next caller retries"""
+        flight = SingleFlight()
+        failing = AsyncMock(side_effect=RuntimeError("upstream down"))
+
+        results = await asyncio.gather(
+            flight.run("key", failing),
+            flight.run("key", failing),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert failing.await_count == 1
+        assert await flight.run("key", AsyncMock(return_value="ok")) == "ok"
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        """A caller that goes away leaves the shared call running"""
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def call():
+            await release.wait()
+            return "done"
+
+        first = asyncio.create_task(flight.run("key", call))
+        second = asyncio.create_task(flight.run("key", call))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+
+        assert await second == "done"
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+    @pytest.mark.asyncio
+    async def test_call_is_cancelled_once_every_caller_is_gone(self):
+        """No quota is spent on an answer nobody waits for"""
+        flight = SingleFlight()
+        started = asyncio.Event()
+        cancelled = asyncio.Event()
+
+        async def call():
+            started.set()
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        first = asyncio.create_task(flight.run("key", call))
+        second = asyncio.create_task(flight.run("key", call))
+        await started.wait()
+        first.cancel()
+        await asyncio.sleep(0)
+        assert not cancelled.is_set()
+
+        second.cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        assert len(flight) == 0
+        assert await flight.run("key", AsyncMock(return_value="fresh")) == "fresh"
+
+
+class TestCompletionCoalescing:
+    """Test that completions go through single-flight"""
+
+    @pytest.mark.asyncio
+    async def test_identical_requests_make_one_upstream_call(self):
+        """Concurrent identical requests cost one upstream call"""
+        from app.core import completions
+        from app.schemas.groq_schema import GroqRequest
+
+        release = asyncio.Event()
+
+        async def request_completion(request):
+            await release.wait()
+            return {"choices": []}
+
+        upstream = AsyncMock(side_effect=request_completion)
+        with patch.object(completions, "request_completion", upstream), patch.object(
+            completions, "single_flight", SingleFlight()
+        ):
+            waiters = [
+                asyncio.create_task(
+                    completions.create_completion(GroqRequest(prompt="Same"))
+                )
+                for _ in range(3)
+            ]
+            await asyncio.sleep(0)
+            release.set()
+            await asyncio.gather(*waiters)
+
+        assert upstream.await_count == 1
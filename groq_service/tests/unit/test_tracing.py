@@ -0,0 +1,134 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent.parent))
+from app.core import tracing
+from app.core.tracing import (
+    Tracer,
+    parse_traceparent,
+    record_span,
+    span,
+    trace_headers,
+    waterfall,
+)
+
+
+@pytest.fixture
+def tracer(monkeypatch, tmp_path):
+    fresh = Tracer(max_traces=2, slow_ms=0, export_path=str(tmp_path / "spans.jsonl"))
+    monkeypatch.setattr(tracing, "tracer", fresh)
+    return fresh
+
+
+class TestSpans:
+    """Test span nesting and trace context propagation"""
+
+    def test_nested_spans_share_the_trace(self, tracer):
+        """A span opened inside another becomes its child"""
+        with span("outer") as outer:
+            with span("inner", model="small") as inner:
+                pass
+
+        assert inner.trace_id == outer.trace_id
+        assert inner.parent_id == outer.span_id
+        assert outer.parent_id is None
+        assert [s["name"] for s in tracer.trace(outer.trace_id)] == ["inner", "outer"]
+
+    def test_incoming_traceparent_is_continued(self, tracer):
+        """A root span joins the caller's trace"""
+        header = "00-" + "a" * 32 + "-" + "b" * 16 + "-01"
+
+        with span("POST /call-groq", traceparent=header) as server:
+            headers = trace_headers()
+
+        assert (server.trace_id, server.parent_id) == ("a" * 32, "b" * 16)
+        assert parse_traceparent(headers["traceparent"]) == ("a" * 32, server.span_id)
+        assert parse_traceparent("not-a-traceparent") is None
+
+    def test_failed_span_is_recorded_with_error(self, tracer):
+        """Exceptions mark the span and still propagate"""
+        with pytest.raises(ValueError):
+            with span("failing") as failing:
+                raise ValueError("bad")
+
+        assert tracer.trace(failing.trace_id)[0]["status"] == {
+            "code": "ERROR",
+            "message": "ValueError",
+        }
+
+    def test_spans_are_exported_as_json_lines(self, tracer):
+        """Each finished span is appended to the export file"""
+        with span("one"):
+            pass
+        with span("two"):
+            pass
+
+        tracer.flush()
+        lines = Path(tracer.export_path).read_text().splitlines()
+        assert [json.loads(line)["name"] for line in lines] == ["one", "two"]
+        assert json.loads(lines[0])["service"] == "groq_service"
+
+    def test_export_file_is_written_off_the_calling_thread(self, tracer, monkeypatch):
+        """Recording a span only queues it; a background thread does the I/O"""
+        import builtins
+        import threading
+
+        writers = []
+        real_open = builtins.open
+
+        def tracking_open(*args, **kwargs):
+            writers.append(threading.current_thread().name)
+            return real_open(*args, **kwargs)
+
+        monkeypatch.setattr(builtins, "open", tracking_open)
+        with span("one"):
+            pass
+        tracer.flush()
+
+        assert writers == ["trace-export"]
+
+    def test_only_recent_traces_are_kept(self, tracer):
+        """The oldest trace is dropped beyond max_traces"""
+        ids = []
+        for name in ("a", "b", "c"):
+            with span(name) as root:
+                ids.append(root.trace_id)
+
+        assert tracer.trace(ids[0]) == []
+        assert tracer.trace(ids[2])[0]["name"] == "c"
+
+    @pytest.mark.asyncio
+    async def test_recorded_span_attaches_to_current_span(self, tracer):
+        """record_span adds a finished child without changing the context"""
+        with span("stream") as parent:
+            started = tracing.time.time()
+            await asyncio.sleep(0.01)
+            recorded = record_span("upstream", started, model="small")
+            assert tracing.current_span() is parent
+
+        assert recorded.parent_id == parent.span_id
+        assert recorded.duration_ms >= 10
+
+
+class TestWaterfall:
+    """Test the debug waterfall layout"""
+
+    def test_rows_are_ordered_with_offsets_and_depth(self, tracer):
+        """Children are indented under their parents"""
+        with span("request") as root:
+            with span("stage"):
+                with span("call"):
+                    pass
+
+        rows = waterfall(tracer.trace(root.trace_id))
+
+        assert [(row["name"], row["depth"]) for row in rows] == [
+            ("request", 0),
+            ("stage", 1),
+            ("call", 2),
+        ]
+        assert rows[0]["offsetMs"] == 0
+        assert all(row["durationMs"] >= 0 for row in rows)